@@ -12,6 +12,29 @@ LLM_API_KEY = os.getenv("LLM_API_KEY")
 QWEN_MODEL = os.getenv("QWEN_MODEL")
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 
+## 高德接口地址（可指向本地替身服务做离线测试）与批量请求开关
+AMAP_BASE_URL = os.getenv("AMAP_BASE_URL", "https://restapi.amap.com").rstrip("/")
+AMAP_BATCH_ENABLED = os.getenv("AMAP_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+
+## 本地逆地理编码：乡镇街道边界 GeoJSON（为空则直接调用高德 regeo），未命中时是否回退高德
+REGEO_BOUNDARY_PATH = os.getenv("REGEO_BOUNDARY_PATH", "")
+REGEO_AMAP_FALLBACK = os.getenv("REGEO_AMAP_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+## 大模型结果持久化缓存（SQLite，置空禁用）与辅助打分候选数上限
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "cache", "llm_cache.db"))
+QWEN_CACHE_MAX = int(os.getenv("QWEN_CACHE_MAX", "10000"))
+AUX_TOP_K = int(os.getenv("AUX_TOP_K", "20"))
+
+## 解析流程分阶段重试：上游返回非 JSON / 网络抖动时只重试失败的阶段（默认次数、首次退避、退避上限），
+## STAGE_RETRY_BUDGETS 按阶段覆盖次数，如 "structure=1,inputtips=3"
+STAGE_RETRIES = int(os.getenv("STAGE_RETRIES", "2"))
+STAGE_BACKOFF_MS = float(os.getenv("STAGE_BACKOFF_MS", "100"))
+STAGE_BACKOFF_MAX_MS = float(os.getenv("STAGE_BACKOFF_MAX_MS", "2000"))
+STAGE_RETRY_BUDGETS = {
+    name.strip(): int(n) for name, _, n in
+    (item.partition("=") for item in os.getenv("STAGE_RETRY_BUDGETS", "").split(",") if item.strip())
+}
+
 ## 读取提示词模板
 def load_prompt(filename: str) -> str:
     with open(filename, "r", encoding="utf-8") as f:
@@ -1,10 +1,16 @@
 # amap_call.py
 import os
 import time
+import asyncio
+import weakref
+import httpx
 import requests
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
 
-from config import logger, AMAP_KEY
+from config import logger, AMAP_KEY, AMAP_BASE_URL
+
+AMAP_BATCH_MAX_OPS = 20  # 高德批量接口单次最多子请求数
 
 def safe_str(val):
     """保证返回字符串；如果是数组就取第一个，否则返回空或原值"""
@@ -12,19 +18,8 @@ def safe_str(val):
         return val[0] if len(val) > 0 else ""
     return val or ""
 
-def amap_inputtips(city: str, keyword: str, type: str = "") -> List[Dict]:
-    """
-    使用高德输入提示接口模糊搜索 POI
-    :param city: 城市名称（地级市）
-    :param keyword: 查询关键词
-    :param type: 类型过滤（可选）
-    :return: 包含位置数据的 POI 列表
-    """
-    """
-    使用高德输入提示接口模糊搜索 POI, 并打印请求耗时
-    """
-    url = "https://restapi.amap.com/v3/assistant/inputtips"
-    params = {
+def _inputtips_params(city: str, keyword: str, type: str = "") -> Dict:
+    return {
         "keywords": keyword,
         "city": city,
         "type": type,
@@ -33,13 +28,9 @@ def amap_inputtips(city: str, keyword: str, type: str = "") -> List[Dict]:
         "citylimit": True   # 限定在本城市返回结果
     }
 
-    start = time.time()
-    resp = requests.get(url, params=params, timeout=3).json()
-    end = time.time()
-
-    duration = end - start
-    logger.debug(f"⏱️ 高德输入提示接口请求耗时：{duration:.2f} 秒")
 
+def _inputtips_to_pois(resp: Dict) -> List[Dict]:
+    """将输入提示接口的返回转为 POI 风格的列表，并打印候选"""
     tips = resp.get("tips", [])
 
     logger.info(f"    返回 {len(tips)} 个候选 Tip：")
@@ -72,20 +63,104 @@ def amap_inputtips(city: str, keyword: str, type: str = "") -> List[Dict]:
     return pois
 
 
-def amap_poi_search(city: str, keyword: str, type: str = "") -> Dict:
+def amap_inputtips(city: str, keyword: str, type: str = "") -> List[Dict]:
     """
-    使用高德 place/text 接口进行 POI 搜索，并融合相似度判断。
-    若候选项中存在与 keyword 相似度高的记录（≥threshold），则返回该 POI，否则返回 None。
+    使用高德输入提示接口模糊搜索 POI
+    :param city: 城市名称（地级市）
+    :param keyword: 查询关键词
+    :param type: 类型过滤（可选）
+    :return: 包含位置数据的 POI 列表
+    """
+    """
+    使用高德输入提示接口模糊搜索 POI, 并打印请求耗时
+    """
+    url = f"{AMAP_BASE_URL}/v3/assistant/inputtips"
+    params = _inputtips_params(city, keyword, type)
 
-    :param city: 城市名称，可传 "" 表示全国
-    :param keyword: 查询关键词（通常为原始地址）
-    :param type: 类型过滤（如写字楼、住宅）
-    :param threshold: 匹配相似度分数阈值（0-100）
-    :return: 匹配的 POI（包含得分字段）或 None
+    start = time.time()
+    resp = requests.get(url, params=params, timeout=3).json()
+    end = time.time()
+
+    duration = end - start
+    logger.debug(f"⏱️ 高德输入提示接口请求耗时：{duration:.2f} 秒")
+
+    return _inputtips_to_pois(resp)
+
+
+def _batch_payload(chunk: List[Tuple[str, Dict]]) -> Dict:
+    """子请求以 path?query 的形式放入 ops"""
+    return {
+        "ops": [
+            {"url": f"{path}?{urlencode({k: v for k, v in params.items() if v is not None})}"}
+            for path, params in chunk
+        ]
+    }
+
+
+def _batch_bodies(resp, n: int) -> List[Dict]:
+    """将批量接口返回拆分为 n 个子请求响应体，失败的子请求为 {}"""
+    if not isinstance(resp, list):
+        logger.error(f"高德批量接口返回异常：{resp}")
+        return [{} for _ in range(n)]
+
+    bodies = []
+    for item in resp[:n]:
+        item = item if isinstance(item, dict) else {}
+        body = item.get("body")
+        if item.get("status") != 200 or not isinstance(body, dict):
+            logger.warning(f"高德批量子请求失败：{item}")
+            body = {}
+        bodies.append(body)
+    bodies.extend({} for _ in range(n - len(bodies)))
+    return bodies
+
+
+def amap_batch(ops: List[Tuple[str, Dict]]) -> List[Dict]:
     """
-    url = "https://restapi.amap.com/v3/place/text"
+    使用高德批量请求接口，一次 HTTP 调用执行多个子请求
+    :param ops: 子请求列表 [(path, params), ...]，如 ("/v3/assistant/inputtips", {...})
+    :return: 与 ops 顺序一致的子请求响应体，单个子请求失败时为 {}
+    """
+    url = f"{AMAP_BASE_URL}/v3/batch"
+    results: List[Dict] = []
+
+    # 高德单次批量请求最多支持 20 个子请求，超出部分分组发送
+    for i in range(0, len(ops), AMAP_BATCH_MAX_OPS):
+        chunk = ops[i:i + AMAP_BATCH_MAX_OPS]
+        payload = _batch_payload(chunk)
+
+        start = time.time()
+        resp = requests.post(url, params={"key": AMAP_KEY}, json=payload, timeout=5).json()
+        end = time.time()
+        logger.debug(f"⏱️ 高德批量接口耗时：{end - start:.2f} 秒（{len(chunk)} 个子请求）")
+
+        results.extend(_batch_bodies(resp, len(chunk)))
+
+    return results
+
+
+def amap_inputtips_batch(queries: List[Tuple[str, str, str]]) -> List[List[Dict]]:
+    """
+    将多个相互独立的输入提示查询合并为一次批量请求
+    :param queries: [(city, keyword, type), ...]
+    :return: 与 queries 顺序一致的 POI 列表
+    """
+    if not queries:
+        return []
 
-    params = {
+    ops = [("/v3/assistant/inputtips", _inputtips_params(city, keyword, type))
+           for city, keyword, type in queries]
+    bodies = amap_batch(ops)
+
+    results = []
+    for (city, keyword, _), body in zip(queries, bodies):
+        logger.info(f"    [批量] {city} {keyword}")
+        results.append(_inputtips_to_pois(body))
+    return results
+
+
+def _poi_search_params(city: str, keyword: str, type: str = "") -> Dict:
+    return {
         "keywords": keyword,
         "city": city,
         "types": type,
@@ -95,6 +170,21 @@ def amap_poi_search(city: str, keyword: str, type: str = "") -> Dict:
         "extensions": "all"
     }
 
+
+def amap_poi_search(city: str, keyword: str, type: str = "") -> Dict:
+    """
+    使用高德 place/text 接口进行 POI 搜索，并融合相似度判断。
+    若候选项中存在与 keyword 相似度高的记录（≥threshold），则返回该 POI，否则返回 None。
+
+    :param city: 城市名称，可传 "" 表示全国
+    :param keyword: 查询关键词（通常为原始地址）
+    :param type: 类型过滤（如写字楼、住宅）
+    :param threshold: 匹配相似度分数阈值（0-100）
+    :return: 匹配的 POI（包含得分字段）或 None
+    """
+    url = f"{AMAP_BASE_URL}/v3/place/text"
+    params = _poi_search_params(city, keyword, type)
+
     start = time.time()
     resp = requests.get(url, params=params, timeout=3).json()
     end = time.time()
@@ -103,15 +193,8 @@ def amap_poi_search(city: str, keyword: str, type: str = "") -> Dict:
     return resp.get("pois", [])
 
 
-def regeo(location: str, radius: int = 100) -> Dict:
-    """
-    使用高德逆地址编码获取乡镇街道信息
-    :param location: 121.594637,29.725989
-    :param radius: 检索半径
-    :return: 乡镇街道信息
-    """
-    url = "https://restapi.amap.com/v3/geocode/regeo"
-    params = {
+def _regeo_params(location: str, radius: int = 100) -> Dict:
+    return {
         "key": AMAP_KEY,
         "location": location,
         "poitype": "",
@@ -120,9 +203,9 @@ def regeo(location: str, radius: int = 100) -> Dict:
         "roadlevel": 0
     }
 
-    response = requests.get(url, params=params)
-    data = response.json()
 
+def _regeo_component(data: Dict) -> Dict:
+    """从逆地理编码返回中提取 addressComponent"""
     if data.get("status") != "1":
         print("请求失败，返回状态:", data.get("info"))
         return {}
@@ -140,6 +223,29 @@ def regeo(location: str, radius: int = 100) -> Dict:
     return result
 
 
+def regeo(location: str, radius: int = 100) -> Dict:
+    """
+    使用高德逆地址编码获取乡镇街道信息
+    :param location: 121.594637,29.725989
+    :param radius: 检索半径
+    :return: 乡镇街道信息
+    """
+    url = f"{AMAP_BASE_URL}/v3/geocode/regeo"
+    params = _regeo_params(location, radius)
+
+    response = requests.get(url, params=params)
+    data = response.json()
+
+    return _regeo_component(data)
+
+
+def _geocode_location(resp: Dict) -> str:
+    print(f"高德地理编码响应：{resp}")
+    if resp.get("geocodes"):
+        return resp["geocodes"][0]["location"]
+    return ""
+
+
 def amap_geocode(city: str, address: str) -> str:
     """
     调用高德地理编码接口，将地址转为经纬度坐标
@@ -147,13 +253,10 @@ def amap_geocode(city: str, address: str) -> str:
     :param address: 地址文本
     :return: 坐标字符串（经度,纬度）或空字符串
     """
-    url = "https://restapi.amap.com/v3/geocode/geo"
+    url = f"{AMAP_BASE_URL}/v3/geocode/geo"
     params = {"address": address, "city": city, "key": AMAP_KEY}
     resp = requests.get(url, params=params).json()
-    print(f"高德地理编码响应：{resp}")
-    if resp.get("geocodes"):
-        return resp["geocodes"][0]["location"]
-    return ""
+    return _geocode_location(resp)
 
 
 def amap_around_search(location: str, keyword: str, radius: int = 5000) -> List[Dict]:
@@ -164,7 +267,91 @@ def amap_around_search(location: str, keyword: str, radius: int = 5000) -> List[
     :param radius: 搜索半径（单位：米）
     :return: POI 列表
     """
-    url = "https://restapi.amap.com/v3/place/around"
+    url = f"{AMAP_BASE_URL}/v3/place/around"
     params = {"location": location, "keywords": keyword, "radius": radius, "key": AMAP_KEY}
     resp = requests.get(url, params=params).json()
-    return resp.get("pois", [])
\ No newline at end of file
+    return resp.get("pois", [])
+
+
+# -------------------- asyncio 版本 --------------------
+# 与同步接口参数、返回一致；共享连接池，适合单个事件循环内的大量并发解析
+
+# 连接池与事件循环绑定，每个事件循环各自持有一个客户端
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=5,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def _aget(path: str, params: Dict, timeout: Optional[float] = None) -> Dict:
+    client = _get_async_client()
+    resp = await client.get(f"{AMAP_BASE_URL}{path}", params=params, timeout=timeout or client.timeout)
+    return resp.json()
+
+
+async def amap_inputtips_async(city: str, keyword: str, type: str = "") -> List[Dict]:
+    """amap_inputtips 的 asyncio 版本"""
+    start = time.time()
+    resp = await _aget("/v3/assistant/inputtips", _inputtips_params(city, keyword, type), timeout=3)
+    logger.debug(f"⏱️ 高德输入提示接口请求耗时：{time.time() - start:.2f} 秒")
+    return _inputtips_to_pois(resp)
+
+
+async def amap_poi_search_async(city: str, keyword: str, type: str = "") -> List[Dict]:
+    """amap_poi_search 的 asyncio 版本"""
+    start = time.time()
+    resp = await _aget("/v3/place/text", _poi_search_params(city, keyword, type), timeout=3)
+    logger.debug(f"⏱️ 高德 POI 搜索接口耗时：{time.time() - start:.2f} 秒")
+    return resp.get("pois", [])
+
+
+async def regeo_async(location: str, radius: int = 100) -> Dict:
+    """regeo 的 asyncio 版本"""
+    data = await _aget("/v3/geocode/regeo", _regeo_params(location, radius))
+    return _regeo_component(data)
+
+
+async def amap_geocode_async(city: str, address: str) -> str:
+    """amap_geocode 的 asyncio 版本"""
+    resp = await _aget("/v3/geocode/geo", {"address": address, "city": city, "key": AMAP_KEY})
+    return _geocode_location(resp)
+
+
+async def amap_around_search_async(location: str, keyword: str, radius: int = 5000) -> List[Dict]:
+    """amap_around_search 的 asyncio 版本"""
+    params = {"location": location, "keywords": keyword, "radius": radius, "key": AMAP_KEY}
+    resp = await _aget("/v3/place/around", params)
+    return resp.get("pois", [])
+
+
+async def amap_batch_async(ops: List[Tuple[str, Dict]]) -> List[Dict]:
+    """amap_batch 的 asyncio 版本，超过 20 个子请求时各分组并发发送"""
+    async def _send(chunk):
+        payload = _batch_payload(chunk)
+        resp = await _get_async_client().post(f"{AMAP_BASE_URL}/v3/batch", params={"key": AMAP_KEY}, json=payload)
+        return _batch_bodies(resp.json(), len(chunk))
+
+    chunks = [ops[i:i + AMAP_BATCH_MAX_OPS] for i in range(0, len(ops), AMAP_BATCH_MAX_OPS)]
+    results: List[Dict] = []
+    for bodies in await asyncio.gather(*(_send(chunk) for chunk in chunks)):
+        results.extend(bodies)
+    return results
+
+
+async def amap_inputtips_batch_async(queries: List[Tuple[str, str, str]]) -> List[List[Dict]]:
+    """amap_inputtips_batch 的 asyncio 版本"""
+    if not queries:
+        return []
+    ops = [("/v3/assistant/inputtips", _inputtips_params(city, keyword, type))
+           for city, keyword, type in queries]
+    bodies = await amap_batch_async(ops)
+    return [_inputtips_to_pois(body) for body in bodies]
@@ -1,19 +1,71 @@
 # qwen_call.py
 import os
+import json
 import time
+import asyncio
+import weakref
 from typing import Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
-from config import logger, LLM_API_KEY, QWEN_MODEL
+from config import logger, LLM_API_KEY, QWEN_MODEL, LLM_CACHE_PATH, QWEN_CACHE_MAX
+from util.kv_cache import KVCache, make_key
 
+QWEN_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
 # 初始化通义千问客户端（OpenAI 接口格式兼容）
 client = OpenAI(
     api_key=LLM_API_KEY,
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
+    base_url=QWEN_BASE_URL
 )
 
+# 响应缓存：temperature=0 且固定 seed，相同模型 + prompt 的结果可直接复用
+qwen_cache = KVCache(LLM_CACHE_PATH, namespace="qwen", max_entries=QWEN_CACHE_MAX)
+
+# asyncio 版本客户端，供 call_qwen_async 使用；连接池与事件循环绑定，每个事件循环一个
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _get_async_client() -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = AsyncOpenAI(api_key=LLM_API_KEY, base_url=QWEN_BASE_URL)
+    return _async_clients[loop]
+
+
+def _chat_kwargs(prompt: str, model: str) -> dict:
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": "你是一个中文地理信息分析助手"},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0,
+        top_p=1,  # 避免极端值（推荐保留默认或略低）
+        presence_penalty=0,  # 控制重复内容，适度增加稳定性
+        frequency_penalty=0,  # 减少内容偏离
+        n=1, # 只返回一个结果
+        seed=42,
+        response_format={         # 需要结构化时强烈建议使用
+            "type": "json_object"
+        },
+        extra_body={
+            "enable_thinking": False
+        }
+    )
+
+
+def _cacheable(content: str) -> bool:
+    """只缓存能解析的 JSON 结果；截断或非 JSON 的回复缓存后会被永久重放，下次应重新请求"""
+    if not content:
+        return False
+    try:
+        json.loads(content)
+    except ValueError:
+        logger.warning(f"⚠️ 通义千问返回非 JSON，不写入缓存：{content[:200]}")
+        return False
+    return True
+
 
 def call_qwen(prompt: str, model: str = QWEN_MODEL) -> str:
     """
@@ -22,32 +74,48 @@ def call_qwen(prompt: str, model: str = QWEN_MODEL) -> str:
     :param model: 使用的模型名称
     :return: 模型返回的文本结果
     """
+    key = make_key(model, prompt)
+    cached = qwen_cache.get(key)
+    if cached is not None:
+        logger.debug("通义千问命中缓存")
+        return cached
+
     try:
         start = time.time()
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "你是一个中文地理信息分析助手"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0,
-            top_p=1,  # 避免极端值（推荐保留默认或略低）
-            presence_penalty=0,  # 控制重复内容，适度增加稳定性
-            frequency_penalty=0,  # 减少内容偏离
-            n=1, # 只返回一个结果
-            seed=42,
-            response_format={         # 需要结构化时强烈建议使用
-                "type": "json_object"
-            },
-            extra_body={
-                "enable_thinking": False
-            }
-        )
+        response = client.chat.completions.create(**_chat_kwargs(prompt, model))
         end = time.time()
         duration = end - start
         logger.debug(f"模型响应耗时：{duration:.2f} 秒")
 
-        return response.choices[0].message.content.strip()
+        content = response.choices[0].message.content.strip()
     except Exception as e:
         logger.error(f"通义千问调用失败：{e}")
-        return ""
\ No newline at end of file
+        return ""
+
+    # 空结果与非 JSON 结果不缓存，下次重试
+    if _cacheable(content):
+        qwen_cache.set(key, content)
+    return content
+
+
+async def call_qwen_async(prompt: str, model: str = QWEN_MODEL) -> str:
+    """call_qwen 的 asyncio 版本；SQLite 缓存读写放到线程池，不阻塞事件循环"""
+    key = make_key(model, prompt)
+    cached = await asyncio.to_thread(qwen_cache.get, key)
+    if cached is not None:
+        logger.debug("通义千问命中缓存")
+        return cached
+
+    try:
+        start = time.time()
+        response = await _get_async_client().chat.completions.create(**_chat_kwargs(prompt, model))
+        logger.debug(f"模型响应耗时：{time.time() - start:.2f} 秒")
+
+        content = response.choices[0].message.content.strip()
+    except Exception as e:
+        logger.error(f"通义千问调用失败：{e}")
+        return ""
+
+    if _cacheable(content):
+        await asyncio.to_thread(qwen_cache.set, key, content)
+    return content
@@ -12,55 +12,90 @@ docker run --gpus all --shm-size 1g -p 8080:80 \
   --num-shard 2 \
   --max-input-tokens 2048 --max-total-tokens 2304
 
-需要：pip install requests
+需要：pip install requests httpx
 """
 
-import os, re, requests
+import os, re, time, json, threading, unicodedata, requests
+import asyncio, contextvars, weakref
+import httpx
 from dotenv import load_dotenv
 
+from util.batcher import MicroBatcher
+from util.backend_pool import BackendPool, BackendClientError
+from util.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from util.gazetteer import match_regions, LEVELS
+from util.addr_tagger import load_tagger
+from util import metrics
+from util.kv_cache import KVCache, make_key
+from util.stages import RETRYABLE
+from util.tag_stream import TagStreamParser
+from util.tag_format import XML, FORMATS, instruction, parse_tags
+from config import logger, LLM_CACHE_PATH
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在目录
 
 ##
 ENV_PATH = os.path.join(BASE_DIR, "../.env")
 load_dotenv(str(ENV_PATH))
 
-STRUCT_LLM_URL = os.environ.get("STRUCT_LLM_URL", "http://127.0.0.1:8080")  # 可用环境变量覆盖
+STRUCT_LLM_URL = os.environ.get("STRUCT_LLM_URL", "http://127.0.0.1:8080")  # 可用环境变量覆盖，多个地址用逗号分隔
 STRUCT_LLM_TOKEN = os.environ.get("STRUCT_LLM_TOKEN", None)                 # 若服务启用鉴权，填 Bearer token
 
+# 多个 TGI 实例：按在途请求数/延迟选择后端，连续失败 STRUCT_LLM_MAX_FAILURES 次摘除，后台探活 /health 恢复
+STRUCT_LLM_URLS = [u.strip().rstrip("/") for u in STRUCT_LLM_URL.split(",") if u.strip()]
+STRUCT_LLM_URL = STRUCT_LLM_URLS[0]
+STRUCT_LLM_MAX_FAILURES = int(os.environ.get("STRUCT_LLM_MAX_FAILURES", "3"))
+STRUCT_LLM_PROBE_INTERVAL = float(os.environ.get("STRUCT_LLM_PROBE_INTERVAL", "5"))
+
+# 结构化总时限（秒，含换后端重试）；连续失败 STRUCT_BREAKER_THRESHOLD 次熔断，
+# 熔断期间用本地行政区划词典兜底，STRUCT_BREAKER_RECOVERY 秒后放行试探请求
+STRUCT_LLM_TIMEOUT = float(os.environ.get("STRUCT_LLM_TIMEOUT", "20"))
+# 单次解析请求内结构化阶段的总时限（秒）：阶段重试共享该时限，每次调用的时限取剩余时间，用尽后本地兜底
+STRUCT_LLM_DEADLINE = float(os.environ.get("STRUCT_LLM_DEADLINE", str(STRUCT_LLM_TIMEOUT)))
+STRUCT_BREAKER_THRESHOLD = int(os.environ.get("STRUCT_BREAKER_THRESHOLD", "5"))
+STRUCT_BREAKER_RECOVERY = float(os.environ.get("STRUCT_BREAKER_RECOVERY", "30"))
+
+# 结构化后端：tgi（默认，大模型）或 tagger（CPU 标注器，lora/train_tagger.py 训练）；
+# 标注器模型存在时也作为熔断/失败时的兜底，否则兜底为行政区划词典
+STRUCT_BACKEND = os.environ.get("STRUCT_BACKEND", "tgi").lower()
+STRUCT_TAGGER_PATH = os.environ.get("STRUCT_TAGGER_PATH", os.path.join(BASE_DIR, "../outputs/addr_tagger.json.gz"))
+
+# 结构化结果缓存（与通义千问共用 LLM_CACHE_PATH，独立命名空间）；键含模型版本，换模型自动失效
+# 模型版本默认按后端分别取 TGI /info 的 model_id@model_sha（每 STRUCT_MODEL_VERSION_TTL 秒刷新），可用 STRUCT_MODEL_VERSION 显式指定
+STRUCT_CACHE_ENABLED = os.environ.get("STRUCT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+STRUCT_CACHE_MAX = int(os.environ.get("STRUCT_CACHE_MAX", "50000"))
+STRUCT_MODEL_VERSION = os.environ.get("STRUCT_MODEL_VERSION", "")
+STRUCT_MODEL_VERSION_TTL = float(os.environ.get("STRUCT_MODEL_VERSION_TTL", "60"))
+
+# 客户端微批：并发到达的 infer 请求在窗口期内合并为一次 /infer_batch，仅适用于 lora/infer_serv.py 后端；
+# TGI 无批量接口，保持关闭（服务端 continuous batching 已合批）
+STRUCT_BATCH_ENABLED = os.environ.get("STRUCT_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+STRUCT_BATCH_WINDOW_MS = float(os.environ.get("STRUCT_BATCH_WINDOW_MS", "5"))
+STRUCT_BATCH_MAX = int(os.environ.get("STRUCT_BATCH_MAX", "16"))
+
+# 模型输出格式：xml（<prov>..</prov>）或 compact（p=..|c=..，见 util/tag_format.py），须与训练时一致
+STRUCT_TAG_FORMAT = os.environ.get("STRUCT_TAG_FORMAT", XML).lower()
+if STRUCT_TAG_FORMAT not in FORMATS:
+    raise ValueError(f"STRUCT_TAG_FORMAT 取值应为 {FORMATS}")
+
 def build_prompt(addr_text: str) -> str:
     return (
-        "从以下地址文本中抽取要素，并按XML标签输出（只输出标签串）：\n\n"
+        f"{instruction(STRUCT_TAG_FORMAT)}\n\n"
         f"### 输入：{addr_text}\n### 输出： "
     )
 
-# 解析 <key>value</key>，同名标签合并为 list
-_TAG_RE = re.compile(r"<([a-zA-Z0-9_]+)>(.*?)</\1>", re.DOTALL)
-
 def parse_xmlish_tags(tag_text: str) -> dict:
-    result = {}
-    for m in _TAG_RE.finditer(tag_text or ""):
-        k = m.group(1).strip()
-        v = m.group(2).strip()
-        if not k:
-            continue
-        if k not in result:
-            result[k] = v
-        else:
-            if isinstance(result[k], list):
-                if v not in result[k]:
-                    result[k].append(v)
-            else:
-                if v != result[k]:
-                    result[k] = [result[k], v]
-    return result
+    """解析 <key>value</key> 或 compact 的 代码=值 串（自动识别），同名标签合并为 list"""
+    return parse_tags(tag_text)
 
-def call_tgi_generate(prompt: str, max_new_tokens: int = 256) -> str:
-    url = f"{STRUCT_LLM_URL}/generate"
+def _tgi_headers() -> dict:
     headers = {"Content-Type": "application/json"}
     if STRUCT_LLM_TOKEN:
         headers["Authorization"] = f"Bearer {STRUCT_LLM_TOKEN}"
+    return headers
 
-    payload = {
+def _tgi_payload(prompt: str, max_new_tokens: int) -> dict:
+    return {
         "inputs": prompt,
         "parameters": {
             "max_new_tokens": max_new_tokens,
@@ -72,19 +107,398 @@ def call_tgi_generate(prompt: str, max_new_tokens: int = 256) -> str:
             # "stop": ["\n###", "</town>"]
         }
     }
-    resp = requests.post(url, json=payload, headers=headers, timeout=120)
+
+backend_pool = BackendPool(STRUCT_LLM_URLS, max_failures=STRUCT_LLM_MAX_FAILURES,
+                           probe_interval=STRUCT_LLM_PROBE_INTERVAL, name="struct_llm.backend")
+_session = requests.Session()  # 复用 keep-alive 连接
+_served_by = contextvars.ContextVar("struct_llm_served_by", default="")  # 最近一次成功生成的后端地址，写缓存时取其模型版本
+
+def _check_response(resp):
+    """4xx（429 除外）是请求本身的问题，不计入后端故障；5xx 等抛出原始 HTTP 异常"""
+    if 400 <= resp.status_code < 500 and resp.status_code != 429:
+        raise BackendClientError(f"TGI 请求错误 {resp.status_code}: {resp.text[:200]}")
     resp.raise_for_status()
-    data = resp.json()
+
+def _failover_attempts() -> int:
+    # 单个后端时只尝试一次；多个后端时失败可换一个后端重试一次
+    return min(2, len(backend_pool))
+
+def _post_with_failover(path: str, payload: dict, timeout: float = None) -> dict:
+    """
+    向后端池 POST 一次，失败时换后端重试（单后端只试一次）
+    :param timeout: 总时限（秒），默认 STRUCT_LLM_TIMEOUT；换后端重试共享同一时限
+    :return: 响应 JSON
+    """
+    deadline = time.monotonic() + (timeout or STRUCT_LLM_TIMEOUT)
+    tried = []
+    for attempt in range(_failover_attempts()):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"结构化模型调用超过时限 {timeout or STRUCT_LLM_TIMEOUT}s")
+        try:
+            with backend_pool.use(exclude=tried) as backend:
+                tried.append(backend)
+                resp = _session.post(f"{backend.url}{path}", json=payload, headers=_tgi_headers(), timeout=remaining)
+                _check_response(resp)
+                data = resp.json()
+                _served_by.set(backend.url)
+                return data
+        except requests.RequestException:
+            if attempt + 1 >= _failover_attempts():
+                raise
+
+def call_tgi_generate(prompt: str, max_new_tokens: int = 256, timeout: float = None) -> str:
+    """
+    :param timeout: 总时限（秒），默认 STRUCT_LLM_TIMEOUT；换后端重试共享同一时限
+    """
     # TGI 返回 {"generated_text": "..."}
-    return data.get("generated_text", "")
+    return _post_with_failover("/generate", _tgi_payload(prompt, max_new_tokens), timeout).get("generated_text", "")
+
+# -------------------- 微批版本（lora/infer_serv.py） --------------------
+# TGI 的 /generate 只接受单条 prompt，并发请求本就由其 continuous batching 合批，客户端凑批只会多等一个窗口，
+# 因此微批只用于 infer_serv：窗口内到达的地址合成一次 /infer_batch 请求，由服务端一次前向生成。
+# infer_serv 按自身 TAG_FORMAT 拼提示词，须与 STRUCT_TAG_FORMAT 一致
+
+def call_serv_batch(texts: list, max_new_tokens: int = 256, timeout: float = None) -> list:
+    """
+    多条地址一次 POST infer_serv /infer_batch
+    :return: 与 texts 同序的生成文本
+    """
+    payload = {"texts": texts, "max_new_tokens": max_new_tokens}
+    results = _post_with_failover("/infer_batch", payload, timeout)["results"]
+    if len(results) != len(texts):
+        raise ValueError(f"/infer_batch 返回 {len(results)} 条结果，请求 {len(texts)} 条")
+    return [r.get("text", "") for r in results]
+
+def generate_batch(items: list) -> list:
+    """
+    一批 (addr_text, max_new_tokens)，按 max_new_tokens 分组，每组一次 /infer_batch
+    :return: 与 items 同序的 (生成文本, 后端地址)；失败时对应位置为异常实例
+    """
+    groups = {}
+    for i, (_text, max_new_tokens) in enumerate(items):
+        groups.setdefault(max_new_tokens, []).append(i)
+    results = [None] * len(items)
+    for max_new_tokens, idx in groups.items():
+        try:
+            texts = [(text, _served_by.get()) for text in call_serv_batch([items[i][0] for i in idx], max_new_tokens)]
+        except Exception as e:
+            texts = [e] * len(idx)
+        for i, text in zip(idx, texts):
+            results[i] = text
+    return results
+
+_batcher = MicroBatcher(generate_batch, window_ms=STRUCT_BATCH_WINDOW_MS,
+                        max_batch=STRUCT_BATCH_MAX, name="struct_llm")
+
+# -------------------- 熔断与降级 --------------------
+breaker = CircuitBreaker("struct_llm.breaker", failure_threshold=STRUCT_BREAKER_THRESHOLD,
+                         recovery_timeout=STRUCT_BREAKER_RECOVERY)
+
+def gazetteer_infer(addr_text: str) -> dict:
+    """行政区划词典识别省/市/区县/乡镇，剩余部分整体作为 poi"""
+    regions = match_regions(addr_text)
+    tags = {level: regions[level] for level in LEVELS if regions[level]}
+    rest = regions["rest"].strip()
+    if rest:
+        tags["poi"] = rest
+    text = "".join(f"<{k}>{v}</{k}>" for k, v in tags.items())
+    return {"text": text, "tags": tags}
+
+def tagger_infer(addr_text: str):
+    """CPU 标注器结构化；模型文件不存在时返回 None"""
+    tagger = load_tagger(STRUCT_TAGGER_PATH)
+    return tagger.tag(addr_text) if tagger is not None else None
+
+def local_infer(addr_text: str) -> dict:
+    """
+    本地兜底结构化：优先 CPU 标注器，无模型时用行政区划词典
+    返回结构与 infer 一致，额外带 fallback 标记
+    """
+    result = tagger_infer(addr_text) or gazetteer_infer(addr_text)
+    return {**result, "fallback": True}
+
+def _fallback(addr_text: str, reason: str, error: Exception = None) -> dict:
+    metrics.inc(f"struct_llm.fallback.{reason}")
+    logger.warning(f"⚠️ 结构化模型不可用（{reason}{f'：{error}' if error else ''}），使用本地结构化兜底")
+    return local_infer(addr_text)
+
+def fallback_infer(addr_text: str, error: Exception = None) -> dict:
+    """调用方重试预算耗尽后的本地兜底（见 resolver 的 structure 阶段）"""
+    return _fallback(addr_text, "retry", error)
+
+def _record_outcome(error: Exception = None):
+    # 请求本身有误（4xx）说明服务可达，不计为熔断失败
+    if error is None or isinstance(error, BackendClientError):
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+def _on_error(addr_text: str, error: Exception) -> dict:
+    """
+    记录失败；可重试错误（网络 / 超时 / 非 JSON 响应）在熔断器仍闭合时原样抛出，交给调用方按阶段预算重试，
+    熔断后（或不可重试的错误）才走本地兜底
+    """
+    _record_outcome(error)
+    if isinstance(error, RETRYABLE) and breaker.state == CLOSED:
+        raise error
+    return _fallback(addr_text, "error", error)
 
-def infer(addr_text: str, max_new_tokens: int = 256):
-    prompt = build_prompt(addr_text)
-    gen = call_tgi_generate(prompt, max_new_tokens=max_new_tokens)
+def structure_deadline() -> float:
+    """本次请求结构化阶段的截止时刻（time.monotonic），传给 infer / infer_async 的 deadline"""
+    return time.monotonic() + STRUCT_LLM_DEADLINE
+
+def _time_left(deadline: float = None):
+    """
+    :return: 本次调用可用的时限（秒，不超过 STRUCT_LLM_TIMEOUT）；未给 deadline 时为 None（用默认时限），已过期为 0
+    """
+    if deadline is None:
+        return None
+    return max(0.0, min(STRUCT_LLM_TIMEOUT, deadline - time.monotonic()))
+
+def _model_infer(addr_text: str, max_new_tokens: int, timeout: float = None) -> dict:
+    if STRUCT_BATCH_ENABLED:
+        # 批在工作线程中发送，后端地址随结果带回
+        gen, served = _batcher((addr_text, max_new_tokens),
+                               timeout=(timeout or STRUCT_LLM_TIMEOUT) + STRUCT_BATCH_WINDOW_MS / 1000)
+        _served_by.set(served)
+    else:
+        gen = call_tgi_generate(build_prompt(addr_text), max_new_tokens=max_new_tokens, timeout=timeout)
     text = gen.strip()
     tags = parse_xmlish_tags(text)
     return {"text": text, "tags": tags}  # TGI /generate 不直接回 token 数
 
+def _guarded_infer(addr_text: str, max_new_tokens: int, timeout: float = None) -> dict:
+    if not breaker.allow():
+        return _fallback(addr_text, "open")
+    try:
+        result = _model_infer(addr_text, max_new_tokens, timeout)
+    except Exception as e:
+        return _on_error(addr_text, e)
+    _record_outcome()
+    return result
+
+# -------------------- 结果缓存 --------------------
+struct_cache = KVCache(LLM_CACHE_PATH if STRUCT_CACHE_ENABLED else "", namespace="struct", max_entries=STRUCT_CACHE_MAX)
+_version_lock = threading.Lock()
+_versions = {}  # 后端地址 → (模型版本, 探测时间)
+_version_warned = set()  # 已提示过取不到版本的后端，只记一次日志
+
+def normalize_address(addr_text: str) -> str:
+    """缓存键用的地址归一：NFKC（全角转半角等）+ 去除空白"""
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", addr_text or ""))
+
+def _probe_version(url: str) -> str:
+    try:
+        resp = _session.get(f"{url}/info", headers=_tgi_headers(), timeout=2)
+        resp.raise_for_status()
+        info = resp.json()
+    except (requests.RequestException, ValueError):
+        return ""
+    return f"{info.get('model_id', '')}@{info.get('model_sha') or ''}"
+
+def backend_version(url: str) -> str:
+    """
+    指定后端的模型版本；未显式配置时查询其 /info，每 STRUCT_MODEL_VERSION_TTL 秒刷新（失败同样等 TTL 再试）
+    探测在锁外进行：到期后由一个线程刷新，其余线程继续使用旧值，不在请求路径上排队等待慢后端
+    :return: 版本字符串，未知时返回空串
+    """
+    if STRUCT_MODEL_VERSION:
+        return STRUCT_MODEL_VERSION
+    if not url:
+        return ""
+    with _version_lock:
+        version, checked_at = _versions.get(url, ("", float("-inf")))
+        if time.monotonic() - checked_at < STRUCT_MODEL_VERSION_TTL:
+            return version
+        _versions[url] = (version, time.monotonic())  # 占位，避免其他线程重复探测
+    probed = _probe_version(url)
+    with _version_lock:
+        _versions[url] = (probed, time.monotonic())
+        if not probed and url not in _version_warned:
+            _version_warned.add(url)
+            logger.warning(f"⚠️ 无法从 {url}/info 取得模型版本，该后端的结构化结果不缓存（可设置 STRUCT_MODEL_VERSION）")
+    return probed
+
+def model_version() -> str:
+    """
+    读缓存用的模型版本：各后端报告的版本一致时返回该版本
+    :return: 版本不一（如滚动升级中）或未知时返回空串（此时不读缓存）
+    """
+    if STRUCT_MODEL_VERSION:
+        return STRUCT_MODEL_VERSION
+    if breaker.state == OPEN:  # 熔断期间不探测，避免额外等待
+        return ""
+    versions = {backend_version(backend.url) for backend in backend_pool.backends} - {""}
+    return versions.pop() if len(versions) == 1 else ""
+
+def _cache_key(version: str, addr_text: str, max_new_tokens: int) -> str:
+    if not version:
+        return ""
+    # prompt 模板变化同样使缓存失效
+    return make_key(version, build_prompt(""), max_new_tokens, normalize_address(addr_text))
+
+def cache_get(addr_text: str, max_new_tokens: int):
+    """:return: 缓存结果或 None"""
+    key = _cache_key(model_version(), addr_text, max_new_tokens) if struct_cache.enabled else ""
+    cached = struct_cache.get(key) if key else None
+    if cached is None:
+        return None
+    metrics.inc("struct_llm.cache.hit")
+    return json.loads(cached)
+
+def cache_set(addr_text: str, max_new_tokens: int, result: dict):
+    """按实际生成该结果的后端的模型版本写缓存；兜底结果与空结果不缓存"""
+    if not struct_cache.enabled or not result.get("tags") or result.get("fallback"):
+        return
+    key = _cache_key(backend_version(_served_by.get()), addr_text, max_new_tokens)
+    if key:
+        struct_cache.set(key, json.dumps({"text": result["text"], "tags": result["tags"]}, ensure_ascii=False))
+
+def infer(addr_text: str, max_new_tokens: int = 256, deadline: float = None):
+    """
+    :param deadline: 截止时刻（见 structure_deadline），调用方重试时传入同一值；已过期时直接本地兜底
+    """
+    if STRUCT_BACKEND == "tagger":
+        return tagger_infer(addr_text) or gazetteer_infer(addr_text)
+    cached = cache_get(addr_text, max_new_tokens)
+    if cached is not None:
+        return cached
+    timeout = _time_left(deadline)
+    if timeout == 0:
+        return _fallback(addr_text, "deadline")
+    result = _guarded_infer(addr_text, max_new_tokens, timeout)
+    cache_set(addr_text, max_new_tokens, result)
+    return result
+
+# -------------------- asyncio 版本 --------------------
+_async_clients = weakref.WeakKeyDictionary()  # 事件循环 → 客户端
+
+def _get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=STRUCT_LLM_TIMEOUT, limits=httpx.Limits(max_connections=200))
+        _async_clients[loop] = client
+    return client
+
+async def call_tgi_generate_async(prompt: str, max_new_tokens: int = 256, timeout: float = None) -> str:
+    payload = _tgi_payload(prompt, max_new_tokens)
+    deadline = time.monotonic() + (timeout or STRUCT_LLM_TIMEOUT)
+    tried = []
+    for attempt in range(_failover_attempts()):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException(f"TGI 调用超过时限 {timeout or STRUCT_LLM_TIMEOUT}s")
+        try:
+            with backend_pool.use(exclude=tried) as backend:
+                tried.append(backend)
+                resp = await _get_async_client().post(f"{backend.url}/generate", json=payload,
+                                                      headers=_tgi_headers(), timeout=remaining)
+                _check_response(resp)
+                gen = resp.json()["generated_text"]
+                _served_by.set(backend.url)
+                return gen
+        except (httpx.HTTPError, ValueError, KeyError, TypeError):
+            # 与同步版本一致：非 JSON（JSONDecodeError 属于 ValueError）或缺字段的响应同样换后端重试
+            if attempt + 1 >= _failover_attempts():
+                raise
+
+async def _guarded_infer_async(addr_text: str, max_new_tokens: int, timeout: float = None) -> dict:
+    # 本地兜底可能加载并运行 CPU 标注器，与缓存读写一样放到线程池
+    if not breaker.allow():
+        return await asyncio.to_thread(_fallback, addr_text, "open")
+    try:
+        prompt = build_prompt(addr_text)
+        gen = await call_tgi_generate_async(prompt, max_new_tokens=max_new_tokens, timeout=timeout)
+    except Exception as e:
+        return await asyncio.to_thread(_on_error, addr_text, e)
+    _record_outcome()
+    text = gen.strip()
+    tags = parse_xmlish_tags(text)
+    return {"text": text, "tags": tags}
+
+async def infer_async(addr_text: str, max_new_tokens: int = 256, deadline: float = None):
+    if STRUCT_BACKEND == "tagger":
+        # 标注器推理（及首次加载模型）是 CPU 计算，放到线程池
+        return await asyncio.to_thread(lambda: tagger_infer(addr_text) or gazetteer_infer(addr_text))
+    # 缓存读写（SQLite）与模型版本探测（同步 HTTP）放到线程池，不阻塞事件循环
+    cached = await asyncio.to_thread(cache_get, addr_text, max_new_tokens)
+    if cached is not None:
+        return cached
+    timeout = _time_left(deadline)
+    if timeout == 0:
+        return await asyncio.to_thread(_fallback, addr_text, "deadline")
+    result = await _guarded_infer_async(addr_text, max_new_tokens, timeout)
+    await asyncio.to_thread(cache_set, addr_text, max_new_tokens, result)  # to_thread 复制上下文，_served_by 随之传入
+    return result
+
+# -------------------- 流式版本 --------------------
+def call_tgi_generate_stream(prompt: str, max_new_tokens: int = 256, timeout: float = None):
+    """
+    逐 token 产出 TGI /generate_stream（SSE）的文本片段
+    已产出部分内容后无法换后端重试，因此流式调用不做故障转移
+    """
+    payload = _tgi_payload(prompt, max_new_tokens)
+    with backend_pool.use() as backend:
+        with _session.post(f"{backend.url}/generate_stream", json=payload, headers=_tgi_headers(),
+                           stream=True, timeout=timeout or STRUCT_LLM_TIMEOUT) as resp:
+            _check_response(resp)
+            _served_by.set(backend.url)
+            # SSE 响应头不带 charset，按行自行以 UTF-8 解码
+            for line in resp.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                token = json.loads(line[5:].decode("utf-8")).get("token") or {}
+                if not token.get("special"):
+                    yield token.get("text", "")
+
+def _stream_result(result: dict):
+    """把完整结果按标签逐个产出（缓存命中或兜底时使用）"""
+    parser = TagStreamParser()
+    for tag, value in parser.feed(result.get("text", "")) + parser.close():
+        yield {"tag": tag, "value": value}
+    yield {"done": True, **result}
+
+def infer_stream(addr_text: str, max_new_tokens: int = 256):
+    """
+    流式结构化：每解析出一个完整标签即产出 {"tag", "value"}，最后产出 {"done": True, "text", "tags"}
+    下游可在 district / poi 到达后提前发起检索，无需等待整段输出
+    尚未产出任何标签时的可重试错误与 infer 一样抛出；已产出部分标签后出错，最后一条为本地兜底的完整结果（带 fallback 标记）
+    """
+    if STRUCT_BACKEND == "tagger":
+        yield from _stream_result(tagger_infer(addr_text) or gazetteer_infer(addr_text))
+        return
+    cached = cache_get(addr_text, max_new_tokens)
+    if cached is not None:
+        yield from _stream_result(cached)
+        return
+    if not breaker.allow():
+        yield from _stream_result(_fallback(addr_text, "open"))
+        return
+
+    parser = TagStreamParser()
+    emitted = False
+    try:
+        for chunk in call_tgi_generate_stream(build_prompt(addr_text), max_new_tokens=max_new_tokens):
+            for tag, value in parser.feed(chunk):
+                emitted = True
+                yield {"tag": tag, "value": value}
+        for tag, value in parser.close():
+            yield {"tag": tag, "value": value}
+    except Exception as e:
+        if emitted:
+            # 下游可能已按部分标签发起检索，不能再让其整体重试
+            _record_outcome(e)
+            yield {"done": True, **_fallback(addr_text, "error", e)}
+        else:
+            yield {"done": True, **_on_error(addr_text, e)}
+        return
+    _record_outcome()
+    result = {"text": parser.text.strip(), "tags": parser.tags}
+    cache_set(addr_text, max_new_tokens, result)
+    yield {"done": True, **result}
+
 if __name__ == "__main__":
     q = "上海市徐汇区佳安公寓宛平南路000弄0号楼"
     res = infer(q, max_new_tokens=256)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对比多个 infer_serv 实例（如 GPU bf16 与 CPU int8）的单条地址延迟与吞吐
+
+用法：
+    INFER_DEVICE=cpu uvicorn lora.infer_serv:app --port 8001
+    python lora/bench_infer.py --urls http://127.0.0.1:8000 http://127.0.0.1:8001 --n 200 --concurrency 1 4
+说明：
+    1) 地址取自 events.jsonl 的 content_no_tag（固定 seed 抽样），各实例使用同一批地址，先预热 --warmup 条
+    2) 请求带 timing=true，同时汇总服务端的排队 / prefill / decode 耗时
+    3) 并发为 1 时反映单条延迟，并发更高时反映合批后的吞吐
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.metrics import percentile
+
+
+def load_addresses(path: str, n: int, seed: int) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        texts = [json.loads(line).get("content_no_tag", "") for line in f if line.strip()]
+    texts = [t for t in texts if t]
+    random.Random(seed).shuffle(texts)
+    return texts[:n]
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def bench(url: str, addresses: List[str], concurrency: int, max_new_tokens: int, timeout: float) -> Dict:
+    session = requests.Session()
+
+    def one(text: str):
+        start = time.perf_counter()
+        resp = session.post(f"{url}/infer", json={"text": text, "max_new_tokens": max_new_tokens, "timing": True},
+                            timeout=timeout)
+        resp.raise_for_status()
+        return (time.perf_counter() - start) * 1000, resp.json()
+
+    latencies, timings, tokens, errors = [], [], 0, 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for fut in [pool.submit(one, t) for t in addresses]:
+            try:
+                ms, body = fut.result()
+            except requests.RequestException:
+                errors += 1
+                continue
+            latencies.append(ms)
+            timings.append(body.get("timing") or {})
+            tokens += body.get("tokens", 0)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "n": len(latencies),
+        "errors": errors,
+        "mean_ms": round(_mean(latencies), 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "addr_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "tokens_per_s": round(tokens / elapsed, 1) if elapsed else 0.0,
+        "queue_ms": round(_mean([t.get("queue_ms", 0) for t in timings]), 1),
+        "prefill_ms": round(_mean([t.get("prefill_ms", 0) for t in timings]), 1),
+        "decode_ms": round(_mean([t.get("decode_ms", 0) for t in timings]), 1),
+    }
+
+
+def print_table(rows: List[Dict]):
+    cols = ["url", "concurrency", "n", "errors", "mean_ms", "p50_ms", "p95_ms", "p99_ms",
+            "addr_per_s", "tokens_per_s", "queue_ms", "prefill_ms", "decode_ms"]
+    print("\t".join(cols))
+    for row in rows:
+        print("\t".join(str(row[c]) for c in cols))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="infer_serv 延迟 / 吞吐对比")
+    ap.add_argument("--urls", nargs="+", default=["http://127.0.0.1:8000"], help="一个或多个 infer_serv 地址")
+    ap.add_argument("--data", default="lora/events.jsonl", help="events.jsonl 路径")
+    ap.add_argument("--n", type=int, default=100, help="每个实例、每档并发的请求条数")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1], help="并发档位，可给多个")
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--max_new_tokens", type=int, default=256)
+    ap.add_argument("--timeout", type=float, default=300)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default="", help="结果另存为 JSON")
+    args = ap.parse_args()
+
+    addresses = load_addresses(args.data, args.n + args.warmup, args.seed)
+    warmup, addresses = addresses[:args.warmup], addresses[args.warmup:]
+    rows = []
+    for url in args.urls:
+        if warmup:
+            bench(url, warmup, 1, args.max_new_tokens, args.timeout)
+        for c in args.concurrency:
+            rows.append(bench(url, addresses, c, args.max_new_tokens, args.timeout))
+            print(f"✅ {url} 并发 {c}：p50 {rows[-1]['p50_ms']} ms，{rows[-1]['addr_per_s']} 条/秒")
+    print_table(rows)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
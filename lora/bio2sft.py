@@ -20,25 +20,38 @@
 
 用法：
     python lora/bio2sft.py -i tianchi/dev.txt -o lora/sft.jsonl --seed 42
+    python lora/bio2sft.py -i big_corpus.txt -o lora/sft.jsonl --seed 42 --workers 8
 可选参数：
-    --instruction  自定义SFT指令文本（默认已给出）
+    --instruction  自定义SFT指令文本（默认按 --tag_format 取对应指令）
+    --tag_format   输出格式：xml（默认，<prov>..</prov>）或 compact（p=..|c=..，生成 token 更少）
     --seed         随机种子（保证“0 串替换”可复现）
     --no-strip     不去除input/output首尾空白（默认strip）
+    --workers      并行进程数（默认 1）；语料逐句流式读取、逐条写出，内存占用与语料大小无关
 说明：
     1) 实体类型输出顺序：["prov","city","district","town","community","poi","road","roadno"]；
        未知类型按首次出现顺序追加在末尾。
     2) 同一类型多段默认直接拼接（与原脚本保持一致）。
     3) “0 串替换”仅替换不与其他数字相连的连续 0（正则：(?<!\\d)0+(?!\\d)），
        且同一条样本内 input 与 output 对应长度一致替换。
+    4) 多进程只并行“分句 → input/output”，0 串替换仍在主进程按原顺序进行，
+       同一 seed 下输出与单进程完全一致。
 """
 
 import argparse
 import json
+import os
 import re
 import sys
 import random
 from collections import OrderedDict
-from typing import List, Tuple, Dict, Optional
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+from typing import Iterator, List, Tuple, Dict, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.tag_format import XML, FORMATS, format_tags, instruction
 
 # === 可配置的默认为空 ===
 ENTITY_ORDER = ["prov", "city", "district", "town", "community", "poi", "road", "roadno"]
@@ -47,27 +60,40 @@ ZERO_RUN_RE = re.compile(r'(?<!\d)0+(?!\d)')  # 仅匹配不与其他数字相
 TAG_RE = re.compile(r"^([BIES])\-(.+)$")      # 兼容 B/I/E/S-<type>
 
 # -------------------- 读取与解析 --------------------
-def parse_sentences(path: str) -> List[List[Tuple[str, str]]]:
-    """读取文件，按空行分句，返回 [ [(char, tag), ...], ... ]"""
-    sentences: List[List[Tuple[str, str]]] = []
-    cur: List[Tuple[str, str]] = []
+def iter_blocks(path: str) -> Iterator[str]:
+    """逐行流式读取，按空行分句，逐句产出原始文本块（交给子进程解析，进程间只传字符串）"""
+    cur: List[str] = []
     with open(path, "r", encoding="utf-8") as f:
-        for raw in f.read().splitlines():
-            line = raw.strip()
-            if not line:
-                if cur:
-                    sentences.append(cur)
-                    cur = []
-                continue
-            parts = line.split()
-            if len(parts) < 2:
-                # 异常行直接跳过
-                continue
-            ch, tag = parts[0], parts[1]
-            cur.append((ch, tag))
+        for raw in f:
+            if raw.strip():
+                cur.append(raw)
+            elif cur:
+                yield "".join(cur)
+                cur = []
     if cur:
-        sentences.append(cur)
-    return sentences
+        yield "".join(cur)
+
+def parse_block(block: str) -> List[Tuple[str, str]]:
+    """单句文本块 → [(char, tag), ...]"""
+    sent: List[Tuple[str, str]] = []
+    for raw in block.splitlines():
+        parts = raw.split()
+        if len(parts) < 2:
+            # 异常行直接跳过
+            continue
+        sent.append((parts[0], parts[1]))
+    return sent
+
+def iter_sentences(path: str) -> Iterator[List[Tuple[str, str]]]:
+    """逐句产出 [(char, tag), ...]"""
+    for block in iter_blocks(path):
+        sent = parse_block(block)
+        if sent:
+            yield sent
+
+def parse_sentences(path: str) -> List[List[Tuple[str, str]]]:
+    """读取文件，按空行分句，返回 [ [(char, tag), ...], ... ]（小文件用；大语料请用 iter_sentences）"""
+    return list(iter_sentences(path))
 
 # -------------------- BIO/BIES → 实体块 --------------------
 def bio_to_entities(tokens: List[Tuple[str, str]]) -> Tuple[Dict[str, str], List[str]]:
@@ -142,11 +168,12 @@ def bio_to_entities(tokens: List[Tuple[str, str]]) -> Tuple[Dict[str, str], List
     return entities, appear_order
 
 # -------------------- 构建全地址 & 标签串 --------------------
-def build_addr_and_tags(entities: Dict[str, str], appear_order: List[str]) -> Tuple[str, str, List[str]]:
+def build_addr_and_tags(entities: Dict[str, str], appear_order: List[str],
+                        tag_format: str = XML) -> Tuple[str, str, List[str]]:
     """
     返回：
       full_addr:  "按顺序拼接后的全地址"
-      tag_str:    "<t>...</t><t2>...</t2>..."
+      tag_str:    "<t>...</t><t2>...</t2>..."（compact 格式为 "t=...|t2=..."）
       ordered:    实际输出次序（known 后接 unknown）
     """
     known = [t for t in ENTITY_ORDER if t in entities]
@@ -154,7 +181,7 @@ def build_addr_and_tags(entities: Dict[str, str], appear_order: List[str]) -> Tu
     ordered_types = known + unknown
 
     full_addr = "".join(entities[t] for t in ordered_types if entities[t])
-    tag_str = "".join(f"<{t}>{entities[t]}</{t}>" for t in ordered_types if entities[t])
+    tag_str = format_tags(((t, entities[t]) for t in ordered_types), tag_format)
     return full_addr, tag_str, ordered_types
 
 # -------------------- “0 串一致替换” --------------------
@@ -190,44 +217,67 @@ def _replace_zero_runs(text: str, plan: Dict[int, str]) -> str:
     return ZERO_RUN_RE.sub(_repl, text)
 
 # -------------------- 主流程：BIO/BIES → SFT --------------------
+def block_to_pair(block: str, keep_ws: bool, tag_format: str = XML) -> Optional[Tuple[str, str]]:
+    """单句文本块 → (input, output)；无实体或缺字段时返回 None。不涉及随机数，可在子进程中执行"""
+    entities, appear_order = bio_to_entities(parse_block(block))
+    if not entities:
+        # 跳过无实体样本
+        return None
+
+    full_addr, tag_str, _ordered = build_addr_and_tags(entities, appear_order, tag_format)
+
+    inp = full_addr if keep_ws else full_addr.strip()
+    out = tag_str if keep_ws else tag_str.strip()
+    if not inp or not out:
+        # 缺必要字段则跳过
+        return None
+    return inp, out
+
 def convert_bio_to_sft(in_path: str,
                        out_path: str,
                        sft_instruction: str,
                        keep_ws: bool,
-                       seed: Optional[int]) -> None:
+                       seed: Optional[int],
+                       tag_format: str = XML,
+                       workers: int = 1,
+                       chunksize: int = 256) -> None:
     rng = random.Random(seed) if seed is not None else random.Random()
 
-    sents = parse_sentences(in_path)
     total, ok = 0, 0
+    to_pair = partial(block_to_pair, keep_ws=keep_ws, tag_format=tag_format)
+    pool = Pool(workers) if workers > 1 else None
+    blocks = iter_blocks(in_path)
+    if pool:
+        # imap 会一次性读空输入迭代器，按窗口分批提交以限制内存；窗口内保持输入顺序
+        window = workers * chunksize * 4
+        batches = iter(lambda: list(islice(blocks, window)), [])
+        pairs = (pair for batch in batches for pair in pool.imap(to_pair, batch, chunksize=chunksize))
+    else:
+        pairs = map(to_pair, blocks)
+
+    try:
+        with open(out_path, "w", encoding="utf-8") as fout:
+            for pair in pairs:
+                total += 1
+                if pair is None:
+                    continue
+                inp, out = pair
+                # 为该样本生成 0 串替换计划（保证 input/output 一致）；按原顺序在主进程消耗随机数
+                plan = _build_zero_plan(inp, out, rng)
+                inp2 = _replace_zero_runs(inp, plan)
+                out2 = _replace_zero_runs(out, plan)
 
-    with open(out_path, "w", encoding="utf-8") as fout:
-        for sent in sents:
-            total += 1
-            entities, appear_order = bio_to_entities(sent)
-            if not entities:
-                # 跳过无实体样本
-                continue
-
-            full_addr, tag_str, _ordered = build_addr_and_tags(entities, appear_order)
-
-            inp = full_addr if keep_ws else full_addr.strip()
-            out = tag_str if keep_ws else tag_str.strip()
-            if not inp or not out:
-                # 缺必要字段则跳过
-                continue
-
-            # 为该样本生成 0 串替换计划（保证 input/output 一致）
-            plan = _build_zero_plan(inp, out, rng)
-            inp2 = _replace_zero_runs(inp, plan)
-            out2 = _replace_zero_runs(out, plan)
-
-            sample = {
-                "instruction": sft_instruction,
-                "input": inp2,
-                "output": out2,
-            }
-            fout.write(json.dumps(sample, ensure_ascii=False) + "\n")
-            ok += 1
+                sample = {
+                    "instruction": sft_instruction,
+                    "input": inp2,
+                    "output": out2,
+                }
+                fout.write(json.dumps(sample, ensure_ascii=False) + "\n")
+                ok += 1
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
 
     print(f"[DONE] 读取 {total} 句，成功转换 {ok} 句；输出文件：{out_path}", file=sys.stderr)
 
@@ -236,13 +286,18 @@ def parse_args():
     ap = argparse.ArgumentParser(description="从 BIO/BIES 地址标注文本一步到位转换为 SFT JSONL")
     ap.add_argument("-i", "--input", required=True, help="输入 BIO/BIES 标注文本路径（空行分句）")
     ap.add_argument("-o", "--output", required=True, help="输出 SFT JSONL 文件路径")
-    ap.add_argument("--instruction",
-                    default="从以下地址文本中抽取要素，并按XML标签输出（只输出标签串）：",
-                    help="SFT 的 instruction 文本")
+    ap.add_argument("--instruction", default=None,
+                    help="SFT 的 instruction 文本（默认按 --tag_format 取对应指令）")
+    ap.add_argument("--tag_format", choices=FORMATS, default=XML,
+                    help="输出标签格式：xml 或 compact（须与推理端 STRUCT_TAG_FORMAT / TAG_FORMAT 一致）")
     ap.add_argument("--no-strip", action="store_true",
                     help="不去除 input/output 首尾空白（默认会 strip）")
     ap.add_argument("--seed", type=int, default=None,
                     help="随机种子（设置后使“0 串替换”可复现）")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="并行进程数（默认 1；输出与单进程一致）")
+    ap.add_argument("--chunksize", type=int, default=256,
+                    help="每次分发给子进程的句子数")
     return ap.parse_args()
 
 def main():
@@ -250,9 +305,12 @@ def main():
     convert_bio_to_sft(
         in_path=args.input,
         out_path=args.output,
-        sft_instruction=args.instruction,
+        sft_instruction=args.instruction or instruction(args.tag_format),
         keep_ws=args.no_strip,
-        seed=args.seed
+        seed=args.seed,
+        tag_format=args.tag_format,
+        workers=args.workers,
+        chunksize=args.chunksize,
     )
 
 if __name__ == "__main__":
@@ -12,17 +12,20 @@
     --xlsx lora/四级行政区划码表_20250901.xlsx \
     --out lora/sft_extend.jsonl
 """
-import argparse, json
+import argparse, json, os, sys
 import pandas as pd
 
-DEFAULT_INSTRUCTION = "从以下地址文本中抽取要素，并按XML标签输出（只输出标签串）："
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.tag_format import XML, FORMATS, format_tags, instruction
 
 def parse_args():
     ap = argparse.ArgumentParser()
     ap.add_argument("--xlsx", required=True, help="四级行政区划 Excel 文件路径")
     ap.add_argument("--sheet", default=None, help="工作表名（默认自动选择含有 p_name/c_name 等列的那个）")
     ap.add_argument("--out",   default="sft_extend.jsonl", help="输出 JSONL 路径")
-    ap.add_argument("--instruction", default=DEFAULT_INSTRUCTION, help="instruction 文本")
+    ap.add_argument("--instruction", default=None, help="instruction 文本（默认按 --tag_format 取对应指令）")
+    ap.add_argument("--tag_format", choices=FORMATS, default=XML, help="输出标签格式：xml 或 compact")
     ap.add_argument("--limit", type=int, default=0, help="仅导出前 N 条（0=不限制）")
     ap.add_argument("--drop-dup", action="store_true", help="对生成的 input 去重（默认不过滤）")
     return ap.parse_args()
@@ -44,18 +47,13 @@ def pick_sheet(xlsx_path, prefer=None):
     # 退而求其次：返回第一个
     return xls.sheet_names[0]
 
-def build_sample_row(p, c, d, t, instruction):
+def build_sample_row(p, c, d, t, instruction, tag_format=XML):
     # 输入文本：按你要求，直接拼接（省 + 市 + 区/县 + 街道/乡镇），允许省市同名重复
     parts_in = [p, c, d, t]
     input_text = "".join([x for x in parts_in if x])
 
     # 输出标签：只输出存在的标签，顺序固定
-    tags = []
-    if p: tags.append(f"<prov>{p}</prov>")
-    if c: tags.append(f"<city>{c}</city>")
-    if d: tags.append(f"<district>{d}</district>")
-    if t: tags.append(f"<town>{t}</town>")
-    output_text = "".join(tags)
+    output_text = format_tags([("prov", p), ("city", c), ("district", d), ("town", t)], tag_format)
 
     return {
         "instruction": instruction,
@@ -87,7 +85,7 @@ def main():
         # 若四级皆空则跳过
         if not (p or c or d or t):
             continue
-        samples.append(build_sample_row(p, c, d, t, args.instruction))
+        samples.append(build_sample_row(p, c, d, t, args.instruction or instruction(args.tag_format), args.tag_format))
 
     # 可选：对 input 去重（保留第一条）
     if args.drop_dup:
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+训练数据近似去重（MinHash + LSH，字符 shingle）
+
+用法：
+    python lora/dedup_minhash.py -i lora/events.jsonl -o lora/events.dedup.jsonl --report lora/dedup_report.json
+    python lora/dedup_minhash.py -i lora/train.jsonl -o lora/train.dedup.jsonl --threshold 0.85
+说明：
+    1) 支持 events.jsonl（content_no_tag）与 bio2sft / build_sft_from_adm 输出的 SFT JSONL（input），
+       默认按首条记录自动选择字段，可用 --field 指定
+    2) 按文件顺序处理，每个近似重复簇保留最先出现的一条，输出保持原行内容与顺序
+    3) 候选经精确 Jaccard 复核，--threshold 即字符 shingle 集合的 Jaccard 阈值
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.minhash import Deduper
+
+FIELDS = ("content_no_tag", "input")
+
+
+def detect_field(obj: dict) -> str:
+    for field in FIELDS:
+        if field in obj:
+            return field
+    raise ValueError(f"记录中没有可用于去重的字段（{' / '.join(FIELDS)}），请用 --field 指定")
+
+
+def dedup_file(args) -> dict:
+    deduper = Deduper(args.threshold, args.num_perm, args.shingle, args.seed)
+    field = args.field
+    texts, clusters = {}, {}
+    total = kept = 0
+    with open(args.input, "r", encoding="utf-8") as fin, open(args.output, "w", encoding="utf-8") as fout:
+        for line in fin:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            field = field or detect_field(obj)
+            text = obj.get(field) or ""
+            total += 1
+            dup = deduper.add(total, text)
+            if dup is None:
+                kept += 1
+                texts[total] = text
+                fout.write(line if line.endswith("\n") else line + "\n")
+            else:
+                rep, sim = dup
+                clusters.setdefault(rep, []).append({"line": total, "text": text, "jaccard": round(sim, 4)})
+            if args.progress and total % args.progress == 0:
+                print(f"[进度] 已处理 {total} 条，保留 {kept} 条", flush=True)
+
+    report = {
+        "input": args.input,
+        "field": field,
+        "threshold": args.threshold,
+        "num_perm": args.num_perm,
+        "shingle": args.shingle,
+        "total": total,
+        "kept": kept,
+        "removed": total - kept,
+        "clusters": sorted(
+            ({"line": rep, "text": texts[rep], "removed": dups} for rep, dups in clusters.items()),
+            key=lambda c: -len(c["removed"]),
+        ),
+    }
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MinHash/LSH 近似去重（events.jsonl / SFT JSONL）")
+    ap.add_argument("-i", "--input", required=True, help="输入 JSONL")
+    ap.add_argument("-o", "--output", required=True, help="去重后的 JSONL")
+    ap.add_argument("--report", default="", help="被删除簇的报告（JSON），按簇大小降序")
+    ap.add_argument("--field", default=None, help="参与比较的文本字段（默认自动：content_no_tag / input）")
+    ap.add_argument("--threshold", type=float, default=0.8, help="Jaccard 相似度阈值（0~1）")
+    ap.add_argument("--num_perm", type=int, default=128, help="MinHash 置换个数")
+    ap.add_argument("--shingle", type=int, default=3, help="字符 shingle 长度")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--progress", type=int, default=100000, help="每处理多少条打印一次进度（0 关闭）")
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    report = dedup_file(args)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 共 {report['total']} 条，保留 {report['kept']} 条，删除 {report['removed']} 条"
+          f"（{len(report['clusters'])} 个重复簇），耗时 {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化后端评估：在 events.jsonl 的验证集上回放，输出逐标签 P/R/F1、整条完全匹配率与吞吐 / 延迟分位数
+
+用法：
+    python lora/eval_struct.py --backend tgi --url http://127.0.0.1:8080 --concurrency 8
+    python lora/eval_struct.py --backend serv --url http://127.0.0.1:8000 --concurrency 1 4 16
+    python lora/eval_struct.py --backend local
+    python lora/eval_struct.py --backend tagger --tagger_model outputs/addr_tagger.json.gz
+后端：
+    tgi     struct_llm_call.infer（与主服务相同的提示词 / 解析 / 熔断兜底，默认关闭结果缓存）
+    serv    lora/infer_serv.py 的 /infer 接口
+    local   lora/infer.py 本地加载 LoRA 适配器（单卡，强制并发 1）
+    tagger  CPU 标注器 util/addr_tagger.py
+说明：
+    1) --split dev 时按与 train_tagger.py / eval_tagger.py 相同的 seed / dev_ratio 切分，只评估验证集
+    2) 按 (标签, 值) 集合比较，同名多值与 parse_xmlish_tags 一样去重；走了本地兜底的条数单独统计
+    3) 每个并发档位各回放一遍，准确率按各档分别统计（采样 / 合批可能影响输出）
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lora.eval_tagger import split_samples
+from util.addr_tagger import spans_from_tagged
+from util.metrics import percentile, prf
+
+BACKENDS = ("tgi", "serv", "local", "tagger")
+
+
+def load_gold(path: str) -> List[Tuple[str, Set[Tuple[str, str]]]]:
+    """读取 events.jsonl，返回 [(原文, {(tag, value)})]；过滤规则与 load_events 一致，切分结果相同"""
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            text, spans = spans_from_tagged(json.loads(line).get("content_tags", ""))
+            if text:
+                samples.append((text, {(tag, value.strip()) for tag, value in spans if tag != "O" and value.strip()}))
+    return samples
+
+
+def tag_pairs(tags: Dict) -> Set[Tuple[str, str]]:
+    """{"tag": 值 或 [值...]} → {(tag, value)}"""
+    pairs = set()
+    for tag, value in (tags or {}).items():
+        for v in value if isinstance(value, list) else [value]:
+            if isinstance(v, str) and v.strip():
+                pairs.add((tag, v.strip()))
+    return pairs
+
+
+def make_backend(args) -> Callable[[str], Dict]:
+    """:return: text → {"tags", 可选 "fallback" / "tokens" / "timing"}"""
+    if args.backend == "tagger":
+        from util.addr_tagger import AddressTagger
+        tagger = AddressTagger.load(args.tagger_model)
+        return tagger.tag
+
+    if args.backend == "tgi":
+        # 须在导入前设置：struct_llm_call 在导入时读取环境变量
+        if args.url:
+            os.environ["STRUCT_LLM_URL"] = args.url
+        os.environ["STRUCT_BACKEND"] = "tgi"
+        if not args.cache:
+            os.environ["STRUCT_CACHE_ENABLED"] = "false"
+        from func import struct_llm_call
+        return lambda text: struct_llm_call.infer(text, max_new_tokens=args.max_new_tokens)
+
+    if args.backend == "serv":
+        import requests
+        session = requests.Session()
+        url = (args.url or "http://127.0.0.1:8000").rstrip("/")
+
+        def call(text: str) -> Dict:
+            resp = session.post(f"{url}/infer", json={"text": text, "max_new_tokens": args.max_new_tokens,
+                                                      "timing": True}, timeout=args.timeout)
+            resp.raise_for_status()
+            return resp.json()
+        return call
+
+    from lora.infer import infer  # 导入即加载模型
+    from util.tag_format import parse_tags
+    return lambda text: {"tags": parse_tags(infer(text))}
+
+
+def evaluate(backend: Callable[[str], Dict], samples: List[Tuple[str, Set]], concurrency: int) -> Dict:
+    def one(text: str):
+        start = time.perf_counter()
+        result = backend(text)
+        return (time.perf_counter() - start) * 1000, result
+
+    tp, fp, fn = Counter(), Counter(), Counter()
+    exact = errors = fallbacks = tokens = 0
+    latencies, server = [], Counter()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(one, text) for text, _gold in samples]
+        for (_text, gold), fut in zip(samples, futures):
+            try:
+                ms, result = fut.result()
+            except Exception:
+                errors += 1
+                pred = set()
+            else:
+                latencies.append(ms)
+                pred = tag_pairs(result.get("tags"))
+                fallbacks += bool(result.get("fallback"))
+                tokens += result.get("tokens", 0)
+                for k, v in (result.get("timing") or {}).items():
+                    if k.endswith("_ms"):
+                        server[k] += v
+            exact += gold == pred
+            for tag, _v in gold & pred:
+                tp[tag] += 1
+            for tag, _v in pred - gold:
+                fp[tag] += 1
+            for tag, _v in gold - pred:
+                fn[tag] += 1
+    elapsed = time.perf_counter() - start
+
+    n_ok = max(1, len(latencies))
+    return {
+        "concurrency": concurrency,
+        "n": len(samples),
+        "errors": errors,
+        "fallbacks": fallbacks,
+        "per_tag": {tag: prf(tp[tag], fp[tag], fn[tag]) for tag in sorted(set(tp) | set(fp) | set(fn))},
+        "micro": prf(sum(tp.values()), sum(fp.values()), sum(fn.values())),
+        "exact_match": round(exact / max(1, len(samples)), 4),
+        "addr_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "tokens_per_s": round(tokens / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / n_ok, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "server_ms": {k: round(v / n_ok, 1) for k, v in sorted(server.items())},
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n== 并发 {report['concurrency']} ==")
+    print(f"{'tag':<16}{'P':>8}{'R':>8}{'F1':>8}{'support':>10}")
+    for tag, m in report["per_tag"].items():
+        print(f"{tag:<16}{m['p']:>8.4f}{m['r']:>8.4f}{m['f1']:>8.4f}{m['support']:>10}")
+    m = report["micro"]
+    print(f"{'micro':<16}{m['p']:>8.4f}{m['r']:>8.4f}{m['f1']:>8.4f}{m['support']:>10}")
+    print(f"完全匹配率：{report['exact_match']:.4f}  样本数：{report['n']}  失败：{report['errors']}  兜底：{report['fallbacks']}")
+    print(f"吞吐：{report['addr_per_s']} 条/秒  {report['tokens_per_s']} token/秒  "
+          f"延迟 mean/p50/p95/p99：{report['mean_ms']}/{report['p50_ms']}/{report['p95_ms']}/{report['p99_ms']} ms")
+    if report["server_ms"]:
+        print("服务端耗时：" + "  ".join(f"{k}={v}" for k, v in report["server_ms"].items()))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="结构化后端准确率与吞吐评估")
+    ap.add_argument("--backend", choices=BACKENDS, default="tgi")
+    ap.add_argument("--url", default="", help="tgi：覆盖 STRUCT_LLM_URL（逗号分隔多个）；serv：infer_serv 地址")
+    ap.add_argument("--tagger_model", default="outputs/addr_tagger.json.gz", help="tagger 后端的模型文件")
+    ap.add_argument("--data", default="lora/events.jsonl", help="events.jsonl 路径")
+    ap.add_argument("--split", choices=["dev", "all"], default="dev")
+    ap.add_argument("--dev_ratio", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--limit", type=int, default=0, help="只评估前 N 条（0 为全部）")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1], help="并发档位，可给多个")
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--max_new_tokens", type=int, default=256)
+    ap.add_argument("--timeout", type=float, default=300, help="serv 后端单条请求超时（秒）")
+    ap.add_argument("--cache", action="store_true", help="tgi 后端保留结构化结果缓存（默认关闭，避免命中缓存影响延迟）")
+    ap.add_argument("--out", default="", help="结果另存为 JSON")
+    args = ap.parse_args()
+
+    samples = load_gold(args.data)
+    if args.split == "dev":
+        _train, samples = split_samples(samples, args.dev_ratio, args.seed)
+    if args.limit:
+        samples = samples[:args.limit]
+
+    backend = make_backend(args)
+    for text, _gold in samples[:args.warmup]:
+        backend(text)
+
+    reports = []
+    for c in args.concurrency:
+        c = 1 if args.backend == "local" else c
+        reports.append(evaluate(backend, samples, c))
+        print_report(reports[-1])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"backend": args.backend, "url": args.url, "reports": reports}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估 CPU 地址标注器（util/addr_tagger.py）：逐标签的片段级 P/R/F1、整条完全匹配率与单条耗时
+
+用法：
+    python lora/eval_tagger.py --model outputs/addr_tagger.json.gz --data lora/events.jsonl --split dev --seed 42
+说明：
+    --split dev 时按与 train_tagger.py 相同的 seed / dev_ratio 切分，只评估验证集；--split all 评估全部样本
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.addr_tagger import AddressTagger, load_events, bio_to_spans
+from util.metrics import prf
+
+
+def split_samples(samples: list, dev_ratio: float, seed: int) -> Tuple[list, list]:
+    """固定 seed 打乱后切分 (train, dev)"""
+    samples = list(samples)
+    random.Random(seed).shuffle(samples)
+    n_dev = int(len(samples) * dev_ratio)
+    return samples[n_dev:], samples[:n_dev]
+
+
+def labeled_spans(text: str, labels: List[str]) -> set:
+    """带位置的片段集合 {(tag, start, end)}，用于片段级精确匹配"""
+    spans, prev_tag, start = set(), None, 0
+    for i, label in enumerate(labels + ["O"]):
+        prefix, _, tag = label.partition("-")
+        if prev_tag and not (prefix == "I" and tag == prev_tag):
+            spans.add((prev_tag, start, i))
+            prev_tag = None
+        if prefix in ("B", "I") and prev_tag is None:
+            prev_tag, start = tag, i
+    return spans
+
+
+def evaluate(tagger: AddressTagger, samples: List[Tuple[str, List[str]]]) -> Dict:
+    tp, fp, fn = Counter(), Counter(), Counter()
+    exact = 0
+    start = time.perf_counter()
+    for text, gold in samples:
+        pred = tagger.predict(text)
+        g, p = labeled_spans(text, gold), labeled_spans(text, pred)
+        exact += g == p
+        for tag, *_ in g & p:
+            tp[tag] += 1
+        for tag, *_ in p - g:
+            fp[tag] += 1
+        for tag, *_ in g - p:
+            fn[tag] += 1
+    elapsed = time.perf_counter() - start
+
+    per_tag = {tag: prf(tp[tag], fp[tag], fn[tag]) for tag in sorted(set(tp) | set(fp) | set(fn))}
+    return {
+        "per_tag": per_tag,
+        "micro": prf(sum(tp.values()), sum(fp.values()), sum(fn.values())),
+        "exact_match": round(exact / max(1, len(samples)), 4),
+        "ms_per_address": round(elapsed * 1000 / max(1, len(samples)), 3),
+        "n": len(samples),
+    }
+
+
+def print_report(report: Dict):
+    print(f"{'tag':<16}{'P':>8}{'R':>8}{'F1':>8}{'support':>10}")
+    for tag, m in report["per_tag"].items():
+        print(f"{tag:<16}{m['p']:>8.4f}{m['r']:>8.4f}{m['f1']:>8.4f}{m['support']:>10}")
+    m = report["micro"]
+    print(f"{'micro':<16}{m['p']:>8.4f}{m['r']:>8.4f}{m['f1']:>8.4f}{m['support']:>10}")
+    print(f"完全匹配率：{report['exact_match']:.4f}  单条耗时：{report['ms_per_address']} ms  样本数：{report['n']}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="评估 CPU 地址标注器")
+    ap.add_argument("--model", default="outputs/addr_tagger.json.gz", help="模型文件路径")
+    ap.add_argument("--data", default="lora/events.jsonl", help="events.jsonl 路径")
+    ap.add_argument("--split", choices=["dev", "all"], default="dev")
+    ap.add_argument("--dev_ratio", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    samples = load_events(args.data)
+    if args.split == "dev":
+        _train, samples = split_samples(samples, args.dev_ratio, args.seed)
+    print_report(evaluate(AddressTagger.load(args.model), samples))
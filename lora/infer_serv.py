@@ -1,35 +1,81 @@
 # server.py
-import os, asyncio, torch, re
+import os, sys, asyncio, time, json, resource, torch
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import (AutoTokenizer, AutoModelForCausalLM, DynamicCache, LogitsProcessor,
+                          LogitsProcessorList, TextIteratorStreamer)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.copy_constraint import CopyConstraint, VocabTrie, tokenizer_token_bytes
+from util.tag_stream import TagStreamParser
+from util.tag_format import XML, instruction, parse_tags
+from util import metrics
 
 # 离线 & 更稳的日志
 os.environ["HF_HUB_OFFLINE"] = "1"
 os.environ["TRANSFORMERS_OFFLINE"] = "1"
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 torch.set_grad_enabled(False)
-torch.backends.cuda.matmul.allow_tf32 = True  # 如果是 A100/H100 系列
 
-MERGED_DIR = "outputs/qwen3_8b_addr_merged"
-CONCURRENCY = 2  # 每次并发生成的最大请求数（按你的GPU能力调）
+MERGED_DIR = os.environ.get("MERGED_DIR", "outputs/qwen3_8b_addr_merged")  # 也可指向蒸馏后的小模型
+
+# 推理设备：cuda（bf16，多卡分片）或 cpu（fp32 权重 + 动态 int8 量化），默认有 GPU 时用 cuda
+INFER_DEVICE = os.environ.get("INFER_DEVICE", "cuda" if torch.cuda.is_available() else "cpu").lower()
+ON_CPU = INFER_DEVICE == "cpu"
+CPU_THREADS = int(os.environ.get("CPU_THREADS", "0"))  # CPU 模式下 torch 计算线程数，0 表示默认
+
+# 同时执行的批次数（GPU 按显存调；CPU 上一次 generate 已用满所有核，默认 1）
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "1" if ON_CPU else "2"))
+
+if ON_CPU:
+    if CPU_THREADS > 0:
+        torch.set_num_threads(CPU_THREADS)
+else:
+    torch.backends.cuda.matmul.allow_tf32 = True  # 如果是 A100/H100 系列
+
+# 动态批处理：请求先入队，后台调度器凑满 MAX_BATCH_SIZE 条或等待 MAX_WAIT_MS 后合并成一次 generate
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "10"))
+
+# 共享前缀 KV 缓存：固定指令部分只在启动时 prefill 一次，各请求只需 prefill 地址后缀
+PREFIX_CACHE = os.environ.get("PREFIX_CACHE", "true").lower() in ("1", "true", "yes")
+
+# 模型输出格式：xml 或 compact（见 util/tag_format.py），须与训练时 --tag_format 一致
+TAG_FORMAT = os.environ.get("TAG_FORMAT", XML).lower()
+
+# 约束解码：只允许已知标签与从输入拷贝的片段，输入拷贝完即输出 EOS；请求中的 constrained 字段可覆盖（仅 xml 格式）
+CONSTRAINED_DECODING = os.environ.get("CONSTRAINED_DECODING", "false").lower() in ("1", "true", "yes")
 
 # ---------- 1) 进程启动时只加载一次 ----------
 tok = AutoTokenizer.from_pretrained(MERGED_DIR, use_fast=False, trust_remote_code=True)
 if tok.pad_token_id is None:
     tok.pad_token = tok.eos_token
-tok.padding_side = "right"
+tok.padding_side = "left"  # 批量生成需左侧填充，保证各条生成位置对齐
+
+def load_model():
+    if not ON_CPU:
+        return AutoModelForCausalLM.from_pretrained(
+            MERGED_DIR,
+            torch_dtype=torch.bfloat16,
+            device_map="auto",                 # 多卡分片也可；单卡就改成 {"": 0}
+            trust_remote_code=True,
+        ).eval()
+    # CPU：全部 Linear 层做动态 int8 量化（权重 int8，激活运行时动态量化），解码的计算量主要在 Linear 层
+    fp32 = AutoModelForCausalLM.from_pretrained(
+        MERGED_DIR,
+        torch_dtype=torch.float32,
+        trust_remote_code=True,
+    ).eval()
+    return torch.ao.quantization.quantize_dynamic(fp32, {torch.nn.Linear}, dtype=torch.qint8)
 
-model = AutoModelForCausalLM.from_pretrained(
-    MERGED_DIR,
-    torch_dtype=torch.bfloat16,
-    device_map="auto",                 # 多卡分片也可；单卡就改成 {"": 0}
-    trust_remote_code=True,
-).eval()
+model = load_model()
 
 # ---------- 2) API ----------
 app = FastAPI()
-sema = asyncio.Semaphore(CONCURRENCY)
 
 class Req(BaseModel):
     text: str
@@ -37,65 +83,397 @@ class Req(BaseModel):
     do_sample: bool = False
     temperature: float = 0.7
     top_p: float = 0.9
+    constrained: Optional[bool] = None  # 为空时取 CONSTRAINED_DECODING
+    timing: bool = False                # 响应中附带 timing 字段（排队/prefill/decode 耗时）
 
-def build_prompt(addr_text: str) -> str:
-    return (
-        "从以下地址文本中抽取要素，并按XML标签输出（只输出标签串）：\n\n"
-        f"### 输入：{addr_text}\n### 输出： "
-    )
+class BatchReq(BaseModel):
+    texts: List[str]
+    max_new_tokens: int = 256
+    do_sample: bool = False
+    temperature: float = 0.7
+    top_p: float = 0.9
+    constrained: Optional[bool] = None
+    timing: bool = False
 
-_TAG_RE = re.compile(r"<([a-zA-Z0-9_]+)>(.*?)</\1>", re.DOTALL)
+# 所有请求共享的固定指令前缀（与 build_prompt 拼接结果一致）
+PROMPT_PREFIX = f"{instruction(TAG_FORMAT)}\n\n### 输入："
+
+def build_suffix(addr_text: str) -> str:
+    return f"{addr_text}\n### 输出： "
+
+def build_prompt(addr_text: str) -> str:
+    return PROMPT_PREFIX + build_suffix(addr_text)
 
 def parse_xmlish_tags(tag_text: str) -> dict:
     """
-    将形如 <prov>浙江</prov><city>杭州市</city> 的串解析为 dict。
+    将形如 <prov>浙江</prov><city>杭州市</city>（或 compact 的 p=浙江|c=杭州市）的串解析为 dict。
     - 同一标签出现多次 → 合并为 list，保持去重与顺序稳定
     - 值做 strip()，其余原样保留
     """
-    result = {}
-    for m in _TAG_RE.finditer(tag_text or ""):
-        k = m.group(1).strip()
-        v = m.group(2).strip()
-        if not k:
-            continue
-        if k not in result:
-            result[k] = v
-        else:
-            # 已有同名键：升格为 list，并去重
-            if isinstance(result[k], list):
-                if v not in result[k]:
-                    result[k].append(v)
+    return parse_tags(tag_text)
+
+# ---------- 3) 共享前缀 KV 缓存 ----------
+def _input_device():
+    # 关键：把输入送到嵌入层所在的设备（分片模型下不要用 model.device）
+    return model.get_input_embeddings().weight.device
+
+def _build_prefix_cache():
+    """
+    预先 prefill 固定指令前缀，返回 (前缀 token ids, legacy KV 元组)
+    前缀单独分词与整串分词在边界处不一致时返回 None（回退为整串 prefill）
+    """
+    prefix_ids = tok(PROMPT_PREFIX, add_special_tokens=False).input_ids
+    joint = tok(build_prompt("浙江省杭州市西湖区文三路"), add_special_tokens=False).input_ids
+    if joint[:len(prefix_ids)] != prefix_ids:
+        print("⚠️ 指令前缀分词边界不稳定，关闭共享前缀 KV 缓存")
+        return None
+    with torch.inference_mode():
+        out = model(input_ids=torch.tensor([prefix_ids], device=_input_device()), use_cache=True)
+    cache = out.past_key_values
+    legacy = cache.to_legacy_cache() if hasattr(cache, "to_legacy_cache") else cache
+    return prefix_ids, legacy
+
+prefix_cache = _build_prefix_cache() if PREFIX_CACHE else None
+
+def _expand_prefix_cache(batch: int) -> DynamicCache:
+    """把单条前缀 KV 复制为 batch 份（generate 会原地追加，每次调用需新副本）"""
+    _ids, legacy = prefix_cache
+    return DynamicCache.from_legacy_cache(tuple(
+        (k.expand(batch, -1, -1, -1).contiguous(), v.expand(batch, -1, -1, -1).contiguous())
+        for k, v in legacy
+    ))
+
+def encode_batch(texts: list) -> dict:
+    """
+    批量编码，返回 generate 的输入
+    - 有前缀缓存：[前缀][pad...][后缀]，填充放在前缀与后缀之间，使前缀在所有行中位置一致可共享 KV；
+      position_ids 由 generate 根据 attention_mask 累加得到，后缀位置与无填充时相同
+    - 无前缀缓存：整串左侧填充
+    """
+    device = _input_device()
+    if prefix_cache is None:
+        inputs = tok([build_prompt(t) for t in texts], return_tensors="pt", padding=True, add_special_tokens=False)
+        return {k: v.to(device) for k, v in inputs.items()}
+
+    prefix_ids, _legacy = prefix_cache
+    suffixes = [tok(build_suffix(t), add_special_tokens=False).input_ids for t in texts]
+    width = max(len(x) for x in suffixes)
+    input_ids, attention_mask = [], []
+    for ids in suffixes:
+        pad = width - len(ids)
+        input_ids.append(prefix_ids + [tok.pad_token_id] * pad + ids)
+        attention_mask.append([1] * len(prefix_ids) + [0] * pad + [1] * len(ids))
+    return {
+        "input_ids": torch.tensor(input_ids, device=device),
+        "attention_mask": torch.tensor(attention_mask, device=device),
+        "past_key_values": _expand_prefix_cache(len(texts)),
+    }
+
+# ---------- 4) 约束解码 ----------
+_vocab = None
+
+def get_vocab():
+    """(token 字节表, 词表前缀树)，首次使用时构建（约数秒）"""
+    global _vocab
+    if _vocab is None:
+        token_bytes = tokenizer_token_bytes(tok)
+        _vocab = (token_bytes, VocabTrie(token_bytes))
+    return _vocab
+
+class CopyOnlyLogitsProcessor(LogitsProcessor):
+    """
+    逐行维护 CopyConstraint 状态，把不合法 token 的 logits 置为 -inf
+    :param texts: 与 batch 行对应的地址原文
+    :param prompt_len: 输入长度，其后为已生成的 token
+    """
+
+    def __init__(self, texts: list, prompt_len: int):
+        self.token_bytes, self.trie = get_vocab()
+        self.constraints = [CopyConstraint(t) for t in texts]
+        self.states = [c.start for c in self.constraints]
+        self.seen = [0] * len(texts)
+        self.memo = [{} for _ in texts]
+        self.prompt_len = prompt_len
+
+    def _advance(self, i: int, generated: list):
+        state, c = self.states[i], self.constraints[i]
+        for tid in generated[self.seen[i]:]:
+            if state is None:
+                break
+            # 已结束（EOS）或越出文法的行只再允许 EOS；特殊 token 不在字节表中，按非法字节处理
+            state = None if tid == tok.eos_token_id else c.feed(state, self.token_bytes.get(tid, b"\xff"))
+        self.states[i], self.seen[i] = state, len(generated)
+        return state
+
+    def __call__(self, input_ids, scores):
+        for i in range(scores.shape[0]):
+            state = self._advance(i, input_ids[i, self.prompt_len:].tolist())
+            if state is None:
+                allowed = [tok.eos_token_id]
             else:
-                if v != result[k]:
-                    result[k] = [result[k], v]
-                # 若与已有完全相同，忽略
-    return result
+                allowed = self.memo[i].get(state)
+                if allowed is None:
+                    allowed = self.memo[i][state] = self.trie.allowed(self.constraints[i], state, tok.eos_token_id)
+            keep = torch.tensor(allowed, device=scores.device)
+            row = torch.full_like(scores[i], float("-inf"))
+            row[keep] = scores[i, keep]
+            scores[i] = row
+        return scores
+
+if CONSTRAINED_DECODING:
+    get_vocab()
+
+class TimingProcessor(LogitsProcessor):
+    """不改动 logits，仅记录首次被调用的时刻：此时 prefill 刚结束，之后为逐 token 的 decode"""
+
+    def __init__(self):
+        self.first_call = None
+
+    def __call__(self, input_ids, scores):
+        if self.first_call is None:
+            self.first_call = time.perf_counter()
+        return scores
+
+def is_constrained(req: Req) -> bool:
+    if TAG_FORMAT != XML:  # 约束文法按 xml 标签编写
+        return False
+    return CONSTRAINED_DECODING if req.constrained is None else req.constrained
+
+# ---------- 5) 批量生成（在线程池中执行，不阻塞事件循环） ----------
+def generate_batch(reqs: list, streamer=None) -> list:
+    """
+    一批采样参数相同的请求合并为一次 generate
+    :param streamer: 流式输出（仅单条请求时使用）
+    :return: 与 reqs 同序的 {"text", "tags", "tokens", "timing"}，timing 由调用方按需保留
+    """
+    start = time.perf_counter()
+    inputs = encode_batch([r.text for r in reqs])
+    first = reqs[0]
+    prompt_len = inputs["input_ids"].shape[1]
+    timer = TimingProcessor()
+    processors = LogitsProcessorList([timer])
+    if is_constrained(first):
+        processors.append(CopyOnlyLogitsProcessor([r.text for r in reqs], prompt_len))
+
+    with torch.inference_mode():
+        out = model.generate(
+            **inputs,
+            max_new_tokens=max(r.max_new_tokens for r in reqs),
+            do_sample=first.do_sample,
+            temperature=first.temperature if first.do_sample else None,
+            top_p=first.top_p if first.do_sample else None,
+            min_new_tokens=1,
+            eos_token_id=tok.eos_token_id,
+            pad_token_id=tok.pad_token_id,
+            logits_processor=processors,
+            streamer=streamer,
+        )
+
+    end = time.perf_counter()
+    prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+    results, generated = [], 0
+    for i, r in enumerate(reqs):
+        gen_ids = out[i, prompt_len:][: r.max_new_tokens].tolist()
+        # 截到第一个 EOS（其后为批内其他请求未结束时补的 pad）
+        if tok.eos_token_id in gen_ids:
+            gen_ids = gen_ids[: gen_ids.index(tok.eos_token_id) + 1]
+        generated += len(gen_ids)
+        ans = tok.decode(gen_ids, skip_special_tokens=True).strip()
+        results.append({"text": ans, "tags": parse_xmlish_tags(ans), "tokens": prompt_tokens[i] + len(gen_ids)})
+
+    prefill_end = timer.first_call or end
+    timing = {
+        "prefill_ms": round((prefill_end - start) * 1000, 2),
+        "decode_ms": round((end - prefill_end) * 1000, 2),
+        "batch_size": len(reqs),
+    }
+    metrics.observe("infer.batch_size", len(reqs))
+    metrics.observe("infer.prefill_ms", timing["prefill_ms"])
+    metrics.observe("infer.decode_ms", timing["decode_ms"])
+    metrics.inc("infer.prompt_tokens", sum(prompt_tokens))
+    metrics.inc("infer.generated_tokens", generated)
+    if end > prefill_end:
+        metrics.observe("infer.decode_tokens_per_s", round(generated / (end - prefill_end), 2))
+    for res in results:
+        res["timing"] = dict(timing)
+    return results
+
+def finish(req: Req, result: dict, queue_ms: float) -> dict:
+    """补齐排队耗时；未要求 timing 的请求去掉该字段"""
+    metrics.observe("infer.queue_wait_ms", queue_ms)
+    if not req.timing:
+        return {k: v for k, v in result.items() if k != "timing"}
+    return {**result, "timing": {"queue_ms": queue_ms, **result["timing"]}}
+
+class BatchScheduler:
+    """
+    后台批处理调度器：
+    - 请求入队后等待结果；调度协程取出队首请求，在 MAX_WAIT_MS 内继续收集，至多 MAX_BATCH_SIZE 条
+    - 采样参数或约束解码开关不同的请求分组后各自成批
+    - generate 在线程池中执行，最多 CONCURRENCY 个批次同时在途
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: float, concurrency: int):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max(1, concurrency))
+        self.executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="generate")
+        self.task = None
+        self.inflight = 0  # 正在执行的批次数
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, req: Req) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((req, fut, time.perf_counter()))
+        metrics.set_gauge("infer.queue_depth", self.queue.qsize())
+        return await fut
+
+    async def acquire_slot(self):
+        """等待 GPU 并发槽位并记录等待时间"""
+        start = time.perf_counter()
+        await self.slots.acquire()
+        self.inflight += 1
+        metrics.observe("infer.slot_wait_ms", round((time.perf_counter() - start) * 1000, 2))
+        metrics.set_gauge("infer.inflight_batches", self.inflight)
+
+    def release_slot(self):
+        self.inflight -= 1
+        metrics.set_gauge("infer.inflight_batches", self.inflight)
+        self.slots.release()
+
+    async def _collect(self) -> list:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            groups = {}
+            metrics.set_gauge("infer.queue_depth", self.queue.qsize())
+            for req, fut, enqueued in batch:
+                sampling = (req.do_sample, req.temperature, req.top_p) if req.do_sample else (False,)
+                key = sampling + (is_constrained(req),)
+                groups.setdefault(key, []).append((req, fut, enqueued))
+            for group in groups.values():
+                await self.acquire_slot()
+                asyncio.create_task(self._dispatch(group))
+
+    async def _dispatch(self, group: list):
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.executor, generate_batch, [req for req, _fut, _t in group])
+        except Exception as e:
+            metrics.inc("infer.errors")
+            for _req, fut, _t in group:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for (req, fut, enqueued), res in zip(group, results):
+                if not fut.done():
+                    fut.set_result(finish(req, res, round((started - enqueued) * 1000, 2)))
+        finally:
+            self.release_slot()
+
+scheduler = BatchScheduler(MAX_BATCH_SIZE, MAX_WAIT_MS, CONCURRENCY)
+
+@app.on_event("startup")
+async def _start_scheduler():
+    scheduler.start()
+
+@app.get("/health")
+async def health():
+    """存活探测（与 TGI 相同路径）：结构化客户端的 BackendPool 据此把摘除的实例重新加入"""
+    return {}
+
+def model_sha(model_dir: str) -> str:
+    """模型目录指纹：各文件名、大小与修改时间的 sha1（目录内权重被替换即变化）"""
+    import hashlib
+    h = hashlib.sha1()
+    for root, _dirs, files in sorted(os.walk(model_dir)):
+        for name in sorted(files):
+            st = os.stat(os.path.join(root, name))
+            h.update(f"{os.path.relpath(os.path.join(root, name), model_dir)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+MODEL_INFO = {"model_id": os.path.basename(os.path.normpath(MERGED_DIR)), "model_sha": model_sha(MERGED_DIR)}
+
+@app.get("/info")
+async def info():
+    """模型标识（字段与 TGI /info 一致），结构化客户端以 model_id@model_sha 作为缓存版本"""
+    return MODEL_INFO
 
 @app.post("/infer")
 async def infer(req: Req):
-    prompt = build_prompt(req.text)
-
-    async with sema:  # 简单的并发限制
-        inputs = tok(prompt, return_tensors="pt", add_special_tokens=False)
-        # 关键：把输入送到嵌入层所在的设备（分片模型下不要用 model.device）
-        device = model.get_input_embeddings().weight.device
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-
-        with torch.inference_mode():
-            out = model.generate(
-                **inputs,
-                max_new_tokens=req.max_new_tokens,
-                do_sample=req.do_sample,
-                temperature=req.temperature if req.do_sample else None,
-                top_p=req.top_p if req.do_sample else None,
-                min_new_tokens=1,
-                eos_token_id=tok.eos_token_id,
-                pad_token_id=tok.pad_token_id,
-            )
-        full = tok.decode(out[0], skip_special_tokens=True)
-        ans = full.split("### 输出：", 1)[-1].strip()
-        tags = parse_xmlish_tags(ans)
-        return {"text": ans, "tags": tags, "tokens": len(out[0])}
+    return await scheduler.submit(req)
+
+@app.post("/infer_batch")
+async def infer_batch(req: BatchReq):
+    """多条地址一次提交，逐条入队由调度器合批；results 与 texts 同序"""
+    params = req.model_dump(exclude={"texts"})
+    results = await asyncio.gather(*(scheduler.submit(Req(text=t, **params)) for t in req.texts))
+    return {"results": list(results)}
+
+def _generate_streaming(req: Req, streamer: TextIteratorStreamer) -> dict:
+    try:
+        return generate_batch([req], streamer=streamer)[0]
+    finally:
+        streamer.end()  # 出错时也要结束迭代，避免读取端一直等待
+
+async def _stream_tags(req: Req):
+    streamer = TextIteratorStreamer(tok, skip_prompt=True, skip_special_tokens=True)
+    # 与调度器共用并发槽位，流式请求同样计入 CONCURRENCY
+    enqueued = time.perf_counter()
+    await scheduler.acquire_slot()
+    queue_ms = round((time.perf_counter() - enqueued) * 1000, 2)
+    loop = asyncio.get_running_loop()
+    job = loop.run_in_executor(scheduler.executor, _generate_streaming, req, streamer)
+    job.add_done_callback(lambda _f: scheduler.release_slot())
+    parser = TagStreamParser()
+    while True:
+        chunk = await asyncio.to_thread(next, streamer, None)
+        if chunk is None:
+            break
+        for tag, value in parser.feed(chunk):
+            yield json.dumps({"tag": tag, "value": value}, ensure_ascii=False) + "\n"
+    for tag, value in parser.close():
+        yield json.dumps({"tag": tag, "value": value}, ensure_ascii=False) + "\n"
+    result = finish(req, await job, queue_ms)
+    yield json.dumps({"done": True, **result}, ensure_ascii=False) + "\n"
+
+@app.post("/infer_stream")
+async def infer_stream(req: Req):
+    """NDJSON 流：每解析出一个完整标签输出一行 {"tag", "value"}，最后一行为 {"done": true, "text", "tags", "tokens"}"""
+    return StreamingResponse(_stream_tags(req), media_type="application/x-ndjson")
+
+def memory_gauges():
+    """显存（各 GPU 当前/峰值，MB）与进程峰值常驻内存（MB）"""
+    if torch.cuda.is_available():
+        for i in range(torch.cuda.device_count()):
+            metrics.set_gauge(f"infer.cuda{i}.allocated_mb", round(torch.cuda.memory_allocated(i) / 2**20, 1))
+            metrics.set_gauge(f"infer.cuda{i}.max_allocated_mb", round(torch.cuda.max_memory_allocated(i) / 2**20, 1))
+    # Linux 下 ru_maxrss 单位为 KB
+    metrics.set_gauge("infer.max_rss_mb", round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1))
+
+@app.get("/metrics")
+async def get_metrics():
+    """计数器、仪表与直方图（count/mean/max/p50/p95/p99）快照，用于调整 CONCURRENCY、MAX_BATCH_SIZE"""
+    metrics.set_gauge("infer.queue_depth", scheduler.queue.qsize())
+    memory_gauges()
+    return metrics.snapshot()
 
 # 运行：单进程单 worker（避免多进程重复占显存）
 # uvicorn server:app --host 0.0.0.0 --port 8000
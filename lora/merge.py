@@ -1,34 +1,180 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, torch
+"""
+把 LoRA 适配器合并回基座，输出整模型
+
+python lora/merge.py --adapter outputs/qwen3_8b_addr_qlora/checkpoint-100 --out outputs/qwen3_8b_addr_merged
+
+# 低内存：逐个 safetensors 分片读入、按层叠加 LoRA 增量并立即写出，峰值内存约为一个分片
+python lora/merge.py --adapter outputs/qwen3_8b_addr_qlora/checkpoint-100 --out outputs/qwen3_8b_addr_merged --stream
+"""
+import argparse, json, os, re, shutil, torch
 from transformers import AutoTokenizer
-from peft import AutoPeftModelForCausalLM
 
 # 彻底离线
 os.environ["HF_HUB_OFFLINE"] = "1"
 os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
-ADAPTER = "outputs/qwen3_8b_addr_qlora/checkpoint-100"   # ← 用你要合并的 ckpt（100/117 二选一）
-SAVE_DIR = "outputs/qwen3_8b_addr_merged"
-
-# 1) 用“适配器目录”里的 tokenizer（训练时已保存，避免去拉 base 的 tokenizer）
-tok = AutoTokenizer.from_pretrained(
-    ADAPTER, use_fast=False, trust_remote_code=True, local_files_only=True
-)
-
-# 2) 直接从适配器加载基座+LoRA（AutoPeft 会读取 adapter_config.json 的 base_model_name_or_path）
-#    local_files_only=True 会只用本地缓存，不做任何网络请求
-model = AutoPeftModelForCausalLM.from_pretrained(
-    ADAPTER,
-    device_map="cpu",                 # 合并在 CPU，内存需 ~16GB（8B-bf16）
-    dtype=torch.bfloat16,
-    trust_remote_code=True,
-    local_files_only=True,
-)
-
-# 3) 合并 LoRA 回基座并保存为“纯整模型”
-model = model.merge_and_unload()
-model.save_pretrained(SAVE_DIR, safe_serialization=True, max_shard_size="4GB")
-tok.save_pretrained(SAVE_DIR)
-
-print("Merged to:", SAVE_DIR)
+DTYPES = {"bfloat16": torch.bfloat16, "float16": torch.float16, "float32": torch.float32}
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="合并 LoRA 适配器")
+    ap.add_argument("--adapter", default="outputs/qwen3_8b_addr_qlora/checkpoint-100", help="适配器（checkpoint）目录")
+    ap.add_argument("--out", default="outputs/qwen3_8b_addr_merged")
+    ap.add_argument("--base", default=None, help="基座模型目录或名称，仅 --stream 使用（默认取 adapter_config.json 的 base_model_name_or_path）")
+    ap.add_argument("--dtype", choices=list(DTYPES), default="bfloat16", help="输出权重精度")
+    ap.add_argument("--stream", action="store_true", help="逐分片流式合并，不整体加载模型")
+    return ap.parse_args()
+
+def merge_full(args):
+    """整模型加载后 merge_and_unload，合并在 CPU 上执行，内存需 ~16GB（8B-bf16）"""
+    from peft import AutoPeftModelForCausalLM
+
+    # 直接从适配器加载基座+LoRA（AutoPeft 会读取 adapter_config.json 的 base_model_name_or_path）
+    # local_files_only=True 会只用本地缓存，不做任何网络请求
+    model = AutoPeftModelForCausalLM.from_pretrained(
+        args.adapter,
+        device_map="cpu",
+        dtype=DTYPES[args.dtype],
+        trust_remote_code=True,
+        local_files_only=True,
+    )
+    model = model.merge_and_unload()
+    model.save_pretrained(args.out, safe_serialization=True, max_shard_size="4GB")
+
+# ===================== 流式合并 =====================
+
+def resolve_base_dir(base: str) -> str:
+    """本地目录直接使用，否则从 HF 本地缓存中定位快照目录（不联网）"""
+    if os.path.isdir(base):
+        return base
+    from huggingface_hub import snapshot_download
+    return snapshot_download(base, local_files_only=True)
+
+def _pattern_value(patterns: dict, module: str, default):
+    """rank_pattern / alpha_pattern：与 PEFT 相同，按模块名后缀匹配"""
+    for key, value in (patterns or {}).items():
+        if re.match(rf"(.*\.)?{key}$", module):
+            return value
+    return default
+
+def load_lora_deltas(adapter_dir: str):
+    """
+    读取适配器权重（体积很小，可整体载入）
+    :return: ({基座权重名: (A, B, scale)}, {基座权重名: 整体替换的张量（modules_to_save）}, fan_in_fan_out)
+    """
+    from safetensors.torch import load_file
+
+    with open(os.path.join(adapter_dir, "adapter_config.json"), "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    if cfg.get("use_dora"):
+        raise ValueError("流式合并暂不支持 DoRA，请去掉 --stream 使用整模型合并")
+
+    tensors = load_file(os.path.join(adapter_dir, "adapter_model.safetensors"))
+    lora_a, lora_b, replace = {}, {}, {}
+    for key, tensor in tensors.items():
+        name = key.removeprefix("base_model.model.")
+        if ".lora_A." in name:
+            lora_a[name.split(".lora_A.")[0]] = tensor
+        elif ".lora_B." in name:
+            lora_b[name.split(".lora_B.")[0]] = tensor
+        elif ".modules_to_save." in name:
+            replace[re.sub(r"\.modules_to_save(\.default)?\.", ".", name)] = tensor
+        else:
+            raise ValueError(f"流式合并不支持的适配器权重：{key}，请去掉 --stream 使用整模型合并")
+
+    deltas = {}
+    for module, a in lora_a.items():
+        r = _pattern_value(cfg.get("rank_pattern"), module, cfg["r"])
+        alpha = _pattern_value(cfg.get("alpha_pattern"), module, cfg["lora_alpha"])
+        scale = alpha / (r ** 0.5) if cfg.get("use_rslora") else alpha / r
+        deltas[f"{module}.weight"] = (a, lora_b[module], scale)
+    return deltas, replace, bool(cfg.get("fan_in_fan_out"))
+
+def base_shards(base_dir: str):
+    """:return: (分片文件名列表, weight_map 或 None)"""
+    index_path = os.path.join(base_dir, "model.safetensors.index.json")
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            weight_map = json.load(f)["weight_map"]
+        return sorted(set(weight_map.values())), weight_map
+    if os.path.exists(os.path.join(base_dir, "model.safetensors")):
+        return ["model.safetensors"], None
+    raise FileNotFoundError(f"{base_dir} 下没有 safetensors 权重")
+
+def merge_stream(args, base: str):
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+
+    base_dir = resolve_base_dir(base)
+    deltas, replace, fan_in_fan_out = load_lora_deltas(args.adapter)
+    shards, weight_map = base_shards(base_dir)
+    dtype = DTYPES[args.dtype]
+    os.makedirs(args.out, exist_ok=True)
+
+    merged, total_size = set(), 0
+    for i, shard in enumerate(shards, 1):
+        out = {}
+        with safe_open(os.path.join(base_dir, shard), framework="pt") as f:
+            for key in f.keys():
+                if key in replace:
+                    tensor = replace[key]
+                    merged.add(key)
+                else:
+                    tensor = f.get_tensor(key)
+                if key in deltas:
+                    # 在 fp32 中计算 W + scale · B@A，再转回输出精度
+                    a, b, scale = deltas[key]
+                    delta = (b.float() @ a.float()) * scale
+                    tensor = tensor.float() + (delta.T if fan_in_fan_out else delta)
+                    merged.add(key)
+                if tensor.is_floating_point():
+                    tensor = tensor.to(dtype)
+                out[key] = tensor.contiguous()
+        total_size += sum(t.numel() * t.element_size() for t in out.values())
+        save_file(out, os.path.join(args.out, shard), metadata={"format": "pt"})
+        print(f">> [{i}/{len(shards)}] {shard}：{len(out)} 个张量", flush=True)
+        del out
+
+    missing = (set(deltas) | set(replace)) - merged
+    if missing:
+        raise KeyError(f"适配器中有 {len(missing)} 个权重在基座中找不到，例如：{sorted(missing)[:3]}")
+
+    if weight_map is not None:
+        with open(os.path.join(args.out, "model.safetensors.index.json"), "w", encoding="utf-8") as f:
+            json.dump({"metadata": {"total_size": total_size}, "weight_map": weight_map}, f, indent=2)
+
+    # 模型配置沿用基座，精度改为输出精度
+    for name in ("config.json", "generation_config.json"):
+        src = os.path.join(base_dir, name)
+        if os.path.exists(src):
+            shutil.copy(src, os.path.join(args.out, name))
+    config_path = os.path.join(args.out, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        config.pop("quantization_config", None)
+        config["torch_dtype"] = args.dtype
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+
+def main():
+    args = parse_args()
+    base = args.base
+    if base is None:
+        with open(os.path.join(args.adapter, "adapter_config.json"), "r", encoding="utf-8") as f:
+            base = json.load(f)["base_model_name_or_path"]
+
+    # 用“适配器目录”里的 tokenizer（训练时已保存，避免去拉 base 的 tokenizer）
+    tok = AutoTokenizer.from_pretrained(
+        args.adapter, use_fast=False, trust_remote_code=True, local_files_only=True
+    )
+    if args.stream:
+        merge_stream(args, base)
+    else:
+        merge_full(args)
+    tok.save_pretrained(args.out)
+    print("Merged to:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,23 @@
 """
 CUDA_VISIBLE_DEVICES=0,1 torchrun --nproc_per_node=2 lora/train_hf_qlora.py \
   --data lora/sft.jsonl --bf16
+
+# 地址样本很短，打包 + 按长度分组可大幅减少填充（打包需 flash-attn，按 position_ids 隔离样本边界）
+CUDA_VISIBLE_DEVICES=0,1 torchrun --nproc_per_node=2 lora/train_hf_qlora.py \
+  --data lora/sft.jsonl --bf16 --packing --attn_impl flash_attention_2 --group_by_length
 """
-import argparse, os, torch
-from datasets import load_dataset
+import argparse, hashlib, inspect, json, os, shutil, sys, time, torch
+import datasets, trl
+from datasets import load_dataset, load_from_disk
 from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 from transformers.trainer_callback import TrainerCallback
 from peft import LoraConfig, prepare_model_for_kbit_training
 from trl import SFTTrainer, SFTConfig
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from util.tag_format import FORMATS, INSTRUCTIONS, TAG_CODES, convert, instruction
+
 def parse_args():
     ap = argparse.ArgumentParser()
     ap.add_argument("--model", default="Qwen/Qwen3-8B", help="基座模型或本地路径")
@@ -26,6 +35,16 @@ def parse_args():
     ap.add_argument("--lora_alpha", type=int, default=32)
     ap.add_argument("--lora_dropout", type=float, default=0.05)
     ap.add_argument("--bf16", action="store_true", help="开启 bfloat16 训练")
+    ap.add_argument("--tag_format", choices=FORMATS, default=None,
+                    help="把样本 output 统一转换为 xml 或 compact 格式并替换为对应 instruction（默认保持数据原样）")
+    ap.add_argument("--packing", action="store_true",
+                    help="把多条 prompt/completion 打包进一条 max_len 序列（padding-free，样本间注意力隔离需 flash_attention_2）")
+    ap.add_argument("--group_by_length", action="store_true", help="按长度分组采样，减少批内填充")
+    ap.add_argument("--attn_impl", default=None,
+                    help="注意力实现：eager / sdpa / flash_attention_2（默认由 transformers 自动选择）")
+    ap.add_argument("--dataset_cache", default="outputs/sft_cache",
+                    help="分词（及打包）后的数据集缓存目录，按数据/分词器/提示格式哈希分子目录")
+    ap.add_argument("--no_dataset_cache", action="store_true", help="不读写数据集缓存，每次重新预处理")
     return ap.parse_args()
 
 def is_main_process() -> bool:
@@ -37,14 +56,74 @@ def build_bnb_config():
         bnb_4bit_use_double_quant=True, bnb_4bit_compute_dtype=torch.bfloat16
     )
 
-def to_prompt_completion(example):
+def to_prompt_completion(example, tag_format=None):
     instr = (example.get("instruction") or "").strip()
     inp   = (example.get("input") or "").strip()
     out   = (example.get("output") or "").strip()
+    if tag_format:
+        # 现有 xml 数据可直接转为 compact 训练，推理端需设置相同的 STRUCT_TAG_FORMAT / TAG_FORMAT
+        instr, out = instruction(tag_format), convert(out, tag_format)
     prompt     = f"{instr}\n\n### 输入：{inp}"
     completion = f"### 输出：{out}"
     return {"prompt": prompt, "completion": completion}
 
+def load_sft_datasets(args):
+    """读取 JSONL 并转换为 prompt/completion；返回 (train_ds, val_ds)"""
+    ds = load_dataset("json", data_files=args.data, split="train")
+    fmt_kwargs = {"tag_format": args.tag_format}
+    if 0.0 < args.val_ratio < 1.0:
+        ds = ds.train_test_split(test_size=args.val_ratio, seed=42)
+        train_ds = ds["train"].map(to_prompt_completion, fn_kwargs=fmt_kwargs, remove_columns=ds["train"].column_names)
+        val_ds   = ds["test"].map(to_prompt_completion, fn_kwargs=fmt_kwargs, remove_columns=ds["test"].column_names)
+    else:
+        train_ds = ds.map(to_prompt_completion, fn_kwargs=fmt_kwargs, remove_columns=ds.column_names)
+        val_ds   = None
+    return train_ds, val_ds
+
+def dataset_cache_key(args, tokenizer) -> str:
+    """
+    缓存键：数据文件内容 + 分词器（名称/词表/特殊 token）+ 提示格式（to_prompt_completion 源码、instruction、标签代码）
+    + 影响预处理结果的参数（val_ratio/max_len/packing）+ datasets/trl 版本；任一变化即换目录重新预处理
+    """
+    h = hashlib.sha256()
+    with open(args.data, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    vocab = hashlib.sha256(json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False).encode("utf-8"))
+    meta = {
+        "data": h.hexdigest(),
+        "tokenizer": [tokenizer.name_or_path, type(tokenizer).__name__, vocab.hexdigest(),
+                      tokenizer.eos_token, tokenizer.pad_token, tokenizer.padding_side],
+        "prompt": inspect.getsource(to_prompt_completion),
+        "tag_format": [args.tag_format, INSTRUCTIONS, TAG_CODES],
+        "preprocess": [args.val_ratio, args.max_len, args.packing],
+        "versions": [datasets.__version__, trl.__version__],
+    }
+    return hashlib.sha256(json.dumps(meta, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def load_cached_datasets(path: str):
+    """命中缓存时返回 (train_ds, val_ds, 原始训练样本数)；Arrow 文件按内存映射打开，不会整体读入内存"""
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    train_ds = load_from_disk(os.path.join(path, "train"))
+    val_ds = load_from_disk(os.path.join(path, "eval")) if meta["has_eval"] else None
+    return train_ds, val_ds, meta["n_samples"]
+
+def save_cached_datasets(path: str, train_ds, val_ds, n_samples: int):
+    """先写临时目录再改名，中途失败不会留下半成品缓存"""
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    train_ds.save_to_disk(os.path.join(tmp, "train"))
+    if val_ds is not None:
+        val_ds.save_to_disk(os.path.join(tmp, "eval"))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"has_eval": val_ds is not None, "n_samples": n_samples}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
 class ProgressPrinter(TrainerCallback):
     """在 on_log 钩子里打印关键信息；仅 rank0 输出。"""
     def on_log(self, args, state, control, logs=None, **kwargs):
@@ -56,6 +135,19 @@ class ProgressPrinter(TrainerCallback):
         if parts:
             print(f"[step {step}] " + " | ".join(parts), flush=True)
 
+def count_tokens(dataset) -> int:
+    """数据集中的有效 token 数（SFTTrainer 分词/打包后的 input_ids，不含填充）"""
+    if dataset is None or "input_ids" not in dataset.column_names:
+        return 0
+    return sum(len(ids) for ids in dataset["input_ids"])
+
+def report_throughput(n_samples: int, n_tokens: int, epochs: float, runtime: float):
+    """按原始样本数与有效 token 数计算吞吐（打包后 HF 的 train_samples_per_second 统计的是打包序列）"""
+    if not is_main_process() or runtime <= 0:
+        return
+    print(f">> 训练耗时（含评估） {runtime:.1f}s，样本/s={n_samples * epochs / runtime:.2f}，"
+          f"有效 token/s={n_tokens * epochs / runtime:.1f}", flush=True)
+
 def main():
     args = parse_args()
     bnb_config = build_bnb_config()
@@ -68,12 +160,17 @@ def main():
         tokenizer.pad_token = tokenizer.eos_token
     tokenizer.padding_side = "right"
 
+    if args.packing and args.attn_impl != "flash_attention_2" and is_main_process():
+        print(">> ⚠️ packing 未使用 flash_attention_2，打包在一起的样本之间可能互相可见")
+
     if is_main_process(): print(">> 加载基座模型（4-bit QLoRA）")
+    model_kwargs = {"attn_implementation": args.attn_impl} if args.attn_impl else {}
     model = AutoModelForCausalLM.from_pretrained(
         args.model,
         quantization_config=bnb_config,
         trust_remote_code=True,
         low_cpu_mem_usage=True,
+        **model_kwargs,
     )
     model.config.use_cache = False
     model = prepare_model_for_kbit_training(                  # ✅ 只在这里启用/配置 ckpt
@@ -82,16 +179,6 @@ def main():
         gradient_checkpointing_kwargs={"use_reentrant": False},
     )
 
-    if is_main_process(): print(">> 读取并转换数据为 prompt/completion")
-    ds = load_dataset("json", data_files=args.data, split="train")
-    if 0.0 < args.val_ratio < 1.0:
-        ds = ds.train_test_split(test_size=args.val_ratio, seed=42)
-        train_ds = ds["train"].map(to_prompt_completion, remove_columns=ds["train"].column_names)
-        val_ds   = ds["test"].map(to_prompt_completion,  remove_columns=ds["test"].column_names)
-    else:
-        train_ds = ds.map(to_prompt_completion, remove_columns=ds.column_names)
-        val_ds   = None
-
     if is_main_process(): print(">> 配置 LoRA")
     peft_cfg = LoraConfig(
         r=args.lora_r, lora_alpha=args.lora_alpha, lora_dropout=args.lora_dropout,
@@ -99,18 +186,7 @@ def main():
         target_modules=["q_proj","k_proj","v_proj","o_proj","gate_proj","up_proj","down_proj"],
     )
 
-    # === 计算总优化步 & 建议步频 ===
-    world_size = int(os.environ.get("WORLD_SIZE", "1"))
-    micro_bsz = args.bsz
-    gbs = micro_bsz * world_size * args.grad_accum  # 全局 batch size
-    steps_per_epoch = max(1, len(train_ds) // gbs)
-    total_steps = steps_per_epoch * args.epochs
-    interval = max(1, total_steps // 20)  # 约 20 个点
-
-    if is_main_process():
-        print(f">> gbs={gbs}, steps/epoch={steps_per_epoch}, total_steps={total_steps}, "
-            f"log/eval/save every {interval} steps")
-    
+    has_val = 0.0 < args.val_ratio < 1.0
     sft_cfg = SFTConfig(
         output_dir=args.out,
         per_device_train_batch_size=args.bsz,
@@ -126,8 +202,8 @@ def main():
         logging_first_step=True,
         disable_tqdm=False, # 保留 tqdm 进度条
 
-        eval_strategy="steps" if val_ds is not None else "no",  # ✅ 别漏
-        eval_steps=20 if val_ds is not None else None,
+        eval_strategy="steps" if has_val else "no",  # ✅ 别漏
+        eval_steps=20 if has_val else None,
 
         save_strategy="steps",
         save_steps=20,
@@ -138,23 +214,60 @@ def main():
         bf16=args.bf16,
         fp16=not args.bf16,
         max_length=args.max_len,
-        packing=False,
+        packing=args.packing,
+        padding_free=args.packing,         # 打包后不再填充，按 position_ids 区分样本
+        group_by_length=args.group_by_length,
         completion_only_loss=True,
         ddp_find_unused_parameters=False,  # ✅ 建议：LoRA 任务更稳
     )
 
-    if is_main_process(): print(">> 构建 Trainer 并训练")
-    trainer = SFTTrainer(
-        model=model,
-        args=sft_cfg,
-        processing_class=tokenizer,
-        peft_config=peft_cfg,
-        train_dataset=train_ds,
-        eval_dataset=val_ds,
-    )
+    cache_path = None
+    if not args.no_dataset_cache:
+        cache_path = os.path.join(args.dataset_cache, dataset_cache_key(args, tokenizer))
+
+    # rank0 先完成预处理并写缓存，其余 rank 随后直接映射缓存，不再重复分词/打包
+    with sft_cfg.main_process_first(desc="SFT 数据预处理"):
+        cached = load_cached_datasets(cache_path) if cache_path else None
+        if cached:
+            if is_main_process(): print(">> 命中数据集缓存：", cache_path)
+            train_ds, val_ds, n_samples = cached
+            sft_cfg.dataset_kwargs = {"skip_prepare_dataset": True}  # 已是分词（及打包）后的结果
+        else:
+            if is_main_process(): print(">> 读取并转换数据为 prompt/completion")
+            train_ds, val_ds = load_sft_datasets(args)
+            n_samples = len(train_ds)
+
+        if is_main_process(): print(">> 构建 Trainer")
+        trainer = SFTTrainer(
+            model=model,
+            args=sft_cfg,
+            processing_class=tokenizer,
+            peft_config=peft_cfg,
+            train_dataset=train_ds,
+            eval_dataset=val_ds,
+        )
+        if cache_path and not cached and is_main_process():
+            save_cached_datasets(cache_path, trainer.train_dataset, trainer.eval_dataset, n_samples)
+            print(">> 数据集缓存已写入：", cache_path)
     trainer.add_callback(ProgressPrinter())  # ✅ 关键：显式打印 step/loss/lr
 
+    # === 计算总优化步 & 建议步频 ===
+    world_size = int(os.environ.get("WORLD_SIZE", "1"))
+    micro_bsz = args.bsz
+    gbs = micro_bsz * world_size * args.grad_accum  # 全局 batch size
+    steps_per_epoch = max(1, n_samples // gbs)  # 打包时实际步数更少（多条样本合为一条序列）
+    total_steps = steps_per_epoch * args.epochs
+    interval = max(1, total_steps // 20)  # 约 20 个点
+
+    if is_main_process():
+        print(f">> gbs={gbs}, steps/epoch={steps_per_epoch}, total_steps={total_steps}, "
+            f"log/eval/save every {interval} steps")
+        print(">> 开始训练")
+
+    n_tokens = count_tokens(trainer.train_dataset)
+    start = time.perf_counter()
     trainer.train()
+    report_throughput(n_samples, n_tokens, args.epochs, time.perf_counter() - start)
     if is_main_process():
         print(">> 保存 LoRA 适配器与分词器")
     trainer.save_model(args.out)
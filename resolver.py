@@ -3,13 +3,24 @@ import requests
 import json
 import logging,time,os,sys
 import re
+import asyncio
 from typing import Dict, List, Any
 from util.address_db import search_address
 from util.similarity import score_main_tokens, core_keyword_overlap_ratio
-from config import logger
-from func.amap_call import amap_inputtips, amap_geocode, amap_around_search, amap_poi_search, regeo
-from func.qwen_call import call_qwen
-from func.struct_llm_call import infer
+from util.local_regeo import regeo_local
+from util.gazetteer import explicit_regions, first_region
+from util.auxiliary import score_auxiliary, parse_location, distance_m
+from util.tag_format import TAG_CODES
+from util.stages import StageRunner, RETRYABLE
+from config import logger, AMAP_BATCH_ENABLED, REGEO_BOUNDARY_PATH, REGEO_AMAP_FALLBACK, AUX_TOP_K
+from config import STAGE_RETRIES, STAGE_BACKOFF_MS, STAGE_BACKOFF_MAX_MS, STAGE_RETRY_BUDGETS
+from func.amap_call import amap_inputtips, amap_inputtips_batch, amap_geocode, amap_around_search, amap_poi_search, regeo
+from func.amap_call import (
+    amap_inputtips_async, amap_inputtips_batch_async, amap_geocode_async,
+    amap_around_search_async, amap_poi_search_async, regeo_async
+)
+from func.qwen_call import call_qwen, call_qwen_async
+from func.struct_llm_call import infer, infer_async, fallback_infer, structure_deadline
 
 
 def get_best_poi(pois: List[Dict], keyword: str, threshold: float = 70.0) -> Dict | None:
@@ -46,30 +57,36 @@ def get_best_poi(pois: List[Dict], keyword: str, threshold: float = 70.0) -> Dic
         return None
 
 
-def judge_best_by_auxiliary(anchor_location: str, candidates: List[Dict], auxiliary: str) -> List[Dict]:
+def rank_auxiliary_candidates(anchor_location: str, candidates: List[Dict], top_k: int = AUX_TOP_K) -> List[Dict]:
     """
-    使用大模型判断每个候选 POI 与辅助描述的匹配程度，为每个候选添加 auxiliary_score 字段（0~100）。
-    :param anchor_location: 锚点坐标 (lng, lat)
-    :param candidates: 候选 POI 列表，要求每个含有 location 字段
-    :param auxiliary: 用户输入中的辅助字段，如“西北角”“往东走100米”“对面”等
-    :return: 更新后的 candidates，每个包含 auxiliary_score 字段
+    大模型打分前预筛候选：按名称去重（打分结果以名称为键），按与锚点的距离升序取前 top_k 个
+    :return: 送入 prompt 的候选；未入选的候选辅助分记为 0
     """
-    poi_list = [{c["name"]: c["location"]} for c in candidates]
-    prompt = f"""已知参考点坐标为 {anchor_location}，用户描述为“{auxiliary}”，
+    anchor = parse_location(anchor_location)
+    ranked = {}
+    for poi in candidates:
+        name, location = poi.get("name"), parse_location(poi.get("location", ""))
+        if not name or location is None or name in ranked:
+            continue
+        ranked[name] = (distance_m(anchor, location) if anchor else 0.0, poi)
+    ordered = [poi for _d, poi in sorted(ranked.values(), key=lambda x: x[0])]
+    return ordered[:max(1, top_k)]
+
+
+def build_auxiliary_prompt(anchor_location: str, candidates: List[Dict], auxiliary: str) -> str:
+    # 紧凑序列化（无缩进、无多余空格），候选较多时显著减少 prompt token 数
+    poi_map = {c["name"]: c["location"] for c in candidates}
+    return f"""已知参考点坐标为 {anchor_location}，用户描述为“{auxiliary}”，
 下列是候选 POI 的名称和经纬度，请你判断哪个最可能是用户所指的目标，并为每个候选项打一个匹配分数（0-100）。
-输出格式如下（JSON）：
-{{
-  "名称1": 85,
-  "名称2": 20,
-  ...
-}}
+输出格式如下（JSON）：{{"名称1":85,"名称2":20,...}}
 候选列表：
-{json.dumps(poi_list, ensure_ascii=False, indent=2)}
+{json.dumps(poi_map, ensure_ascii=False, separators=(",", ":"))}
 请严格按照 JSON 格式返回：
 """
 
-    response = call_qwen(prompt)
 
+def apply_auxiliary_scores(candidates: List[Dict], response: str) -> List[Dict]:
+    """解析大模型打分结果，写入每个候选的 auxiliary_score 字段"""
     try:
         score_map = json.loads(response)
         logger.info(f"🎯 大模型辅助打分结果：{score_map}")
@@ -84,24 +101,41 @@ def judge_best_by_auxiliary(anchor_location: str, candidates: List[Dict], auxili
     return candidates
 
 
-def search_nearby_by_fields(city: str, fields: Dict) -> List[Dict]:
+def apply_local_auxiliary(anchor_location: str, candidates: List[Dict], auxiliary: str) -> bool:
     """
-    根据结构化字段执行周边搜索（Fallback）
-    优先使用 AP 字段作为定位锚点，结合 U/AP/I 字段提取关键词搜索周边，
-    并结合 I 字段辅助位置信息调用大模型判断各个 POI 的匹配程度。
-    :param city: 城市名
-    :param fields: 包含结构字段的字典（AP, U, I等）
-    :return: POI 列表，每个 POI 包含 auxiliary_score 字段（0~100）
+    方位/距离类描述（“西北角”“往东走100米”“对面”等）直接按几何关系本地打分
+    :return: 是否已完成打分；无法解析的描述返回 False，交由大模型判断
     """
-    anchor = fields.get("D")
-    logger.info(f"{city} 搜索锚点（D）: {anchor}")
+    scores = score_auxiliary(anchor_location, candidates, auxiliary)
+    if scores is None:
+        return False
+    for poi, score in zip(candidates, scores):
+        poi["auxiliary_score"] = score
+    logger.info(f"🧭 本地方位打分：{ {p.get('name', ''): p['auxiliary_score'] for p in candidates} }")
+    return True
 
-    loc = amap_geocode(city, anchor) # type: ignore
-    print(f"锚点位置：{loc}")
-    if not loc:
-        logger.error("❌ AP锚点定位失败")
-        return []
 
+def judge_best_by_auxiliary(anchor_location: str, candidates: List[Dict], auxiliary: str) -> List[Dict]:
+    """
+    判断每个候选 POI 与辅助描述的匹配程度，为每个候选添加 auxiliary_score 字段（0~100）。
+    可本地解析的方位/距离描述按几何关系打分，其余描述调用大模型。
+    :param anchor_location: 锚点坐标 (lng, lat)
+    :param candidates: 候选 POI 列表，要求每个含有 location 字段
+    :param auxiliary: 用户输入中的辅助字段，如“西北角”“往东走100米”“对面”等
+    :return: 更新后的 candidates，每个包含 auxiliary_score 字段
+    """
+    if apply_local_auxiliary(anchor_location, candidates, auxiliary):
+        return candidates
+    shortlist = rank_auxiliary_candidates(anchor_location, candidates, top_k=AUX_TOP_K)
+    if not shortlist:
+        return apply_auxiliary_scores(candidates, "{}")
+    prompt = build_auxiliary_prompt(anchor_location, shortlist, auxiliary)
+    response = call_qwen(prompt)
+    return apply_auxiliary_scores(candidates, response)
+
+
+def nearby_keywords(fields: Dict) -> List[str]:
+    """从 AP/U/I 字段提取周边搜索关键词"""
     unit = fields.get("U", "")
     ap = fields.get("AP", "")
     auxiliary = fields.get("I", "")
@@ -131,6 +165,29 @@ def search_nearby_by_fields(city: str, fields: Dict) -> List[Dict]:
         keywords.append("楼")
 
     logger.info(f"🔍 周边搜索关键词候选: {keywords}")
+    return keywords
+
+
+def search_nearby_by_fields(city: str, fields: Dict) -> List[Dict]:
+    """
+    根据结构化字段执行周边搜索（Fallback）
+    优先使用 AP 字段作为定位锚点，结合 U/AP/I 字段提取关键词搜索周边，
+    并结合 I 字段辅助位置信息调用大模型判断各个 POI 的匹配程度。
+    :param city: 城市名
+    :param fields: 包含结构字段的字典（AP, U, I等）
+    :return: POI 列表，每个 POI 包含 auxiliary_score 字段（0~100）
+    """
+    anchor = fields.get("D")
+    logger.info(f"{city} 搜索锚点（D）: {anchor}")
+
+    loc = amap_geocode(city, anchor) # type: ignore
+    print(f"锚点位置：{loc}")
+    if not loc:
+        logger.error("❌ AP锚点定位失败")
+        return []
+
+    auxiliary = fields.get("I", "")
+    keywords = nearby_keywords(fields)
 
     # 多关键词尝试
     pois = []
@@ -210,6 +267,10 @@ def merge_pois(*poi_lists) -> List:
 pattern = re.compile(r'([\u4e00-\u9fa5]{2,20}?(市|地区|自治州|盟|县|自治县|旗|自治旗|林区|特区|区))')
 
 def extract_first_region(text: str) -> str:
+    # 优先使用行政区划词典（可由乡镇反推区县），词典未识别时退回正则
+    region = first_region(text)
+    if region:
+        return region
     match = pattern.search(text)
     if match:
         return match.group(1)
@@ -218,12 +279,9 @@ def extract_first_region(text: str) -> str:
 def build_structured_fields(raw_address: str, structured: Any) -> Dict[str, str]:
     fields = {"C": "", "D": "", "AP": "", "U": "", "I": "", "T": ""}
 
-    if not isinstance(structured, dict):
-        return fields
-
-    tags = structured.get("tags")
+    tags = structured.get("tags") if isinstance(structured, dict) else None
     if not isinstance(tags, dict):
-        return fields
+        tags = {}
 
     alias_to_field = {
         "prov": "C",
@@ -247,6 +305,8 @@ def build_structured_fields(raw_address: str, structured: Any) -> Dict[str, str]
         "distance": "I",
         "direction": "I",
     }
+    # compact 格式的单字母代码（一般已在解析时还原为标签名，这里兜底）
+    alias_to_field.update({code: alias_to_field[tag] for tag, code in TAG_CODES.items() if tag in alias_to_field})
 
     collected: Dict[str, List[str]] = {"C": [], "D": [], "AP": [], "U": [], "I": [], "T": []}
 
@@ -277,77 +337,96 @@ def build_structured_fields(raw_address: str, structured: Any) -> Dict[str, str]
             else:
                 fields[field] = "".join(collected[field])
 
+    # 结构化未给出行政区划时，用本地行政区划词典从原始地址补全 C / D
+    # 只取原文中明确出现且无同名歧义的区划：C 参与打分，误补会把所有候选判为 0 分
+    if not fields["C"] or not fields["D"]:
+        regions = explicit_regions(raw_address)
+        if not fields["C"]:
+            fields["C"] = regions["city"] or regions["prov"]
+        if not fields["D"]:
+            fields["D"] = regions["district"] + regions["town"]
+
     return fields
 
-def resolve_address(raw_address: str) -> Dict:
+def new_stages() -> StageRunner:
+    """每次解析请求新建一个阶段执行器：阶段结果在请求内记忆，失败只重试该阶段"""
+    return StageRunner(retries=STAGE_RETRIES, backoff_ms=STAGE_BACKOFF_MS,
+                       max_backoff_ms=STAGE_BACKOFF_MAX_MS, budgets=STAGE_RETRY_BUDGETS)
+
+def inputtips_many(queries: List[tuple], stages: StageRunner = None) -> List[List[Dict]]:
     """
-    地址智能解析主流程：结构化、搜索、匹配
-    :param raw_address: 原始地址字符串
-    :return: 匹配到的最佳 POI 信息（字典）
+    执行多个相互独立的输入提示查询；开启 AMAP_BATCH_ENABLED 时合并为一次批量请求
+    :param queries: [(city, keyword, type), ...]
+    :param stages: 所属请求的阶段执行器（单个查询失败只重试该查询）
+    :return: 与 queries 顺序一致的 POI 列表
     """
-    start_time = time.time()  # ✅ 启动计时
-    logger.info(f"0. 输入地址：{raw_address}")
+    stages = stages or new_stages()
+    if AMAP_BATCH_ENABLED and len(queries) > 1:
+        logger.info(f"合并 {len(queries)} 个兜底查询为一次高德批量请求")
+        return stages.run("inputtips_batch", amap_inputtips_batch, queries)
+    return [stages.run("inputtips", amap_inputtips, city, keyword, type) for city, keyword, type in queries]
 
-    '''1. 先查私有地址库'''
+def get_regeo(location: str) -> Dict:
+    """
+    乡镇街道信息：优先使用本地边界数据，未命中时按配置回退高德逆地理编码
+    :param location: "lng,lat"
+    """
+    info = regeo_local(location, REGEO_BOUNDARY_PATH)
+    if info:
+        logger.info(f"本地逆地理编码命中：{info.get('township', '')}")
+        return info
+    return regeo(location) if REGEO_AMAP_FALLBACK else {}
+
+def match_private_address(raw_address: str, start_time: float) -> Dict | None:
+    """私有地址库召回，命中时补全结果字段"""
     logger.info("1. 私有地址库匹配")
     private_matches = search_address(query=raw_address, page=1, page_size=3)
-    if private_matches:
-        best = private_matches[0]
-        best["location"] = f"{best['lng']},{best['lat']}"  # 补充 location 字段
-        best["source"] = "custom"
-        best["score"] = 100.0
-        best["similarity"] = 100.0
-        best["auxiliary"] = 0.0
-        best["duration"] = round(time.time() - start_time, 2)
-        logger.info(f"✅ 命中私有地址库：{best['name']} | {best['address']}")
-        return best
-
-    '''2. 快速 POI 搜索匹配（使用高德 POI 搜索 + 相似度）'''
-    logger.info("2. 快速搜索匹配（amap_poi_search）")
-    pois = amap_poi_search("", raw_address)
-    best_fast = get_best_poi(pois, raw_address) # type: ignore 
-
-    # 存在分数超过70的结果
-    if best_fast:
-        best_fast["regeo"] = regeo(best_fast["location"]) # 乡镇一级信息匹配
-        best_fast["duration"] = round(time.time() - start_time, 2)
-        return best_fast
+    if not private_matches:
+        return None
 
-    '''3. 地址结构化'''
-    logger.info("3. 地址结构化")
-    structured = infer(raw_address)
+    best = private_matches[0]
+    best["location"] = f"{best['lng']},{best['lat']}"  # 补充 location 字段
+    best["source"] = "custom"
+    best["score"] = 100.0
+    best["similarity"] = 100.0
+    best["auxiliary"] = 0.0
+    best["duration"] = round(time.time() - start_time, 2)
+    logger.info(f"✅ 命中私有地址库：{best['name']} | {best['address']}")
+    return best
 
+def prepare_fields(raw_address: str, structured: Any) -> tuple:
+    """
+    由结构化结果生成字段与标准化地址
+    :return: (fields, normalize_address)
+    """
     logger.info(f"大模型返回结构化结果：{structured}")
     fields = build_structured_fields(raw_address, structured)
-    city = fields.get("C", "")
     d = fields.get("D", "")
     ap = fields.get("AP", "")
-    t = fields.get("T", "")
     i = fields.get("I", "")
     normalize_address = "".join(part for part in [d, ap, i] if part) or raw_address
     logger.info(
-        f"结构化字段：C={city} | D={d} | AP={ap} | U={fields.get('U', '')} | I={i} | T={t}"
+        f"结构化字段：C={fields.get('C', '')} | D={d} | AP={ap} | U={fields.get('U', '')} | I={i} | T={fields.get('T', '')}"
     )
+    return fields, normalize_address
 
-    '''4. POI推荐'''
-    logger.info("4. POI推荐")
-    search_keyword = f"{d}{ap}"
-    logger.info(f"搜索关键词：{city} {search_keyword} {t}")
-
-    # 第一次搜索：使用 D + AP
-    pois = amap_inputtips(city, search_keyword, t)
-
-    # 如果结果少于 3 个，去掉城市搜
-    if len(pois) < 3:
-        logger.info(f"结果较少，去掉城市搜索：{search_keyword}")
-        extra_pois = amap_inputtips('', search_keyword, '')
-        pois = merge_pois(pois, extra_pois)
-    
-    
-    city_1 = extract_first_region(d)
+def region_of(fields: Dict) -> str:
+    """从 D 字段提取地级市/县（可能是地级市直管县），缺省使用 C"""
+    city_1 = extract_first_region(fields.get("D", ""))
     if len(city_1) == 0:
-        city_1 = city
+        city_1 = fields.get("C", "")
+    return city_1
+
+def build_fallback_queries(fields: Dict, city_1: str, pois: List[Dict]) -> List[tuple]:
+    """
+    构建相互独立的兜底查询；最后一个固定为行政区兜底查询
+    :return: [(city, keyword, type), ...]
+    """
+    city = fields.get("C", "")
+    ap = fields.get("AP", "")
+    search_keyword = f"{fields.get('D', '')}{ap}"
 
+    fallback_queries = []
 
     # 如果结果少于 3 个
     if len(pois) < 3:
@@ -357,20 +436,16 @@ def resolve_address(raw_address: str) -> Dict:
         search_keyword = re.sub(r'(?<=区).+?镇', '', search_keyword)
         search_keyword = re.sub(r'公租房', '', search_keyword)
         logger.info(f"去掉修饰词：{search_keyword}")
-        extra_pois_1 = amap_inputtips('', search_keyword, '')
+        fallback_queries.append(('', search_keyword, ''))
 
         # 可能是地级市直管县，尝试用修改城市名搜索
-        extra_pois_2 = []
         if len(city_1) > 0 and city_1 != city:
             logger.info(f"可能是地级市直管县（{city_1}）：{ap}")
-            extra_pois_2 = amap_inputtips(city_1, ap, '')
+            fallback_queries.append((city_1, ap, ''))
 
-        extra_pois_3 = []
         search_keyword = re.sub(r'宿舍|\d+号?(楼|栋|座)', '', ap, count=0, flags=0)
         logger.info(f"疑似近音字误用，只搜搜索AP：{search_keyword}")
-        extra_pois_3 = amap_inputtips(city, search_keyword, '')
-
-        pois = merge_pois(pois, extra_pois_1, extra_pois_2, extra_pois_3)
+        fallback_queries.append((city, search_keyword, ''))
 
     # 如果结果少于 3 个，再用 AP 单独搜索一次
     # if len(pois) < 4:
@@ -379,62 +454,61 @@ def resolve_address(raw_address: str) -> Dict:
     #     pois = merge_pois(pois, extra_pois)
 
     logger.info(f"兜底行政区搜索：{city_1}")
-    extra_pois = amap_inputtips('', city_1, '')
-    extra_pois = extra_pois[:1] if extra_pois else []
-    pois = merge_pois(pois, extra_pois)
-
-    # 无匹配 兜底策略 + 激进策略
-    if not pois:
-        logger.info("5. POI未命中，尝试周边搜索")
-        pois = search_nearby_by_fields(city, fields)
+    fallback_queries.append(('', city_1, ''))
+    return fallback_queries
 
-    if not pois:
-        logger.error("❌ POI 搜索无结果，返回空")
-        return {}
+def merge_fallback_results(pois: List[Dict], fallback_results: List[List[Dict]]) -> List[Dict]:
+    """合并兜底查询结果；行政区兜底查询只取第一个"""
+    fallback_results = list(fallback_results)
+    extra_pois = fallback_results.pop()
+    extra_pois = extra_pois[:1] if extra_pois else []
+    return merge_pois(pois, *fallback_results, extra_pois)
 
-    def best_score(p: Dict, target: str, fields: Dict) -> float:
-        """
-        计算最终匹配分数：融合文本相似度和辅助空间分数
-        :param p: POI 字典
-        :param target: 标准化地址字符串
-        :return: 融合后的匹配得分（0~100）
-        """
+def best_score(p: Dict, target: str, fields: Dict, city_1: str) -> float:
+    """
+    计算最终匹配分数：融合文本相似度和辅助空间分数
+    :param p: POI 字典
+    :param target: 标准化地址字符串
+    :return: 融合后的匹配得分（0~100）
+    """
 
-        name_score = similarity_score(target, p['name'])
-        address_score = similarity_score(target, p['address'])
-        text_score = max(name_score, address_score)
+    name_score = similarity_score(target, p['name'])
+    address_score = similarity_score(target, p['address'])
+    text_score = max(name_score, address_score)
 
-        print(f"初始文本相似度得分: {text_score}")
+    print(f"初始文本相似度得分: {text_score}")
 
-        c = fields.get('C', '')
+    c = fields.get('C', '')
 
-        if len(c) > 0 and c not in p["address"]:
-            text_score = text_score * 0.8
-        if len(city_1) > 0 and city_1 not in p["address"]:
-            text_score = text_score * 0.8
-        if len(c) > 0 and c not in p["address"] and len(city_1) > 0 and city_1 not in p["address"]:
-            text_score = 0.0
+    if len(c) > 0 and c not in p["address"]:
+        text_score = text_score * 0.8
+    if len(city_1) > 0 and city_1 not in p["address"]:
+        text_score = text_score * 0.8
+    if len(c) > 0 and c not in p["address"] and len(city_1) > 0 and city_1 not in p["address"]:
+        text_score = 0.0
 
-        print(f"调整后文本相似度得分: {text_score}")
+    print(f"调整后文本相似度得分: {text_score}")
 
-        # 辅助评分（空间判断得分）
-        aux_score = p.get("auxiliary_score", 0)
+    # 辅助评分（空间判断得分）
+    aux_score = p.get("auxiliary_score", 0)
 
-        # 融合打分：70% 文本相似度 + 30% 空间得分（可根据需要调整权重）
-        final_score = 0.7 * text_score + 0.3 * aux_score
+    # 融合打分：70% 文本相似度 + 30% 空间得分（可根据需要调整权重）
+    final_score = 0.7 * text_score + 0.3 * aux_score
 
-        #print(f"融合后最终得分: {final_score}")
+    #print(f"融合后最终得分: {final_score}")
 
-        # 保存到 poi 中便于打印
-        p['similarity'] = round(text_score, 2)
-        p['auxiliary'] = round(aux_score, 2)
-        p['score'] = round(final_score, 2)
+    # 保存到 poi 中便于打印
+    p['similarity'] = round(text_score, 2)
+    p['auxiliary'] = round(aux_score, 2)
+    p['score'] = round(final_score, 2)
 
-        # logger.info(f"名称: {p.get('name', '')} | 地址: {p.get('address', '')} --> text: {text_score:.2f} | aux: {aux_score:.2f} | final: {final_score:.2f}")
+    # logger.info(f"名称: {p.get('name', '')} | 地址: {p.get('address', '')} --> text: {text_score:.2f} | aux: {aux_score:.2f} | final: {final_score:.2f}")
 
-        return final_score
+    return final_score
 
-    best = max(pois, key=lambda p: best_score(p, normalize_address, fields))
+def pick_best(pois: List[Dict], normalize_address: str, fields: Dict, city_1: str) -> Dict:
+    """在候选中选取得分最高的 POI，并补充经纬度字段；无有效结果返回 {}"""
+    best = max(pois, key=lambda p: best_score(p, normalize_address, fields, city_1))
 
     if len(best["location"].split(",")) != 2:
         logger.error(f"❌ POI 位置信息异常：{best['location']}")
@@ -447,10 +521,12 @@ def resolve_address(raw_address: str) -> Dict:
     # 补充 经纬度字段
     best["lat"] = float(best["location"].split(",")[1])
     best["lng"] = float(best["location"].split(",")[0])
+    return best
 
-    # 补充逆地理编码乡镇街道信息
-    best["regeo"] = regeo(best["location"])
-    best["ap"] = ap
+def finalize_best(best: Dict, regeo_info: Dict, fields: Dict, structured: Dict, start_time: float) -> Dict:
+    """补充逆地理编码、结构化信息与耗时"""
+    best["regeo"] = regeo_info
+    best["ap"] = fields.get("AP", "")
     best["structured"] = structured.get("tags", {})
 
     duration = round(time.time() - start_time, 2)  # ✅ 计算耗时
@@ -459,6 +535,198 @@ def resolve_address(raw_address: str) -> Dict:
 
     return best
 
+def resolve_address(raw_address: str) -> Dict:
+    """
+    地址智能解析主流程：结构化、搜索、匹配
+    各阶段经 StageRunner 执行：结果在本次请求内记忆，上游偶发失败时只重试失败的阶段
+    :param raw_address: 原始地址字符串
+    :return: 匹配到的最佳 POI 信息（字典）
+    """
+    start_time = time.time()  # ✅ 启动计时
+    stages = new_stages()
+    logger.info(f"0. 输入地址：{raw_address}")
+
+    '''1. 先查私有地址库'''
+    best = stages.run("private", match_private_address, raw_address, start_time)
+    if best:
+        return best
+
+    '''2. 快速 POI 搜索匹配（使用高德 POI 搜索 + 相似度）'''
+    logger.info("2. 快速搜索匹配（amap_poi_search）")
+    pois = stages.run("poi_search", amap_poi_search, "", raw_address)
+    best_fast = get_best_poi(pois, raw_address) # type: ignore 
+
+    # 存在分数超过70的结果
+    if best_fast:
+        best_fast["regeo"] = stages.run("regeo", get_regeo, best_fast["location"]) # 乡镇一级信息匹配
+        best_fast["duration"] = round(time.time() - start_time, 2)
+        return best_fast
+
+    '''3. 地址结构化'''
+    logger.info("3. 地址结构化")
+    try:
+        # 各次重试共享同一截止时刻，结构化总耗时不超过 STRUCT_LLM_DEADLINE
+        structured = stages.run("structure", infer, raw_address, 256, structure_deadline())
+    except RETRYABLE as e:
+        structured = fallback_infer(raw_address, e)  # 重试预算耗尽，本地结构化兜底
+    fields, normalize_address = prepare_fields(raw_address, structured)
+    city = fields.get("C", "")
+
+    '''4. POI推荐'''
+    logger.info("4. POI推荐")
+    search_keyword = f"{fields.get('D', '')}{fields.get('AP', '')}"
+    t = fields.get("T", "")
+    logger.info(f"搜索关键词：{city} {search_keyword} {t}")
+
+    # 第一次搜索：使用 D + AP
+    pois = stages.run("inputtips", amap_inputtips, city, search_keyword, t)
+
+    # 如果结果少于 3 个，去掉城市搜
+    if len(pois) < 3:
+        logger.info(f"结果较少，去掉城市搜索：{search_keyword}")
+        extra_pois = stages.run("inputtips", amap_inputtips, '', search_keyword, '')
+        pois = merge_pois(pois, extra_pois)
+
+    city_1 = region_of(fields)
+
+    # 以下兜底查询相互独立：开启批量时合并为一次高德批量请求
+    fallback_queries = build_fallback_queries(fields, city_1, pois)
+    pois = merge_fallback_results(pois, inputtips_many(fallback_queries, stages))
+
+    # 无匹配 兜底策略 + 激进策略
+    if not pois:
+        logger.info("5. POI未命中，尝试周边搜索")
+        pois = stages.run("nearby", search_nearby_by_fields, city, fields)
+
+    if not pois:
+        logger.error("❌ POI 搜索无结果，返回空")
+        return {}
+
+    best = pick_best(pois, normalize_address, fields, city_1)
+    if not best:
+        return {}
+
+    # 补充逆地理编码乡镇街道信息
+    return finalize_best(best, stages.run("regeo", get_regeo, best["location"]), fields, structured, start_time)
+
+
+# -------------------- asyncio 版本 --------------------
+# 与同步流程逐步对应，网络调用改为协程；相互独立的高德查询并发执行
+
+async def judge_best_by_auxiliary_async(anchor_location: str, candidates: List[Dict], auxiliary: str) -> List[Dict]:
+    """judge_best_by_auxiliary 的 asyncio 版本"""
+    if apply_local_auxiliary(anchor_location, candidates, auxiliary):
+        return candidates
+    shortlist = rank_auxiliary_candidates(anchor_location, candidates, top_k=AUX_TOP_K)
+    if not shortlist:
+        return apply_auxiliary_scores(candidates, "{}")
+    prompt = build_auxiliary_prompt(anchor_location, shortlist, auxiliary)
+    response = await call_qwen_async(prompt)
+    return apply_auxiliary_scores(candidates, response)
+
+async def search_nearby_by_fields_async(city: str, fields: Dict) -> List[Dict]:
+    """search_nearby_by_fields 的 asyncio 版本，多个关键词并发搜索"""
+    anchor = fields.get("D")
+    logger.info(f"{city} 搜索锚点（D）: {anchor}")
+
+    loc = await amap_geocode_async(city, anchor) # type: ignore
+    if not loc:
+        logger.error("❌ AP锚点定位失败")
+        return []
+
+    auxiliary = fields.get("I", "")
+    keywords = nearby_keywords(fields)
+
+    pois = []
+    for found in await asyncio.gather(*(amap_around_search_async(loc, kw) for kw in set(keywords))):
+        pois += found
+
+    if not pois:
+        return []
+
+    if auxiliary:
+        logger.info(f"🧭 使用辅助字段“{auxiliary}”调用大模型辅助打分")
+        pois = await judge_best_by_auxiliary_async(anchor_location=loc, candidates=pois, auxiliary=auxiliary)
+        pois.sort(key=lambda p: p.get("auxiliary_score", 0), reverse=True)
+
+    return pois
+
+async def get_regeo_async(location: str) -> Dict:
+    """get_regeo 的 asyncio 版本；本地边界查询（首次调用需加载 GeoJSON、建 STR 树）放到线程池，不阻塞事件循环"""
+    info = await asyncio.to_thread(regeo_local, location, REGEO_BOUNDARY_PATH)
+    if info:
+        logger.info(f"本地逆地理编码命中：{info.get('township', '')}")
+        return info
+    return await regeo_async(location) if REGEO_AMAP_FALLBACK else {}
+
+async def inputtips_many_async(queries: List[tuple], stages: StageRunner = None) -> List[List[Dict]]:
+    """inputtips_many 的 asyncio 版本；未开启批量时各查询并发执行"""
+    stages = stages or new_stages()
+    if AMAP_BATCH_ENABLED and len(queries) > 1:
+        logger.info(f"合并 {len(queries)} 个兜底查询为一次高德批量请求")
+        return await stages.run_async("inputtips_batch", amap_inputtips_batch_async, queries)
+    return list(await asyncio.gather(*(stages.run_async("inputtips", amap_inputtips_async, city, keyword, type)
+                                       for city, keyword, type in queries)))
+
+async def resolve_address_async(raw_address: str) -> Dict:
+    """
+    resolve_address 的 asyncio 版本：一个事件循环即可同时处理大量等待网络的解析请求
+    :param raw_address: 原始地址字符串
+    :return: 匹配到的最佳 POI 信息（字典）
+    """
+    start_time = time.time()
+    stages = new_stages()
+    logger.info(f"0. 输入地址：{raw_address}")
+
+    best = await stages.run_async("private", match_private_address, raw_address, start_time)  # SQLite 查询在线程池执行
+    if best:
+        return best
+
+    logger.info("2. 快速搜索匹配（amap_poi_search）")
+    pois = await stages.run_async("poi_search", amap_poi_search_async, "", raw_address)
+    best_fast = get_best_poi(pois, raw_address)
+
+    if best_fast:
+        best_fast["regeo"] = await stages.run_async("regeo", get_regeo_async, best_fast["location"])
+        best_fast["duration"] = round(time.time() - start_time, 2)
+        return best_fast
+
+    logger.info("3. 地址结构化")
+    try:
+        structured = await stages.run_async("structure", infer_async, raw_address, 256, structure_deadline())
+    except RETRYABLE as e:
+        structured = await asyncio.to_thread(fallback_infer, raw_address, e)  # 重试预算耗尽，本地结构化兜底
+    fields, normalize_address = prepare_fields(raw_address, structured)
+    city = fields.get("C", "")
+
+    logger.info("4. POI推荐")
+    search_keyword = f"{fields.get('D', '')}{fields.get('AP', '')}"
+    t = fields.get("T", "")
+    logger.info(f"搜索关键词：{city} {search_keyword} {t}")
+
+    pois = await stages.run_async("inputtips", amap_inputtips_async, city, search_keyword, t)
+    if len(pois) < 3:
+        logger.info(f"结果较少，去掉城市搜索：{search_keyword}")
+        pois = merge_pois(pois, await stages.run_async("inputtips", amap_inputtips_async, '', search_keyword, ''))
+
+    city_1 = region_of(fields)
+    fallback_queries = build_fallback_queries(fields, city_1, pois)
+    pois = merge_fallback_results(pois, await inputtips_many_async(fallback_queries, stages))
+
+    if not pois:
+        logger.info("5. POI未命中，尝试周边搜索")
+        pois = await stages.run_async("nearby", search_nearby_by_fields_async, city, fields)
+
+    if not pois:
+        logger.error("❌ POI 搜索无结果，返回空")
+        return {}
+
+    best = pick_best(pois, normalize_address, fields, city_1)
+    if not best:
+        return {}
+
+    return finalize_best(best, await stages.run_async("regeo", get_regeo_async, best["location"]), fields, structured, start_time)
+
 # 示例调用
 if __name__ == "__main__":
     resolve_address("北京市海淀区六道口西北角的羊肉汤馆")
@@ -0,0 +1,128 @@
+# amap_stub.py
+"""
+高德 Web 服务接口的本地替身，用于离线测试。
+
+支持：inputtips / place/text / place/around / geocode/geo / geocode/regeo / batch
+用法：
+    python test/amap_stub.py --port 8765
+    AMAP_BASE_URL=http://127.0.0.1:8765 python resolver.py
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# 替身 POI 数据
+POIS = [
+    {"id": "B000A7BD6C", "name": "方恒国际中心A座", "district": "北京市朝阳区", "address": "阜通东大街6号",
+     "location": "116.481197,39.989751", "type": "商务住宅;楼宇;商务写字楼"},
+    {"id": "B000A7BM4H", "name": "方恒购物中心", "district": "北京市朝阳区", "address": "阜通东大街6号",
+     "location": "116.480880,39.989236", "type": "购物服务;商场;购物中心"},
+    {"id": "B0FFG3VJ4K", "name": "北苑小街8号院5号楼", "district": "北京市朝阳区", "address": "北苑小街8号院",
+     "location": "116.429520,40.046900", "type": "商务住宅;住宅区;住宅小区"},
+    {"id": "B000A83M61", "name": "六道口", "district": "北京市海淀区", "address": "学院路与成府路交叉口",
+     "location": "116.341000,40.001000", "type": "地名地址信息;交通地名;路口名"},
+]
+
+REGEO = {
+    "province": "北京市", "city": [], "district": "朝阳区", "township": "望京街道",
+    "adcode": "110105", "towncode": "110105026000", "citycode": "010",
+    "streetNumber": {"street": "阜通东大街", "number": "6号", "location": "116.481,39.989"},
+}
+
+
+def _match(keyword: str):
+    keyword = keyword or ""
+    return [p for p in POIS if keyword and (keyword in p["name"] or p["name"] in keyword)]
+
+
+def handle(path: str, params: dict) -> dict:
+    """按路径分发替身接口，返回与高德一致的响应体"""
+    get = lambda k: params.get(k, "")
+    if path == "/v3/assistant/inputtips":
+        tips = _match(get("keywords"))
+        return {"status": "1", "count": str(len(tips)), "tips": tips}
+    if path in ("/v3/place/text", "/v3/place/around"):
+        pois = [dict(p, address=p["address"]) for p in _match(get("keywords"))]
+        return {"status": "1", "count": str(len(pois)), "pois": pois}
+    if path == "/v3/geocode/geo":
+        pois = _match(get("address"))
+        geocodes = [{"formatted_address": p["district"] + p["address"], "location": p["location"]} for p in pois]
+        return {"status": "1", "count": str(len(geocodes)), "geocodes": geocodes}
+    if path == "/v3/geocode/regeo":
+        return {"status": "1", "info": "OK", "regeocode": {"addressComponent": REGEO}}
+    return {"status": "0", "info": "INVALID_PATH"}
+
+
+class AmapStubHandler(BaseHTTPRequestHandler):
+
+    def _params(self):
+        query = parse_qs(urlsplit(self.path).query)
+        return {k: v[0] for k, v in query.items()}
+
+    def _reply(self, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.requests.append(urlsplit(self.path).path)
+        self._reply(handle(urlsplit(self.path).path, self._params()))
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        self.server.requests.append(path)
+        if path != "/v3/batch":
+            return self._reply({"status": "0", "info": "INVALID_PATH"})
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        results = []
+        for op in payload.get("ops", []):
+            parts = urlsplit(op.get("url", ""))
+            params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            results.append({"status": 200, "header": {}, "body": handle(parts.path, params)})
+        self._reply(results)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AmapStubServer:
+    """在后台线程中启动替身服务；requests 记录每次 HTTP 调用的路径"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), AmapStubHandler)
+        self.httpd.requests = []
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> list:
+        return self.httpd.requests
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    server = AmapStubServer(args.host, args.port)
+    print(f"高德替身服务：{server.url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import func.struct_llm_call as struct_llm_call
+from util.addr_tagger import (
+    AddressTagger, PerceptronTrainer, load_events, load_tagger,
+    spans_from_tagged, spans_to_bio, bio_to_spans, spans_to_result,
+)
+
+EVENTS = os.path.join(os.path.dirname(__file__), "..", "lora", "events.jsonl")
+
+
+class TestBioConversion(unittest.TestCase):
+
+    def test_round_trip(self):
+        text, spans = spans_from_tagged("<city>杭州市</city>，<road>文一路</road><roadno>8号</roadno>")
+        self.assertEqual(text, "杭州市，文一路8号")
+        labels = spans_to_bio(spans)
+        self.assertEqual(labels[:4], ["B-city", "I-city", "I-city", "O"])
+        self.assertEqual(bio_to_spans(text, labels), [("city", "杭州市"), ("road", "文一路"), ("roadno", "8号")])
+
+    def test_result_merges_repeated_tags(self):
+        result = spans_to_result([("poi", "A"), ("road", "B"), ("poi", "C"), ("poi", "A")])
+        self.assertEqual(result["tags"], {"poi": ["A", "C"], "road": "B"})
+        self.assertEqual(result["text"], "<poi>A</poi><road>B</road><poi>C</poi><poi>A</poi>")
+
+
+class TestAddressTagger(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        samples = load_events(EVENTS)[:600]
+        labels = {label for _text, bio in samples for label in bio}
+        cls.samples = samples
+        cls.tagger = PerceptronTrainer(labels).train(samples, epochs=3, seed=0)
+
+    def test_fits_training_data(self):
+        correct = sum(self.tagger.predict(text) == bio for text, bio in self.samples[:200])
+        self.assertGreater(correct / 200, 0.7)
+
+    def test_infer_shape(self):
+        result = self.tagger.tag("浙江省杭州市江干区九堡镇三村村一区")
+        self.assertEqual(set(result), {"text", "tags"})
+        self.assertEqual(result["tags"].get("prov"), "浙江省")
+        self.assertEqual(self.tagger.tag(""), {"text": "", "tags": {}})
+
+    def test_save_load_and_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tagger.json.gz")
+            self.tagger.save(path)
+            loaded = AddressTagger.load(path)
+            text = self.samples[0][0]
+            self.assertEqual(loaded.tag(text), self.tagger.tag(text))
+
+            with mock.patch.object(struct_llm_call, "STRUCT_BACKEND", "tagger"), \
+                    mock.patch.object(struct_llm_call, "STRUCT_TAGGER_PATH", path):
+                self.assertEqual(struct_llm_call.infer(text), self.tagger.tag(text))
+                self.assertTrue(struct_llm_call.local_infer(text)["fallback"])
+            load_tagger.cache_clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
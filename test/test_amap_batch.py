@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+import func.amap_call as amap_call
+from amap_stub import AmapStubServer
+
+
+class TestAmapBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = AmapStubServer().__enter__()
+        cls.patcher = mock.patch.object(amap_call, "AMAP_BASE_URL", cls.server.url)
+        cls.patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patcher.stop()
+        cls.server.__exit__(None, None, None)
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    def test_inputtips_batch_single_round_trip(self):
+        queries = [("北京市", "方恒", ""), ("", "六道口", ""), ("", "不存在的地点", "")]
+        results = amap_call.amap_inputtips_batch(queries)
+        self.assertEqual(self.server.requests, ["/v3/batch"])
+        self.assertEqual(len(results), 3)
+        self.assertEqual({p["name"] for p in results[0]}, {"方恒国际中心A座", "方恒购物中心"})
+        self.assertEqual(results[1][0]["name"], "六道口")
+        self.assertEqual(results[2], [])
+
+    def test_batch_matches_single_requests(self):
+        single = amap_call.amap_inputtips("北京市", "方恒")
+        batched = amap_call.amap_inputtips_batch([("北京市", "方恒", "")])[0]
+        self.assertEqual(single, batched)
+
+    def test_batch_splits_large_requests(self):
+        queries = [("", "六道口", "")] * (amap_call.AMAP_BATCH_MAX_OPS + 1)
+        results = amap_call.amap_inputtips_batch(queries)
+        self.assertEqual(self.server.requests, ["/v3/batch", "/v3/batch"])
+        self.assertEqual(len(results), len(queries))
+
+
+if __name__ == "__main__":
+    unittest.main()
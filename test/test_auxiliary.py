@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+
+import resolver
+from util.auxiliary import parse_auxiliary, parse_distance, score_auxiliary
+
+ANCHOR = "120.000000,30.000000"
+# 纬度 1 度约 111 公里，经度在北纬 30 度约 96 公里
+NORTH_100M = {"name": "北100米", "location": "120.000000,30.000900"}
+EAST_100M = {"name": "东100米", "location": "120.001040,30.000000"}
+WEST_100M = {"name": "西100米", "location": "119.998960,30.000000"}
+EAST_1KM = {"name": "东1公里", "location": "120.010400,30.000000"}
+
+
+class TestAuxiliaryParse(unittest.TestCase):
+
+    def test_distance(self):
+        self.assertEqual(parse_distance("往东走100米"), 100)
+        self.assertEqual(parse_distance("向北1.5公里"), 1500)
+        self.assertEqual(parse_distance("往南两百五十米"), 250)
+        self.assertEqual(parse_distance("东边几十米"), 50)
+        self.assertEqual(parse_distance("往北一两百米"), 150)
+        self.assertEqual(parse_distance("两三百米"), 250)
+        self.assertIsNone(parse_distance("西北角"))
+
+    def test_direction(self):
+        self.assertEqual(parse_auxiliary("西北角")["bearing"], 315)
+        self.assertEqual(parse_auxiliary("往东走100米")["distance"], 100)
+        self.assertIsNone(parse_auxiliary("对面")["bearing"])
+
+    def test_place_names_not_directions(self):
+        for text in ("南京路星巴克", "东方红", "西单", "北京路口"):
+            spec = parse_auxiliary(text)
+            self.assertTrue(spec is None or spec["bearing"] is None, text)
+        self.assertEqual(parse_auxiliary("南京路北侧")["bearing"], 0)
+        self.assertEqual(parse_auxiliary("西单东100米")["bearing"], 90)
+        self.assertEqual(parse_auxiliary("东南")["bearing"], 135)
+        self.assertEqual(parse_auxiliary("向西约200米")["bearing"], 270)
+
+    def test_unparsable(self):
+        self.assertIsNone(parse_auxiliary("后面"))
+        self.assertIsNone(parse_auxiliary("左手边第二家"))
+        self.assertIsNone(parse_auxiliary(""))
+
+
+class TestAuxiliaryScore(unittest.TestCase):
+
+    def test_direction_ranking(self):
+        scores = score_auxiliary(ANCHOR, [NORTH_100M, EAST_100M, WEST_100M], "东侧")
+        self.assertEqual(scores.index(max(scores)), 1)
+        self.assertEqual(scores[2], 0)
+
+    def test_distance_ranking(self):
+        scores = score_auxiliary(ANCHOR, [EAST_100M, EAST_1KM], "往东走1公里")
+        self.assertGreater(scores[1], scores[0])
+        scores = score_auxiliary(ANCHOR, [EAST_100M, EAST_1KM], "旁边")
+        self.assertGreater(scores[0], scores[1])
+
+    def test_invalid_location(self):
+        scores = score_auxiliary(ANCHOR, [{"name": "x", "location": ""}], "东侧")
+        self.assertEqual(scores, [0.0])
+        self.assertIsNone(score_auxiliary("", [EAST_100M], "东侧"))
+
+    def test_resolver_skips_llm(self):
+        candidates = [dict(NORTH_100M), dict(EAST_100M)]
+        with patch.object(resolver, "call_qwen") as call_qwen:
+            resolver.judge_best_by_auxiliary(ANCHOR, candidates, "东边100米")
+            call_qwen.assert_not_called()
+        self.assertGreater(candidates[1]["auxiliary_score"], candidates[0]["auxiliary_score"])
+
+    def test_resolver_falls_back_to_llm(self):
+        candidates = [dict(NORTH_100M)]
+        with patch.object(resolver, "call_qwen", return_value='{"北100米": 80}') as call_qwen:
+            resolver.judge_best_by_auxiliary(ANCHOR, candidates, "后面")
+            call_qwen.assert_called_once()
+        self.assertEqual(candidates[0]["auxiliary_score"], 80)
+
+    def test_prompt_shortlist(self):
+        candidates = [dict(EAST_1KM), dict(WEST_100M), dict(WEST_100M), dict(NORTH_100M)]
+        shortlist = resolver.rank_auxiliary_candidates(ANCHOR, candidates, top_k=2)
+        self.assertEqual([p["name"] for p in shortlist], ["北100米", "西100米"])
+
+        prompt = resolver.build_auxiliary_prompt(ANCHOR, shortlist, "后面")
+        self.assertIn('{"北100米":"120.000000,30.000900","西100米":"119.998960,30.000000"}', prompt)
+
+        with patch.object(resolver, "AUX_TOP_K", 2), \
+                patch.object(resolver, "call_qwen", return_value='{"北100米": 60}') as call_qwen:
+            resolver.judge_best_by_auxiliary(ANCHOR, candidates, "后面")
+            self.assertNotIn("东1公里", call_qwen.call_args[0][0])
+        self.assertEqual([p["auxiliary_score"] for p in candidates], [0, 0, 0, 60])
+
+
+if __name__ == "__main__":
+    unittest.main()
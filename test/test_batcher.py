@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from util import metrics
+from util.batcher import MicroBatcher
+
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def setUp(self):
+        metrics.metrics.reset()
+
+    def test_concurrent_calls_are_batched(self):
+        sizes = []
+
+        def handler(items):
+            sizes.append(len(items))
+            return [x * 2 for x in items]
+
+        batcher = MicroBatcher(handler, window_ms=50, max_batch=8, name="t")
+        results = {}
+
+        def call(i):
+            results[i] = batcher(i, timeout=5)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, {i: i * 2 for i in range(8)})
+        self.assertLess(len(sizes), 8)
+        snap = metrics.snapshot()["histograms"]
+        self.assertEqual(snap["t.wait_ms"]["count"], 8)
+        self.assertEqual(snap["t.batch_size"]["count"], len(sizes))
+
+    def test_per_item_errors(self):
+        def handler(items):
+            return [ValueError(x) if x < 0 else x for x in items]
+
+        batcher = MicroBatcher(handler, window_ms=1, name="t")
+        self.assertEqual(batcher(3, timeout=5), 3)
+        with self.assertRaises(ValueError):
+            batcher(-1, timeout=5)
+
+    def test_whole_batch_error(self):
+        def handler(items):
+            raise RuntimeError("down")
+
+        batcher = MicroBatcher(handler, window_ms=1, name="t")
+        with self.assertRaises(RuntimeError):
+            batcher(1, timeout=5)
+
+    def test_window_flushes_single_call(self):
+        batcher = MicroBatcher(lambda items: items, window_ms=20, name="t")
+        start = time.perf_counter()
+        self.assertEqual(batcher("a", timeout=5), "a")
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+import func.struct_llm_call as struct_llm_call
+from util import metrics
+from util.backend_pool import BackendPool
+from util.kv_cache import KVCache
+from util.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from tgi_stub import TgiStubServer
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        metrics.metrics.reset()
+
+    def test_open_half_open_close(self):
+        breaker = CircuitBreaker("t.breaker", failure_threshold=2, recovery_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())  # 半开只放行一个试探请求
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters["t.breaker.transition.closed_to_open"], 1)
+        self.assertEqual(counters["t.breaker.transition.open_to_half_open"], 1)
+        self.assertEqual(counters["t.breaker.transition.half_open_to_closed"], 1)
+
+    def test_half_open_failure_reopens(self):
+        breaker = CircuitBreaker("t.breaker", failure_threshold=1, recovery_timeout=0.01)
+        with self.assertRaises(ZeroDivisionError):
+            breaker.call(lambda: 1 / 0)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: 1)
+        time.sleep(0.02)
+        with self.assertRaises(ZeroDivisionError):
+            breaker.call(lambda: 1 / 0)
+        self.assertEqual(breaker.state, OPEN)
+
+
+class TestStructFallback(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TgiStubServer().__enter__()
+        self.breaker = CircuitBreaker("t.struct", failure_threshold=2, recovery_timeout=3600)
+        self.patchers = [
+            mock.patch.object(struct_llm_call, "backend_pool", BackendPool([self.server.url], name="t.backend")),
+            mock.patch.object(struct_llm_call, "breaker", self.breaker),
+            mock.patch.object(struct_llm_call, "struct_cache", KVCache("", "struct")),
+            mock.patch.object(struct_llm_call, "STRUCT_TAGGER_PATH", ""),  # 兜底固定为行政区划词典
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.server.__exit__(None, None, None)
+
+    def test_local_infer(self):
+        res = struct_llm_call.local_infer("浙江省杭州市江干区九堡镇三村村一区")
+        self.assertEqual(res["tags"]["city"], "杭州市")
+        self.assertEqual(res["tags"]["poi"], "三村村一区")
+        self.assertTrue(res["fallback"])
+
+    def test_breaker_opens_and_falls_back(self):
+        self.server.fail = True
+        for _ in range(2):
+            self.assertTrue(struct_llm_call.infer("杭州市九堡镇")["fallback"])
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.server.requests.clear()
+        res = struct_llm_call.infer("杭州市九堡镇")
+        self.assertTrue(res["fallback"])
+        self.assertEqual(self.server.requests, [])  # 熔断期间不再访问 TGI
+
+    def test_deadline(self):
+        self.server.delay = 0.5
+        start = time.perf_counter()
+        with mock.patch.object(struct_llm_call, "STRUCT_LLM_TIMEOUT", 0.1):
+            # 熔断器闭合时超时抛给调用方重试，达到阈值熔断后走本地兜底
+            with self.assertRaises(requests.Timeout):
+                struct_llm_call.infer("杭州市九堡镇")
+            res = struct_llm_call.infer("杭州市九堡镇")
+        self.assertLess(time.perf_counter() - start, 0.45)
+        self.assertTrue(res["fallback"])
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_stream_retryable_raises(self):
+        self.server.delay = 0.5
+        with mock.patch.object(struct_llm_call, "STRUCT_LLM_TIMEOUT", 0.1):
+            with self.assertRaises(requests.Timeout):
+                list(struct_llm_call.infer_stream("杭州市九堡镇"))
+
+    def test_healthy_path(self):
+        res = struct_llm_call.infer("杭州市九堡镇")
+        self.assertEqual(res["tags"], {"poi": "杭州市九堡镇"})
+        self.assertNotIn("fallback", res)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from util.copy_constraint import CopyConstraint, VocabTrie
+
+EOS = 0
+
+
+def _vocab(*pieces):
+    return {i + 1: p.encode("utf-8") for i, p in enumerate(pieces)}
+
+
+class TestCopyConstraint(unittest.TestCase):
+
+    def test_accepts_tagged_copy(self):
+        c = CopyConstraint("浙江省杭州市")
+        state = c.feed(c.start, "<prov>浙江省</prov><city>杭州市</city>".encode("utf-8"))
+        self.assertEqual(state[0], "between")
+        self.assertTrue(c.must_stop(state))
+
+    def test_rejects_unknown_tag_and_mismatched_close(self):
+        c = CopyConstraint("浙江省")
+        self.assertIsNone(c.feed(c.start, b"<foo>"))
+        self.assertIsNone(c.feed(c.start, "<prov>浙江省</city>".encode("utf-8")))
+
+    def test_rejects_text_not_in_input(self):
+        c = CopyConstraint("浙江省")
+        self.assertIsNone(c.feed(c.start, "<prov>江苏".encode("utf-8")))
+        self.assertIsNone(c.feed(c.start, "<prov></prov>".encode("utf-8")))
+
+    def test_concatenated_segments(self):
+        c = CopyConstraint("西溪路1号A座")
+        state = c.feed(c.start, "<poi>西溪A座</poi>".encode("utf-8"))
+        self.assertEqual(state[0], "between")
+        self.assertFalse(c.must_stop(state))
+        self.assertTrue(c.eos_allowed(state))
+
+    def test_allowed_tokens(self):
+        vocab = _vocab("<", "prov", "city", ">", "浙江", "省", "</", "江苏", "</prov>", "foo")
+        trie = VocabTrie(vocab)
+        ids = {v: k for k, v in vocab.items()}
+        c = CopyConstraint("浙江省")
+
+        self.assertEqual(set(trie.allowed(c, c.start, EOS)), {ids["<".encode()]})
+        state = c.feed(c.start, "<prov>".encode("utf-8"))
+        self.assertEqual(set(trie.allowed(c, state, EOS)), {ids["浙江".encode()], ids["省".encode()]})
+        state = c.feed(state, "浙江省".encode("utf-8"))
+        allowed = set(trie.allowed(c, state, EOS))
+        self.assertEqual(allowed, {ids["<".encode()], ids["</".encode()], ids["</prov>".encode()]})
+        state = c.feed(state, "</prov>".encode("utf-8"))
+        self.assertEqual(trie.allowed(c, state, EOS), [EOS])
+
+
+if __name__ == "__main__":
+    unittest.main()
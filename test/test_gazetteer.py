@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import unittest
+
+from util.gazetteer import Gazetteer, match_regions
+from util.gazetteer_build import OUT_PATH, from_events
+
+ENTRIES = [
+    ["北京市", 0, -1],        # 0
+    ["北京市", 1, 0],         # 1
+    ["朝阳区", 2, 1],         # 2
+    ["吉林省", 0, -1],        # 3
+    ["长春市", 1, 3],         # 4
+    ["朝阳区", 2, 4],         # 5
+    ["浙江省", 0, -1],        # 6
+    ["杭州市", 1, 6],         # 7
+    ["江干区", 2, 7],         # 8
+    ["九堡镇", 3, 8],         # 9
+]
+
+
+class TestGazetteer(unittest.TestCase):
+
+    def setUp(self):
+        self.gaz = Gazetteer(ENTRIES)
+
+    def test_full_prefix(self):
+        r = self.gaz.resolve("浙江省杭州市江干区九堡镇三村村一区")
+        self.assertEqual((r["prov"], r["city"], r["district"], r["town"]), ("浙江省", "杭州市", "江干区", "九堡镇"))
+        self.assertEqual(r["rest"], "三村村一区")
+
+    def test_alias_and_duplicates(self):
+        r = self.gaz.resolve("浙江浙江省杭州江干区")
+        self.assertEqual((r["prov"], r["city"], r["district"]), ("浙江省", "杭州市", "江干区"))
+        self.assertEqual(r["rest"], "")
+
+    def test_infer_upper_levels_from_town(self):
+        r = self.gaz.resolve("九堡镇三村村")
+        self.assertEqual((r["prov"], r["city"], r["district"]), ("浙江省", "杭州市", "江干区"))
+
+    def test_disambiguate_by_parent(self):
+        self.assertEqual(self.gaz.resolve("北京市朝阳区北苑小街")["city"], "北京市")
+        self.assertEqual(self.gaz.resolve("长春朝阳区")["prov"], "吉林省")
+        # 同名区县且无上级可区分时不推断上级
+        r = self.gaz.resolve("朝阳区北苑小街")
+        self.assertEqual((r["prov"], r["city"], r["district"]), ("", "", "朝阳区"))
+
+    def test_prefix_only(self):
+        r = self.gaz.resolve("北苑小街8号院杭州市")
+        self.assertEqual(r["city"], "")
+        self.assertEqual(r["rest"], "北苑小街8号院杭州市")
+
+    def test_alias_not_followed_by_road(self):
+        self.assertEqual(self.gaz.resolve("杭州路星巴克")["city"], "")
+        self.assertEqual(self.gaz.resolve("杭州东站")["city"], "")
+        self.assertEqual(self.gaz.resolve("杭州市路口")["city"], "杭州市")  # 全称不受影响
+        self.assertEqual(self.gaz.resolve("杭州江干区")["district"], "江干区")
+
+    def test_partial_coverage_no_inference(self):
+        gaz = Gazetteer(ENTRIES, complete=False)
+        r = gaz.resolve("九堡镇三村村")
+        self.assertEqual((r["prov"], r["city"], r["district"], r["town"]), ("", "", "", "九堡镇"))
+        self.assertEqual(gaz.explicit("杭州江干区")["city"], "杭州市")
+        self.assertEqual(self.gaz.explicit("九堡镇")["city"], "杭州市")
+
+    def test_explicit_drops_ambiguous(self):
+        r = self.gaz.explicit("朝阳区北苑小街")
+        self.assertEqual((r["city"], r["district"]), ("", ""))
+
+    def test_shipped_gazetteer(self):
+        # 仓库内词典由标注语料归纳（complete=false），不由下级推断上级
+        r = match_regions("浙江省余姚市模具城金型路000号")
+        self.assertEqual((r["prov"], r["city"], r["district"]), ("浙江省", "", "余姚市"))
+        self.assertEqual(match_regions("杭州杭州市西湖区文三路")["city"], "杭州市")
+        self.assertEqual(match_regions("南京路星巴克")["city"], "")
+        self.assertEqual(match_regions("朝阳区北苑")["city"], "")
+
+    def test_fill_structured_fields(self):
+        from resolver import build_structured_fields
+        self.assertEqual(build_structured_fields("南京路星巴克", {"tags": {"poi": "星巴克"}})["C"], "")
+        self.assertEqual(build_structured_fields("朝阳区北苑", {"tags": {}})["C"], "")
+        self.assertEqual(build_structured_fields("杭州西湖区文三路", {"tags": {}})["C"], "杭州市")
+
+
+class TestGazetteerBuild(unittest.TestCase):
+
+    def test_shipped_gazetteer_has_no_noise(self):
+        with open(OUT_PATH, "r", encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+        names = {name for name, _level, _parent in entries}
+        for bad in ("义务市", "市辖区", "县", "郊区", "嘉兴嘉兴市", "宁波宁波市", "杭州杭州市", "温州温州市", "瓯海瓯海区"):
+            self.assertNotIn(bad, names)
+        self.assertIn("义乌市", names)
+        # 非省级条目都有上级
+        self.assertFalse([e for e in entries if e[1] > 0 and e[2] < 0])
+
+    def test_from_events_filters(self):
+        rows = ([{"prov": "浙江", "city": "金华市", "district": "义乌市"}] * 20
+                + [{"prov": "浙江", "city": "金华市", "district": "义务市"}] * 2
+                + [{"prov": "浙江", "city": "湖州市", "district": "市辖区", "town": "织里镇"}] * 3
+                + [{"district": "孤立区"}] * 3)
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({"events": row}, ensure_ascii=False) + "\n")
+        try:
+            entries = from_events(f.name)
+        finally:
+            os.remove(f.name)
+        names = {name for name, _level, _parent in entries}
+        self.assertIn("义乌市", names)
+        self.assertIn("织里镇", names)
+        for bad in ("义务市", "市辖区", "孤立区"):
+            self.assertNotIn(bad, names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import func.qwen_call as qwen_call
+from util.kv_cache import KVCache, make_key
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestKVCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_set_persistent(self):
+        cache = KVCache(self.path, "qwen")
+        key = make_key("qwen-turbo", "prompt")
+        self.assertIsNone(cache.get(key))
+        cache.set(key, '{"a": 1}')
+        self.assertEqual(KVCache(self.path, "qwen").get(key), '{"a": 1}')
+        self.assertIsNone(KVCache(self.path, "struct").get(key))
+
+    def test_make_key(self):
+        self.assertNotEqual(make_key("ab", "c"), make_key("a", "bc"))
+        self.assertEqual(len(make_key("x")), 64)
+
+    def test_lru_eviction(self):
+        cache = KVCache(self.path, "qwen", max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+
+    def test_disabled(self):
+        cache = KVCache("", "qwen")
+        cache.set("a", "1")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class TestQwenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = KVCache(os.path.join(self.tmp.name, "cache.db"), "qwen")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_non_json_not_cached(self):
+        create = mock.Mock(side_effect=[_completion('{"A": 8'), _completion('{"A": 80}')])
+        with mock.patch.object(qwen_call, "qwen_cache", self.cache), \
+                mock.patch.object(qwen_call.client.chat.completions, "create", create):
+            self.assertEqual(qwen_call.call_qwen("p", model="m"), '{"A": 8')
+            self.assertEqual(len(self.cache), 0)
+            self.assertEqual(qwen_call.call_qwen("p", model="m"), '{"A": 80}')
+            self.assertEqual(qwen_call.call_qwen("p", model="m"), '{"A": 80}')
+        self.assertEqual(create.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
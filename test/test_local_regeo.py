@@ -0,0 +1,78 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from util.local_regeo import LocalRegeo, STRtree, regeo_local
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+class TestLocalRegeo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 20 x 20 个 0.01° 见方的“街道”，外加一个带洞的镇和一个 MultiPolygon
+        features = []
+        for i in range(20):
+            for j in range(20):
+                features.append({
+                    "type": "Feature",
+                    "properties": {"province": "测试省", "district": f"区{i}", "township": f"街道{i}-{j}",
+                                   "towncode": f"{i:03d}{j:03d}"},
+                    "geometry": {"type": "Polygon", "coordinates": [square(116 + i * 0.01, 39 + j * 0.01, 0.01)]},
+                })
+        features.append({
+            "type": "Feature",
+            "properties": {"township": "环形镇"},
+            "geometry": {"type": "Polygon", "coordinates": [square(120, 30, 1), square(120.4, 30.4, 0.2)]},
+        })
+        features.append({
+            "type": "Feature",
+            "properties": {"township": "飞地镇"},
+            "geometry": {"type": "MultiPolygon",
+                         "coordinates": [[square(121, 31, 0.1)], [square(122, 32, 0.1)]]},
+        })
+        cls.tmp = tempfile.NamedTemporaryFile("w", suffix=".geojson", delete=False, encoding="utf-8")
+        json.dump({"type": "FeatureCollection", "features": features}, cls.tmp, ensure_ascii=False)
+        cls.tmp.close()
+        cls.index = LocalRegeo.from_geojson(cls.tmp.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.tmp.name)
+
+    def test_lookup_grid(self):
+        info = self.index.lookup(116.055, 39.135)
+        self.assertEqual(info["township"], "街道5-13")
+        self.assertEqual(info["towncode"], "005013")
+
+    def test_hole_and_multipolygon(self):
+        self.assertEqual(self.index.lookup(120.1, 30.1)["township"], "环形镇")
+        self.assertEqual(self.index.lookup(120.5, 30.5), {})
+        self.assertEqual(self.index.lookup(122.05, 32.05)["township"], "飞地镇")
+        self.assertEqual(self.index.lookup(100, 20), {})
+
+    def test_regeo_local_location_string(self):
+        self.assertEqual(regeo_local("116.005,39.005", self.tmp.name)["township"], "街道0-0")
+        self.assertEqual(regeo_local("bad", self.tmp.name), {})
+        self.assertEqual(regeo_local("116.005,39.005", ""), {})
+
+    def test_strtree_matches_brute_force(self):
+        rng = random.Random(7)
+        boxes = []
+        for n in range(500):
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+            boxes.append(((x, y, x + rng.uniform(0, 5), y + rng.uniform(0, 5)), n))
+        tree = STRtree(boxes)
+        for _ in range(200):
+            px, py = rng.uniform(0, 100), rng.uniform(0, 100)
+            expected = {n for (x0, y0, x1, y1), n in boxes if x0 <= px <= x1 and y0 <= py <= y1}
+            self.assertEqual(set(tree.query_point(px, py)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from util import metrics
+from util.metrics import percentile, prf
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile(list(range(101)), 95), 95)
+        self.assertEqual(percentile([5], 99), 5)
+
+    def test_prf(self):
+        self.assertEqual(prf(3, 1, 1), {"p": 0.75, "r": 0.75, "f1": 0.75, "support": 4})
+        self.assertEqual(prf(0, 0, 0), {"p": 0.0, "r": 0.0, "f1": 0.0, "support": 0})
+
+    def test_histogram_summary(self):
+        m = metrics.Metrics()
+        for v in range(101):
+            m.observe("t", v)
+        summary = m.snapshot()["histograms"]["t"]
+        self.assertEqual(summary["p50"], 50)
+        self.assertEqual(summary["p99"], 99)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from util.minhash import Deduper, MinHasher, jaccard, optimal_bands, shingles
+
+
+class TestMinHash(unittest.TestCase):
+
+    def test_shingles(self):
+        self.assertEqual(shingles("杭州 市", 2), {"杭州", "州市"})
+        self.assertEqual(shingles("杭", 3), {"杭"})
+        self.assertEqual(shingles("", 3), set())
+
+    def test_signature_estimates_jaccard(self):
+        hasher = MinHasher(num_perm=256)
+        a = shingles("浙江省杭州市滨江区滨康路000号0幢")
+        b = shingles("浙江省杭州市滨江区滨康路000号")
+        est = float((hasher.signature(a) == hasher.signature(b)).mean())
+        self.assertAlmostEqual(est, jaccard(a, b), delta=0.1)
+
+    def test_optimal_bands(self):
+        b, r = optimal_bands(0.8, 128)
+        self.assertLessEqual(b * r, 128)
+        self.assertAlmostEqual((1 / b) ** (1 / r), 0.8, delta=0.05)
+
+    def test_dedup_keeps_first(self):
+        dedup = Deduper(threshold=0.8)
+        self.assertIsNone(dedup.add(0, "浙江省温州市鹿城区鹿城路0000号"))
+        self.assertIsNone(dedup.add(1, "浙江省杭州市江干区九堡镇三村村一区"))
+        rep, sim = dedup.add(2, "浙江省温州市鹿城区鹿城路000号")
+        self.assertEqual(rep, 0)
+        self.assertGreaterEqual(sim, 0.8)
+        self.assertEqual(dedup.add(3, "浙江省杭州市江干区九堡镇三村村一区")[0], 1)
+        self.assertEqual(set(dedup.kept), {0, 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+import func.amap_call as amap_call
+import resolver
+from amap_stub import AmapStubServer
+
+STRUCTURED = {
+    "text": "<city>北京市</city><district>朝阳区</district><poi>方恒国际中心A座</poi>",
+    "tags": {"city": "北京市", "district": "朝阳区", "poi": "方恒国际中心A座"},
+}
+
+
+async def fake_infer_async(addr_text, max_new_tokens=256, deadline=None):
+    return STRUCTURED
+
+
+class TestResolverAsync(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = AmapStubServer().__enter__()
+        cls.patchers = [
+            mock.patch.object(amap_call, "AMAP_BASE_URL", cls.server.url),
+            mock.patch.object(resolver, "infer", lambda addr_text, max_new_tokens=256, deadline=None: STRUCTURED),
+            mock.patch.object(resolver, "infer_async", fake_infer_async),
+            mock.patch.object(resolver, "search_address", lambda **kwargs: []),
+        ]
+        for p in cls.patchers:
+            p.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for p in cls.patchers:
+            p.stop()
+        cls.server.__exit__(None, None, None)
+
+    def test_async_clients_match_sync(self):
+        async def run():
+            return await asyncio.gather(
+                amap_call.amap_inputtips_async("北京市", "方恒"),
+                amap_call.amap_poi_search_async("", "六道口"),
+                amap_call.amap_geocode_async("北京市", "六道口"),
+                amap_call.regeo_async("116.481197,39.989751"),
+            )
+        tips, pois, loc, info = asyncio.run(run())
+        self.assertEqual(tips, amap_call.amap_inputtips("北京市", "方恒"))
+        self.assertEqual(pois, amap_call.amap_poi_search("", "六道口"))
+        self.assertEqual(loc, amap_call.amap_geocode("北京市", "六道口"))
+        self.assertEqual(info, amap_call.regeo("116.481197,39.989751"))
+
+    def test_fast_path(self):
+        result = asyncio.run(resolver.resolve_address_async("方恒国际中心A座"))
+        self.assertEqual(result["name"], "方恒国际中心A座")
+        self.assertEqual(result["regeo"]["township"], "望京街道")
+
+    def test_structured_path_matches_sync(self):
+        raw = "北京朝阳方恒A座"
+        expected = resolver.resolve_address(raw)
+        result = asyncio.run(resolver.resolve_address_async(raw))
+        expected.pop("duration")
+        result.pop("duration")
+        self.assertEqual(result, expected)
+        self.assertEqual(result["name"], "方恒国际中心A座")
+
+    def test_concurrent_resolves(self):
+        async def run():
+            return await asyncio.gather(*(resolver.resolve_address_async("北京朝阳方恒A座") for _ in range(20)))
+        results = asyncio.run(run())
+        self.assertEqual({r["name"] for r in results}, {"方恒国际中心A座"})
+
+    def test_private_lookup_off_event_loop(self):
+        threads = []
+
+        def search(**kwargs):
+            threads.append(threading.current_thread())
+            return []
+        with mock.patch.object(resolver, "search_address", search):
+            asyncio.run(resolver.resolve_address_async("方恒国际中心A座"))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_local_regeo_off_event_loop(self):
+        threads = []
+
+        def regeo_local(location, path):
+            threads.append(threading.current_thread())
+            return {"township": "望京街道"}
+        with mock.patch.object(resolver, "regeo_local", regeo_local):
+            asyncio.run(resolver.resolve_address_async("方恒国际中心A座"))
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_tagger_backend_off_event_loop(self):
+        import func.struct_llm_call as struct_llm_call
+        threads = []
+
+        def tagger_infer(addr_text):
+            threads.append(threading.current_thread())
+            return {"text": "", "tags": {}}
+        with mock.patch.object(struct_llm_call, "STRUCT_BACKEND", "tagger"), \
+                mock.patch.object(struct_llm_call, "tagger_infer", tagger_infer):
+            asyncio.run(struct_llm_call.infer_async("九堡镇"))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import mock
+
+import func.amap_call as amap_call
+import func.struct_llm_call as struct_llm_call
+import resolver
+from util import metrics
+from util.backend_pool import BackendPool
+from util.circuit_breaker import CircuitBreaker
+from util.kv_cache import KVCache
+from util.stages import StageRunner
+from amap_stub import AmapStubServer
+from tgi_stub import TgiStubServer
+
+STRUCTURED = {
+    "text": "<city>北京市</city><district>朝阳区</district><poi>方恒国际中心A座</poi>",
+    "tags": {"city": "北京市", "district": "朝阳区", "poi": "方恒国际中心A座"},
+}
+
+
+def flaky(fn, failures: int):
+    """前 failures 次调用抛出 JSONDecodeError，之后调用 fn"""
+    calls = []
+
+    def wrapper(*args):
+        calls.append(args)
+        if len(calls) <= failures:
+            raise json.JSONDecodeError("Expecting value", "<html>", 0)
+        return fn(*args)
+    wrapper.calls = calls
+    return wrapper
+
+
+class TestStageRunner(unittest.TestCase):
+
+    def test_retry_then_memo(self):
+        stages = StageRunner(retries=2, backoff_ms=0)
+        fn = flaky(lambda x: x * 2, failures=2)
+        self.assertEqual(stages.run("double", fn, 3), 6)
+        self.assertEqual(stages.run("double", fn, 3), 6)
+        self.assertEqual(len(fn.calls), 3)
+        self.assertEqual(stages.run("double", fn, 4), 8)
+        self.assertEqual(len(fn.calls), 4)
+
+    def test_budget_exhausted(self):
+        stages = StageRunner(retries=5, backoff_ms=0, budgets={"double": 1})
+        fn = flaky(lambda x: x * 2, failures=3)
+        with self.assertRaises(json.JSONDecodeError):
+            stages.run("double", fn, 3)
+        self.assertEqual(len(fn.calls), 2)
+
+    def test_other_errors_not_retried(self):
+        stages = StageRunner(retries=3, backoff_ms=0)
+        calls = []
+
+        def boom():
+            calls.append(1)
+            raise ValueError("bad")
+        with self.assertRaises(ValueError):
+            stages.run("boom", boom)
+        self.assertEqual(len(calls), 1)
+
+    def test_async(self):
+        stages = StageRunner(retries=1, backoff_ms=0)
+        calls = []
+
+        async def fn(x):
+            calls.append(x)
+            if len(calls) == 1:
+                raise json.JSONDecodeError("Expecting value", "", 0)
+            return x + 1
+
+        async def run():
+            return await stages.run_async("inc", fn, 1), await stages.run_async("inc", fn, 1)
+        self.assertEqual(asyncio.run(run()), (2, 2))
+        self.assertEqual(calls, [1, 1])
+
+
+class TestResolverStages(unittest.TestCase):
+
+    def setUp(self):
+        self.server = AmapStubServer().__enter__()
+        self.patchers = [
+            mock.patch.object(amap_call, "AMAP_BASE_URL", self.server.url),
+            mock.patch.object(resolver, "infer", lambda addr_text, max_new_tokens=256, deadline=None: STRUCTURED),
+            mock.patch.object(resolver, "search_address", lambda **kwargs: []),
+            mock.patch.object(resolver, "STAGE_BACKOFF_MS", 0),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.server.__exit__(None, None, None)
+
+    def test_only_failing_stage_retried(self):
+        tips = flaky(amap_call.amap_inputtips, failures=1)
+        with mock.patch.object(resolver, "amap_inputtips", tips):
+            result = resolver.resolve_address("北京朝阳方恒A座")
+        self.assertEqual(result["name"], "方恒国际中心A座")
+        # 快速搜索只执行一次，失败的输入提示查询重试一次
+        self.assertEqual(self.server.requests.count("/v3/place/text"), 1)
+        self.assertEqual(tips.calls[0], tips.calls[1])
+        # 相同的输入提示查询在请求内只发一次
+        sent = tips.calls[1:]
+        self.assertEqual(len(sent), len(set(sent)))
+
+
+class TestStructureStage(unittest.TestCase):
+    """结构化阶段接真实 infer（TGI 替身），验证重试只作用于结构化阶段"""
+
+    def setUp(self):
+        metrics.metrics.reset()
+        self.amap = AmapStubServer().__enter__()
+        self.tgi = TgiStubServer().__enter__()
+        self.private = flaky(resolver.match_private_address, failures=0)
+        self.patchers = [
+            mock.patch.object(amap_call, "AMAP_BASE_URL", self.amap.url),
+            mock.patch.object(resolver, "search_address", lambda **kwargs: []),
+            mock.patch.object(resolver, "match_private_address", self.private),
+            mock.patch.object(resolver, "STAGE_BACKOFF_MS", 0),
+            mock.patch.object(struct_llm_call, "backend_pool", BackendPool([self.tgi.url], name="t.backend")),
+            mock.patch.object(struct_llm_call, "breaker", CircuitBreaker("t.struct", failure_threshold=10)),
+            mock.patch.object(struct_llm_call, "struct_cache", KVCache("", "struct")),
+            mock.patch.object(struct_llm_call, "STRUCT_TAGGER_PATH", ""),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.amap.__exit__(None, None, None)
+        self.tgi.__exit__(None, None, None)
+
+    def test_structure_retried_once(self):
+        self.tgi.bad_replies = 1
+        resolver.resolve_address("北京朝阳方恒A座")
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters["stage.structure.retry"], 1)
+        self.assertNotIn("struct_llm.fallback.error", counters)
+        self.assertEqual(self.tgi.requests.count("/generate"), 2)
+        # 已完成的私有库与快速搜索阶段不重跑
+        self.assertEqual(len(self.private.calls), 1)
+        self.assertEqual(self.amap.requests.count("/v3/place/text"), 1)
+
+    def test_budget_exhausted_falls_back(self):
+        self.tgi.bad_replies = 5
+        with mock.patch.object(resolver, "STAGE_RETRY_BUDGETS", {"structure": 1}):
+            resolver.resolve_address("北京朝阳方恒A座")
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters["stage.structure.retry"], 1)
+        self.assertEqual(counters["stage.structure.failed"], 1)
+        self.assertEqual(counters["struct_llm.fallback.retry"], 1)
+        self.assertEqual(self.tgi.requests.count("/generate"), 2)
+
+    def test_retries_share_deadline(self):
+        self.tgi.delay = 0.5
+        with mock.patch.object(struct_llm_call, "STRUCT_LLM_TIMEOUT", 0.3), \
+                mock.patch.object(struct_llm_call, "STRUCT_LLM_DEADLINE", 0.5):
+            start = time.perf_counter()
+            resolver.resolve_address("北京朝阳方恒A座")
+            elapsed = time.perf_counter() - start
+        counters = metrics.snapshot()["counters"]
+        # 第二次重试只剩 0.2 秒，第三次时截止时刻已过，直接本地兜底
+        self.assertEqual(counters["stage.structure.retry"], 2)
+        self.assertEqual(counters["struct_llm.fallback.deadline"], 1)
+        self.assertEqual(self.tgi.requests.count("/generate"), 2)
+        self.assertLess(elapsed, 0.85)
+
+
+if __name__ == "__main__":
+    unittest.main()
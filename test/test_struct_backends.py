@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+import func.struct_llm_call as struct_llm_call
+from util.backend_pool import BackendPool
+from util.batcher import MicroBatcher
+from util.circuit_breaker import CircuitBreaker
+from util.kv_cache import KVCache
+from tgi_stub import TgiStubServer
+
+
+class TestStructBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.a = TgiStubServer().__enter__()
+        self.b = TgiStubServer().__enter__()
+        self.pool = BackendPool([self.a.url, self.b.url], max_failures=1, probe_interval=3600,
+                                name="test.backend")
+        self.patchers = [
+            mock.patch.object(struct_llm_call, "backend_pool", self.pool),
+            mock.patch.object(struct_llm_call, "breaker", CircuitBreaker("test.struct", failure_threshold=100)),
+            mock.patch.object(struct_llm_call, "struct_cache", KVCache("", "struct")),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.a.__exit__(None, None, None)
+        self.b.__exit__(None, None, None)
+
+    def test_spreads_requests(self):
+        for _ in range(20):
+            res = struct_llm_call.infer("杭州市江干区九堡镇")
+            self.assertEqual(res["tags"], {"poi": "杭州市江干区九堡镇"})
+        self.assertGreater(len(self.a.requests), 0)
+        self.assertGreater(len(self.b.requests), 0)
+
+    def hit_a(self):
+        """后端按在途数 / 延迟随机选择，调用直到故障后端 a 被选中过一次（被摘除）"""
+        for _ in range(50):
+            self.assertEqual(struct_llm_call.infer("九堡镇")["tags"], {"poi": "九堡镇"})
+            if self.a.requests:
+                break
+
+    def test_failover_and_eject(self):
+        self.a.fail = True
+        self.hit_a()
+        for _ in range(5):
+            self.assertEqual(struct_llm_call.infer("九堡镇")["tags"], {"poi": "九堡镇"})
+        self.assertEqual(self.pool.status()[0]["healthy"], False)
+        self.assertLessEqual(len(self.a.requests), 1)
+
+    def test_async_failover_on_bad_reply(self):
+        self.a.bad_replies = 1
+        for _ in range(20):
+            res = asyncio.run(struct_llm_call.infer_async("九堡镇"))
+            self.assertEqual(res["tags"], {"poi": "九堡镇"})
+            self.assertNotIn("fallback", res)
+            if not self.a.bad_replies:
+                break
+        self.assertEqual(self.a.bad_replies, 0)
+
+    def test_probe_recovers(self):
+        self.a.fail = True
+        self.hit_a()
+        self.assertFalse(self.pool.backends[0].healthy)
+        self.pool.probe_once()
+        self.assertFalse(self.pool.backends[0].healthy)
+        self.a.fail = False
+        self.pool.probe_once()
+        self.assertTrue(self.pool.backends[0].healthy)
+
+    def test_least_outstanding(self):
+        busy = self.pool.acquire()
+        other = self.pool.acquire()
+        self.assertIsNot(busy, other)
+        self.pool.release(busy, ok=True)
+        self.assertIs(self.pool.acquire(), busy)
+
+    def test_batch_sends_one_request(self):
+        batcher = MicroBatcher(struct_llm_call.generate_batch, window_ms=100, max_batch=8, name="test.batch")
+        results = {}
+
+        def call(i):
+            results[i] = struct_llm_call.infer(f"九堡镇{i}号")["tags"]
+
+        with mock.patch.object(struct_llm_call, "STRUCT_BATCH_ENABLED", True), \
+                mock.patch.object(struct_llm_call, "_batcher", batcher):
+            threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(results, {i: {"poi": f"九堡镇{i}号"} for i in range(4)})
+        sent = self.a.requests + self.b.requests
+        self.assertNotIn("/generate", sent)
+        self.assertLess(sent.count("/infer_batch"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import func.struct_llm_call as struct_llm_call
+from util.backend_pool import BackendPool
+from util.circuit_breaker import CircuitBreaker
+from util.kv_cache import KVCache
+from tgi_stub import TgiStubServer
+
+
+class TestStructCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = TgiStubServer().__enter__()
+        self.cache = KVCache(os.path.join(self.tmp.name, "cache.db"), "struct")
+        self.patchers = [
+            mock.patch.object(struct_llm_call, "backend_pool", BackendPool([self.server.url], name="t.backend")),
+            mock.patch.object(struct_llm_call, "breaker", CircuitBreaker("t.struct", failure_threshold=100)),
+            mock.patch.object(struct_llm_call, "struct_cache", self.cache),
+            mock.patch.dict(struct_llm_call._versions, clear=True),
+            mock.patch.object(struct_llm_call, "_version_warned", set()),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def generate_calls(self):
+        return self.server.requests.count("/generate")
+
+    def test_hit_after_first_call(self):
+        first = struct_llm_call.infer("杭州市九堡镇三村1号")
+        second = struct_llm_call.infer("杭州市九堡镇 三村1号")  # 空白归一
+        third = struct_llm_call.infer("杭州市九堡镇三村１号")    # 全角数字归一
+        self.assertEqual(first, second)
+        self.assertEqual(second, third)
+        self.assertEqual(self.generate_calls(), 1)
+        self.assertEqual(struct_llm_call.model_version(), "stub-model@stub-sha")
+
+    def test_version_change_invalidates(self):
+        with mock.patch.object(struct_llm_call, "STRUCT_MODEL_VERSION_TTL", 0):
+            struct_llm_call.infer("杭州市九堡镇")
+            self.server.model_sha = "new-sha"  # 已取得版本后换模型，TTL 到期即重新探测
+            struct_llm_call.infer("杭州市九堡镇")
+            struct_llm_call.infer("杭州市九堡镇")
+        self.assertEqual(self.generate_calls(), 2)
+        self.assertEqual(struct_llm_call.model_version(), "stub-model@new-sha")
+
+    def test_mixed_versions_skip_reads(self):
+        other = TgiStubServer().__enter__()
+        self.addCleanup(other.__exit__, None, None, None)
+        other.model_sha = "other-sha"
+        with mock.patch.object(struct_llm_call, "backend_pool", BackendPool([self.server.url, other.url], name="t.backend")):
+            self.assertEqual(struct_llm_call.model_version(), "")
+            for _ in range(4):
+                struct_llm_call.infer("杭州市九堡镇")
+        self.assertEqual(self.server.requests.count("/generate") + other.requests.count("/generate"), 4)
+        # 写入按实际服务的后端版本分键，两个后端都服务过则各一条
+        served = sum("/generate" in server.requests for server in (self.server, other))
+        self.assertEqual(len(self.cache), served)
+
+    def test_fallback_not_cached(self):
+        self.server.fail = True
+        self.assertTrue(struct_llm_call.infer("杭州市九堡镇")["fallback"])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_unknown_version_skips_cache(self):
+        self.server.fail = True
+        self.assertEqual(struct_llm_call.model_version(), "")
+        self.server.fail = False
+        struct_llm_call.infer("杭州市九堡镇")
+        self.assertEqual(len(self.cache), 0)
+
+    def test_probe_outside_lock(self):
+        started = threading.Event()
+        probe = struct_llm_call._probe_version
+
+        def slow_probe(url):
+            if url != "http://slow":
+                return probe(url)
+            started.set()
+            time.sleep(0.5)
+            return "slow@sha"
+
+        with mock.patch.object(struct_llm_call, "_probe_version", slow_probe):
+            t = threading.Thread(target=struct_llm_call.backend_version, args=("http://slow",))
+            t.start()
+            started.wait(5)
+            begin = time.perf_counter()
+            self.assertEqual(struct_llm_call.backend_version("http://slow"), "")  # 探测中，不等待
+            self.assertEqual(struct_llm_call.backend_version(self.server.url), "stub-model@stub-sha")
+            self.assertLess(time.perf_counter() - begin, 0.3)
+            t.join()
+        self.assertEqual(struct_llm_call.backend_version("http://slow"), "slow@sha")
+
+    def test_missing_version_logged_once(self):
+        self.server.fail = True
+        with mock.patch.object(struct_llm_call, "STRUCT_MODEL_VERSION_TTL", 0), \
+                mock.patch.object(struct_llm_call.logger, "warning") as warning:
+            for _ in range(3):
+                self.assertEqual(struct_llm_call.backend_version(self.server.url), "")
+        self.assertEqual(warning.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+
+import func.struct_llm_call as struct_llm_call
+from util.backend_pool import BackendPool
+from util.circuit_breaker import CircuitBreaker
+from util.kv_cache import KVCache
+from util.tag_stream import TagStreamParser
+from tgi_stub import TgiStubServer
+
+
+class TestTagStreamParser(unittest.TestCase):
+
+    def test_incremental(self):
+        parser = TagStreamParser()
+        self.assertEqual(parser.feed("<prov>浙江</pr"), [])
+        self.assertEqual(parser.feed("ov><city>杭"), [("prov", "浙江")])
+        self.assertEqual(parser.feed("州市</city><poi>A</poi><poi>B</poi>"),
+                         [("city", "杭州市"), ("poi", "A"), ("poi", "B")])
+        self.assertEqual(parser.tags, {"prov": "浙江", "city": "杭州市", "poi": ["A", "B"]})
+        self.assertEqual(parser.tags, struct_llm_call.parse_xmlish_tags(parser.text))
+
+
+class TestInferStream(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TgiStubServer().__enter__()
+        self.patchers = [
+            mock.patch.object(struct_llm_call, "backend_pool", BackendPool([self.server.url], name="t.backend")),
+            mock.patch.object(struct_llm_call, "breaker", CircuitBreaker("t.struct", failure_threshold=100)),
+            mock.patch.object(struct_llm_call, "struct_cache", KVCache("", "struct")),
+            mock.patch.object(struct_llm_call, "STRUCT_TAGGER_PATH", ""),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.server.__exit__(None, None, None)
+
+    def test_stream_tags(self):
+        events = list(struct_llm_call.infer_stream("杭州市九堡镇三村1号"))
+        self.assertEqual(events[0], {"tag": "poi", "value": "杭州市九堡镇三村1号"})
+        self.assertEqual(events[-1], {"done": True, "text": "<poi>杭州市九堡镇三村1号</poi>",
+                                      "tags": {"poi": "杭州市九堡镇三村1号"}})
+        self.assertIn("/generate_stream", self.server.requests)
+
+    def test_stream_fallback(self):
+        self.server.fail = True
+        events = list(struct_llm_call.infer_stream("浙江省杭州市西湖区文三路"))
+        self.assertTrue(events[-1]["done"])
+        self.assertTrue(events[-1]["fallback"])
+        self.assertEqual(events[-1]["tags"]["prov"], "浙江省")
+
+
+if __name__ == "__main__":
+    unittest.main()
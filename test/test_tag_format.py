@@ -0,0 +1,55 @@
+import unittest
+
+from resolver import build_structured_fields
+from util.copy_constraint import TAGS
+from util.tag_format import COMPACT, TAG_CODES, XML, convert, detect_format, format_tags, instruction, parse_tags
+from util.tag_stream import TagStreamParser
+
+
+class TestTagFormat(unittest.TestCase):
+
+    pairs = [("prov", "浙江省"), ("city", "杭州市"), ("poi", "A座"), ("poi", "B座"), ("roomno", "101")]
+
+    def test_round_trip(self):
+        xml = format_tags(self.pairs, XML)
+        compact = format_tags(self.pairs, COMPACT)
+        self.assertEqual(compact, "p=浙江省|c=杭州市|o=A座|o=B座|j=101")
+        self.assertEqual(detect_format(xml), XML)
+        self.assertEqual(detect_format(compact), COMPACT)
+        self.assertEqual(parse_tags(xml), parse_tags(compact))
+        self.assertEqual(parse_tags(compact)["poi"], ["A座", "B座"])
+        self.assertEqual(convert(xml, COMPACT), compact)
+        self.assertEqual(convert(compact, XML), xml)
+        self.assertNotEqual(instruction(XML), instruction(COMPACT))
+
+    def test_all_tags_have_codes(self):
+        tags = set(TAGS) | {"roomno", "detail", "direction", "redundant"}
+        self.assertEqual(set(TAG_CODES), tags)
+        self.assertEqual(len(set(TAG_CODES.values())), len(TAG_CODES))
+        pairs = [(tag, f"值{i}") for i, tag in enumerate(sorted(tags))]
+        compact = format_tags(pairs, COMPACT)
+        self.assertTrue(all(len(field.split("=")[0]) == 1 for field in compact.split("|")))
+        self.assertEqual(parse_tags(compact), dict(pairs))
+        self.assertEqual(convert(convert(format_tags(pairs, XML), COMPACT), XML), format_tags(pairs, XML))
+        xml_fields = build_structured_fields("", {"tags": parse_tags(format_tags(pairs, XML))})
+        self.assertEqual(build_structured_fields("", {"tags": parse_tags(compact)}), xml_fields)
+
+    def test_stream_compact(self):
+        parser = TagStreamParser()
+        self.assertEqual(parser.feed("p=浙江"), [])
+        self.assertEqual(parser.feed("省|c=杭"), [("prov", "浙江省")])
+        self.assertEqual(parser.feed("州市"), [])
+        self.assertEqual(parser.close(), [("city", "杭州市")])
+        self.assertEqual(parser.tags, parse_tags(parser.text))
+
+    def test_resolver_fields(self):
+        xml = build_structured_fields("", {"tags": parse_tags(format_tags(self.pairs, XML))})
+        compact = build_structured_fields("", {"tags": parse_tags(format_tags(self.pairs, COMPACT))})
+        raw_codes = build_structured_fields("", {"tags": {"p": "浙江省", "c": "杭州市", "o": ["A座", "B座"],
+                                                          "roomno": "101"}})
+        self.assertEqual(xml, compact)
+        self.assertEqual(xml, raw_codes)
+
+
+if __name__ == "__main__":
+    unittest.main()
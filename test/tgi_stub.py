@@ -0,0 +1,162 @@
+# tgi_stub.py
+"""
+TGI（text-generation-inference）接口的本地替身，用于离线测试结构化调用。
+
+支持：POST /generate、POST /generate_stream、POST /infer_batch、GET /health、GET /info
+/generate 把 prompt 中“### 输入：”之后的地址原样包进 <poi> 标签返回；/generate_stream 以 SSE 每次两个字符逐段返回同样内容；
+/infer_batch 模拟 lora/infer_serv.py，把 texts 中每条地址包进 <poi> 标签按序返回。
+bad_replies > 0 时接下来的若干次 POST 返回非 JSON 的 HTML 页面（模拟网关错误页）。
+用法：
+    python test/tgi_stub.py --port 8766
+    STRUCT_LLM_URL=http://127.0.0.1:8766 python func/struct_llm_call.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+_INPUT_RE = re.compile(r"### 输入：(.*?)\n### 输出", re.DOTALL)
+
+
+class TgiStubHandler(BaseHTTPRequestHandler):
+
+    def _reply(self, body, status: int = 200):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reply_html(self):
+        data = b"<html><body>502 Bad Gateway</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        self.server.requests.append(path)
+        if self.server.fail:
+            return self._reply({"error": "unavailable"}, 503)
+        if path == "/health":
+            return self._reply({})
+        if path == "/info":
+            return self._reply({"model_id": "stub-model", "model_sha": self.server.model_sha})
+        self._reply({"error": "not found"}, 404)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        self.server.requests.append(path)
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.fail:
+            return self._reply({"error": "unavailable"}, 503)
+        if self.server.bad_replies > 0:
+            self.server.bad_replies -= 1
+            return self._reply_html()
+        if path == "/infer_batch":
+            results = [{"text": f"<poi>{t}</poi>", "tags": {"poi": t}, "tokens": 0} for t in payload.get("texts", [])]
+            return self._reply({"results": results})
+        if path not in ("/generate", "/generate_stream"):
+            return self._reply({"error": "not found"}, 404)
+        m = _INPUT_RE.search(payload.get("inputs", ""))
+        addr = m.group(1).strip() if m else ""
+        text = f"<poi>{addr}</poi>"
+        if path == "/generate":
+            return self._reply({"generated_text": text})
+        self._stream(text)
+
+    def _stream(self, text: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunks = [text[i:i + 2] for i in range(0, len(text), 2)]
+        for i, chunk in enumerate(chunks):
+            event = {"token": {"text": chunk, "special": False},
+                     "generated_text": text if i == len(chunks) - 1 else None}
+            self.wfile.write(f"data:{json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TgiStubServer:
+    """后台线程中的 TGI 替身；fail=True 时所有请求返回 503，delay 为每次生成的延迟（秒），bad_replies 为接下来返回非 JSON 的次数，
+    model_sha 为 /info 报告的模型版本"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), TgiStubHandler)
+        self.httpd.requests = []
+        self.httpd.fail = False
+        self.httpd.delay = 0.0
+        self.httpd.bad_replies = 0
+        self.httpd.model_sha = "stub-sha"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> list:
+        return self.httpd.requests
+
+    @property
+    def fail(self) -> bool:
+        return self.httpd.fail
+
+    @fail.setter
+    def fail(self, value: bool):
+        self.httpd.fail = value
+
+    @property
+    def delay(self) -> float:
+        return self.httpd.delay
+
+    @delay.setter
+    def delay(self, value: float):
+        self.httpd.delay = value
+
+    @property
+    def bad_replies(self) -> int:
+        return self.httpd.bad_replies
+
+    @bad_replies.setter
+    def bad_replies(self, value: int):
+        self.httpd.bad_replies = value
+
+    @property
+    def model_sha(self) -> str:
+        return self.httpd.model_sha
+
+    @model_sha.setter
+    def model_sha(self, value: str):
+        self.httpd.model_sha = value
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    args = ap.parse_args()
+    server = TgiStubServer(args.host, args.port)
+    print(f"TGI 替身服务：{server.url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,281 @@
+"""
+纯 Python 的轻量地址要素序列标注器（字级 BIO + 平均感知机 + Viterbi 解码），CPU 上单条毫秒级。
+
+- 训练语料：lora/events.jsonl 的 content_tags（<prov>浙江</prov><city>杭州市</city>...）
+- 输出与 func.struct_llm_call.infer 相同：{"text": "<prov>..</prov>...", "tags": {...}}
+- 模型文件为 JSON（支持 .gz），由 lora/train_tagger.py 训练生成、lora/eval_tagger.py 评估
+"""
+import gzip
+import json
+import os
+import random
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_SPAN_RE = re.compile(r"<([a-zA-Z0-9_]+)>(.*?)</\1>", re.DOTALL)
+
+BOS, EOS = "<s>", "</s>"
+
+
+# ✅ 标注格式转换
+def spans_from_tagged(tagged: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    解析 <tag>片段</tag> 串为原文与 [(tag, 片段)]，标签之外的字符记为 ("O", 片段)
+    :return: (原文, spans)
+    """
+    spans, pos = [], 0
+    for m in _SPAN_RE.finditer(tagged or ""):
+        if m.start() > pos:
+            spans.append(("O", tagged[pos:m.start()]))
+        spans.append((m.group(1), m.group(2)))
+        pos = m.end()
+    if pos < len(tagged or ""):
+        spans.append(("O", tagged[pos:]))
+    return "".join(text for _tag, text in spans), spans
+
+
+def spans_to_bio(spans: List[Tuple[str, str]]) -> List[str]:
+    labels = []
+    for tag, text in spans:
+        if tag == "O":
+            labels += ["O"] * len(text)
+        elif text:
+            labels += [f"B-{tag}"] + [f"I-{tag}"] * (len(text) - 1)
+    return labels
+
+
+def bio_to_spans(text: str, labels: List[str]) -> List[Tuple[str, str]]:
+    """BIO 序列 → [(tag, 片段)]，O 片段丢弃；孤立的 I-x 视为新片段开始"""
+    spans: List[Tuple[str, str]] = []
+    cur_tag, cur = None, []
+    for ch, label in zip(text, labels):
+        prefix, _, tag = label.partition("-")
+        if prefix == "I" and tag == cur_tag:
+            cur.append(ch)
+            continue
+        if cur_tag:
+            spans.append((cur_tag, "".join(cur)))
+        cur_tag, cur = (tag, [ch]) if prefix in ("B", "I") else (None, [])
+    if cur_tag:
+        spans.append((cur_tag, "".join(cur)))
+    return spans
+
+
+def spans_to_result(spans: List[Tuple[str, str]]) -> Dict:
+    """与 parse_xmlish_tags 一致：同名标签合并为 list（去重）"""
+    tags: Dict = {}
+    for tag, value in spans:
+        value = value.strip()
+        if not value:
+            continue
+        if tag not in tags:
+            tags[tag] = value
+        elif isinstance(tags[tag], list):
+            if value not in tags[tag]:
+                tags[tag].append(value)
+        elif value != tags[tag]:
+            tags[tag] = [tags[tag], value]
+    text = "".join(f"<{tag}>{value}</{tag}>" for tag, value in spans if value.strip())
+    return {"text": text, "tags": tags}
+
+
+# ✅ 特征
+def _char_type(ch: str) -> str:
+    if ch.isdigit():
+        return "D"
+    if "a" <= ch.lower() <= "z":
+        return "L"
+    if "一" <= ch <= "鿿":
+        return "H"
+    return "P"
+
+
+def char_features(chars: List[str], i: int) -> List[str]:
+    padded = lambda k: chars[k] if 0 <= k < len(chars) else (BOS if k < 0 else EOS)
+    c_2, c_1, c0, c1, c2 = (padded(i + d) for d in (-2, -1, 0, 1, 2))
+    return [
+        "b",
+        "c0=" + c0, "c-1=" + c_1, "c1=" + c1, "c-2=" + c_2, "c2=" + c2,
+        "c-1c0=" + c_1 + c0, "c0c1=" + c0 + c1, "c-2c-1=" + c_2 + c_1, "c1c2=" + c1 + c2,
+        "c-1c1=" + c_1 + c1,
+        "t=" + _char_type(c0) + _char_type(c_1) + _char_type(c1),
+    ]
+
+
+class AddressTagger:
+    """
+    :param labels: 标签集合（"O"、"B-x"、"I-x"）
+    :param weights: {特征: {标签: 权重}}
+    :param transitions: {"前标签 后标签": 权重}，含句首 "<s> 标签"
+    """
+
+    def __init__(self, labels: List[str], weights: Dict[str, Dict[str, float]],
+                 transitions: Dict[str, float]):
+        self.labels = list(labels)
+        self.weights = weights
+        self.transitions = transitions
+        # BIO 约束：I-x 只能接在 B-x / I-x 之后；预先拼好转移键，解码时免去字符串拼接
+        self._prev = {
+            y: [(p, f"{p} {y}") for p in self.labels
+                if not y.startswith("I-") or p[2:] == y[2:] and p != "O"]
+            for y in self.labels
+        }
+        self._start = [y for y in self.labels if not y.startswith("I-")]
+
+    # -------------------- 解码 --------------------
+    def _emissions(self, chars: List[str]) -> List[Dict[str, float]]:
+        out = []
+        for i in range(len(chars)):
+            scores = defaultdict(float)
+            for feat in char_features(chars, i):
+                for label, w in self.weights.get(feat, {}).items():
+                    scores[label] += w
+            out.append(scores)
+        return out
+
+    def viterbi(self, chars: List[str]) -> List[str]:
+        if not chars:
+            return []
+        trans = self.transitions
+        emissions = self._emissions(chars)
+        score = {y: trans.get(f"{BOS} {y}", 0.0) + emissions[0][y] for y in self._start}
+        back = []
+        for i in range(1, len(chars)):
+            em = emissions[i]
+            nxt, ptr = {}, {}
+            for y in self.labels:
+                best_p, best_s = None, float("-inf")
+                for p, key in self._prev[y]:
+                    prev = score.get(p)
+                    if prev is None:
+                        continue
+                    s = prev + trans.get(key, 0.0)
+                    if s > best_s:
+                        best_p, best_s = p, s
+                if best_p is not None:
+                    nxt[y] = best_s + em[y]
+                    ptr[y] = best_p
+            score = nxt
+            back.append(ptr)
+        label = max(score, key=score.get)
+        path = [label]
+        for ptr in reversed(back):
+            label = ptr[label]
+            path.append(label)
+        return path[::-1]
+
+    def predict(self, text: str) -> List[str]:
+        return self.viterbi(list(text))
+
+    def tag(self, text: str) -> Dict:
+        """:return: {"text": 标签串, "tags": {标签: 片段或片段列表}}，与 infer 一致"""
+        text = text or ""
+        return spans_to_result(bio_to_spans(text, self.predict(text)))
+
+    # -------------------- 持久化 --------------------
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "labels": self.labels, "weights": self.weights,
+                       "transitions": self.transitions}, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "AddressTagger":
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["labels"], data["weights"], data["transitions"])
+
+
+# ✅ 平均感知机训练
+class PerceptronTrainer:
+    """结构化平均感知机；权重平均采用“时间戳 + 累计量”懒更新"""
+
+    def __init__(self, labels: Iterable[str]):
+        self.labels = sorted(set(labels) | {"O"})
+        self.emit: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.trans: Dict[str, float] = defaultdict(float)
+        self.total: Dict[tuple, float] = defaultdict(float)
+        self.stamp: Dict[tuple, int] = defaultdict(int)
+        self.t = 0
+        # 训练期间解码直接读取当前（未平均）权重
+        self.tagger = AddressTagger(self.labels, self.emit, self.trans)
+
+    def _current(self, key: tuple) -> float:
+        return self.emit[key[0]][key[1]] if len(key) == 2 else self.trans[key[0]]
+
+    def _update(self, key: tuple, delta: float):
+        """key 为 (特征, 标签) 或 (转移,)"""
+        self.total[key] += (self.t - self.stamp[key]) * self._current(key)
+        self.stamp[key] = self.t
+        if len(key) == 2:
+            self.emit[key[0]][key[1]] += delta
+        else:
+            self.trans[key[0]] += delta
+
+    def train_one(self, chars: List[str], gold: List[str]):
+        self.t += 1
+        pred = self.tagger.viterbi(chars)
+        if pred == gold:
+            return
+        for i, (g, p) in enumerate(zip(gold, pred)):
+            g_prev = gold[i - 1] if i else BOS
+            p_prev = pred[i - 1] if i else BOS
+            if g != p:
+                for feat in char_features(chars, i):
+                    self._update((feat, g), 1.0)
+                    self._update((feat, p), -1.0)
+            if (g_prev, g) != (p_prev, p):
+                self._update((f"{g_prev} {g}",), 1.0)
+                self._update((f"{p_prev} {p}",), -1.0)
+
+    def train(self, samples: List[Tuple[str, List[str]]], epochs: int = 5, seed: int = 42,
+              callback=None) -> AddressTagger:
+        rng = random.Random(seed)
+        samples = list(samples)
+        for epoch in range(epochs):
+            rng.shuffle(samples)
+            for text, gold in samples:
+                self.train_one(list(text), gold)
+            if callback:
+                callback(epoch + 1, self.averaged())
+        return self.averaged()
+
+    def _average(self, key: tuple) -> float:
+        total = self.total[key] + (self.t - self.stamp[key]) * self._current(key)
+        return round(total / max(1, self.t), 4)
+
+    def averaged(self) -> AddressTagger:
+        emit: Dict[str, Dict[str, float]] = {}
+        for feat, labels in self.emit.items():
+            for label in labels:
+                value = self._average((feat, label))
+                if value:
+                    emit.setdefault(feat, {})[label] = value
+        trans = {k: v for k in self.trans if (v := self._average((k,)))}
+        return AddressTagger(self.labels, emit, trans)
+
+
+def load_events(path: str) -> List[Tuple[str, List[str]]]:
+    """读取 events.jsonl，返回 [(原文, BIO 标签)]"""
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            text, spans = spans_from_tagged(json.loads(line).get("content_tags", ""))
+            if text:
+                samples.append((text, spans_to_bio(spans)))
+    return samples
+
+
+@lru_cache(maxsize=4)
+def load_tagger(path: str) -> Optional[AddressTagger]:
+    """按路径加载并缓存模型；文件不存在时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    return AddressTagger.load(path)
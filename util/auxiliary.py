@@ -0,0 +1,162 @@
+"""
+辅助位置描述（I 字段）的本地几何打分：
+解析“西北角”“往东走100米”“对面”“附近200米”等方位/距离短语，
+按候选 POI 相对锚点的方位角与距离计算 0~100 的 auxiliary_score。
+“前面”“后面”“左边”等依赖参照朝向的描述无法在本地判断，返回 None 交由大模型处理。
+"""
+import math
+import re
+from typing import Dict, List, Optional
+
+from util.geo import distance, bearing
+
+# 方位词 → 方位角（正北为 0，顺时针）；双字方位优先匹配
+DIRECTIONS = {
+    "东北": 45.0, "东南": 135.0, "西南": 225.0, "西北": 315.0,
+    "东": 90.0, "南": 180.0, "西": 270.0, "北": 0.0,
+}
+# 只认方位短语，不认地名中的方位字（南京路、东方红、西单）：
+# 前有“往/向/朝”，或后接方位后缀 / 距离 / “约”，或整段就是方位词
+_DIRS = "|".join(DIRECTIONS)
+_DIRECTION_RE = re.compile(
+    rf"(?:往|向|朝)({_DIRS})"
+    rf"|({_DIRS})(?=角|侧|边|面|方向|方位|门|口|约|大约|走|行|\d)"
+    rf"|^({_DIRS})$"
+)
+
+# 依赖参照物朝向的相对方位，本地无法判断
+_RELATIVE_RE = re.compile(r"前|后|左|右|里侧|外侧")
+
+# 距离：阿拉伯数字或中文数字 + 单位；“几十米”“几百米”等概数（概数须排在中文数字之前，否则“一两百”会被当作数字）
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_UNITS = {"十": 10, "百": 100, "千": 1000}
+_DISTANCE_RE = re.compile(r"(几十|几百|一两百|两三百|\d+(?:\.\d+)?|[零一二两三四五六七八九十百千]+)\s*(米|m|公里|千米|km)", re.IGNORECASE)
+_ROUGH = {"几十": 50, "几百": 300, "一两百": 150, "两三百": 250}
+
+# 无方位的定性描述 → (期望距离, 衰减尺度)，单位：米
+_NEAR_WORDS = [
+    (re.compile(r"对面"), 50.0, 80.0),
+    (re.compile(r"楼上|楼下|里面|内部|院内"), 0.0, 50.0),
+    (re.compile(r"旁边|隔壁|边上|旁|附近|周边|周围|一带"), 0.0, 150.0),
+]
+
+
+def _cn_to_number(text: str) -> Optional[float]:
+    """中文数字转数值（支持到千位），如“两百五十”→250"""
+    total, current = 0, 0
+    for ch in text:
+        if ch in _CN_DIGITS:
+            current = _CN_DIGITS[ch]
+        elif ch in _CN_UNITS:
+            total += (current or 1) * _CN_UNITS[ch]
+            current = 0
+        else:
+            return None
+    return float(total + current)
+
+
+def parse_distance(text: str) -> Optional[float]:
+    """提取短语中的距离（米），无距离返回 None"""
+    m = _DISTANCE_RE.search(text or "")
+    if not m:
+        return None
+    num, unit = m.group(1), m.group(2).lower()
+    if num in _ROUGH:
+        value = float(_ROUGH[num])
+    elif re.fullmatch(r"\d+(?:\.\d+)?", num):
+        value = float(num)
+    else:
+        value = _cn_to_number(num)
+        if value is None:
+            return None
+    if unit in ("公里", "千米", "km"):
+        value *= 1000
+    return value
+
+
+def parse_auxiliary(text: str) -> Optional[Dict]:
+    """
+    解析辅助位置描述
+    :return: {"bearing": 方位角或 None, "distance": 期望距离(米)或 None, "decay": 距离衰减尺度(米)}；
+             无法本地判断时返回 None
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+
+    m = _DIRECTION_RE.search(text)
+    direction = DIRECTIONS[next(g for g in m.groups() if g)] if m else None
+    dist = parse_distance(text)
+
+    if direction is None and _RELATIVE_RE.search(text) and "对面" not in text:
+        return None
+
+    if direction is not None:
+        # “西北角”“东门”离锚点较近，“东侧”“北面”次之
+        decay = 200.0 if re.search(r"角|门|口", text) else 400.0
+        return {"bearing": direction, "distance": dist, "decay": decay}
+
+    if dist is not None:
+        return {"bearing": None, "distance": dist, "decay": 300.0}
+
+    for pattern, expected, decay in _NEAR_WORDS:
+        if pattern.search(text):
+            return {"bearing": None, "distance": expected or None, "decay": decay}
+
+    return None
+
+
+def parse_location(location) -> Optional[tuple]:
+    """解析 "lng,lat" 字符串，非法时返回 None"""
+    try:
+        lng, lat = map(float, str(location).split(","))
+        return lng, lat
+    except (TypeError, ValueError):
+        return None
+
+
+def distance_m(anchor: tuple, location: tuple) -> float:
+    """两点 (lng, lat) 间的球面距离（米）"""
+    return distance(anchor[1], anchor[0], location[1], location[0]) * 1000  # util.geo.distance 单位为公里
+
+
+def score_candidate(anchor: tuple, location: tuple, spec: Dict) -> float:
+    """按方位与距离为单个候选打分（0~100）"""
+    (lng0, lat0), (lng1, lat1) = anchor, location
+    d = distance_m(anchor, location)
+
+    if spec["bearing"] is None:
+        dir_score = 1.0
+    elif d < 1:
+        dir_score = 0.5  # 与锚点重合，方位无意义
+    else:
+        diff = abs((bearing(lat0, lng0, lat1, lng1) - spec["bearing"] + 180) % 360 - 180)
+        dir_score = max(0.0, math.cos(math.radians(diff))) ** 2
+
+    if spec["distance"] is not None:
+        sigma = max(30.0, 0.5 * spec["distance"])
+        dist_score = math.exp(-0.5 * ((d - spec["distance"]) / sigma) ** 2)
+    else:
+        dist_score = math.exp(-d / spec["decay"])
+
+    return round(100 * dir_score * dist_score, 2)
+
+
+def score_auxiliary(anchor_location: str, candidates: List[Dict], auxiliary: str) -> Optional[List[float]]:
+    """
+    本地计算每个候选与辅助描述的匹配分数
+    :param anchor_location: 锚点坐标 "lng,lat"
+    :param candidates: 候选 POI 列表（含 location 字段）
+    :param auxiliary: 辅助描述，如“西北角”“往东走100米”
+    :return: 与 candidates 对齐的分数列表；描述无法解析时返回 None
+    """
+    spec = parse_auxiliary(auxiliary)
+    anchor = parse_location(anchor_location)
+    if spec is None or anchor is None:
+        return None
+
+    scores = []
+    for poi in candidates:
+        location = parse_location(poi.get("location", ""))
+        scores.append(score_candidate(anchor, location, spec) if location else 0.0)
+    return scores
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+import requests
+
+from util import metrics
+
+# ✅ 客户端负载均衡：多个同构推理后端（如多台 TGI）之间按“在途请求数最少、延迟最低”选择，
+# 连续失败的后端被摘除，后台定期探活（GET /health）恢复后重新加入
+
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0          # 在途请求数
+        self.latency = 0.0            # 延迟 EWMA（秒）
+        self.failures = 0             # 连续失败次数
+        self.healthy = True
+
+    def status(self) -> dict:
+        return {"url": self.url, "healthy": self.healthy, "outstanding": self.outstanding,
+                "latency_ms": round(self.latency * 1000, 1), "failures": self.failures}
+
+
+class NoHealthyBackend(RuntimeError):
+    pass
+
+
+class BackendClientError(Exception):
+    """请求本身有误（如 4xx），不代表后端故障"""
+
+
+class BackendPool:
+    """
+    :param urls: 后端地址列表
+    :param max_failures: 连续失败多少次后摘除
+    :param probe_interval: 摘除后探活间隔（秒）
+    :param probe_path: 探活路径，返回 2xx 视为恢复
+    :param name: 指标名前缀
+    """
+
+    def __init__(self, urls: List[str], max_failures: int = 3, probe_interval: float = 5.0,
+                 probe_path: str = "/health", name: str = "backend"):
+        self.backends = [Backend(u) for u in urls if u.strip()]
+        if not self.backends:
+            raise ValueError("后端地址列表为空")
+        self.max_failures = max(1, max_failures)
+        self.probe_interval = probe_interval
+        self.probe_path = probe_path
+        self.name = name
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self.backends)
+
+    def acquire(self, exclude=()) -> Backend:
+        """
+        选择在途请求最少的健康后端（并列时取延迟较低者），并计入在途数；
+        全部被摘除时仍在其中选择（fail-open），由调用方的熔断/降级兜底
+        """
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                raise NoHealthyBackend(f"{self.name}: 无可用后端")
+            pool = [b for b in candidates if b.healthy] or candidates
+            low = min(b.outstanding for b in pool)
+            pool = [b for b in pool if b.outstanding == low]
+            best = min(b.latency for b in pool)
+            backend = random.choice([b for b in pool if b.latency <= best * 1.2 + 0.005])
+            backend.outstanding += 1
+        self._report(backend)
+        return backend
+
+    def release(self, backend: Backend, ok: bool, latency: float = None):
+        with self._lock:
+            backend.outstanding = max(0, backend.outstanding - 1)
+            if ok:
+                backend.failures = 0
+                if latency is not None:
+                    backend.latency = latency if backend.latency == 0 else 0.8 * backend.latency + 0.2 * latency
+            else:
+                backend.failures += 1
+                if backend.healthy and backend.failures >= self.max_failures:
+                    backend.healthy = False
+                    metrics.inc(f"{self.name}.ejected")
+                    self._ensure_prober()
+        self._report(backend)
+
+    @contextmanager
+    def use(self, exclude=()):
+        """
+        with pool.use() as backend: ...
+        正常退出记为成功；抛出异常记为失败（BackendClientError 除外，请求本身有误不计入后端健康）
+        """
+        backend = self.acquire(exclude)
+        start = time.perf_counter()
+        try:
+            yield backend
+        except BackendClientError:
+            self.release(backend, ok=True)
+            raise
+        except Exception:
+            self.release(backend, ok=False)
+            raise
+        self.release(backend, ok=True, latency=time.perf_counter() - start)
+
+    def _report(self, backend: Backend):
+        metrics.set_gauge(f"{self.name}.{backend.url}.outstanding", backend.outstanding)
+        metrics.set_gauge(f"{self.name}.{backend.url}.healthy", int(backend.healthy))
+
+    def status(self) -> List[dict]:
+        with self._lock:
+            return [b.status() for b in self.backends]
+
+    # -------------------- 探活 --------------------
+    def probe(self, backend: Backend) -> bool:
+        try:
+            resp = requests.get(f"{backend.url}{self.probe_path}", timeout=2)
+            return resp.status_code < 300
+        except requests.RequestException:
+            return False
+
+    def probe_once(self):
+        """探测所有已摘除的后端，恢复者重新加入"""
+        for backend in [b for b in self.backends if not b.healthy]:
+            if self.probe(backend):
+                with self._lock:
+                    backend.healthy = True
+                    backend.failures = 0
+                metrics.inc(f"{self.name}.recovered")
+                self._report(backend)
+
+    def _ensure_prober(self):
+        # 调用方已持有 self._lock
+        if self._prober is None or not self._prober.is_alive():
+            self._prober = threading.Thread(target=self._probe_loop, name=f"{self.name}-prober", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            self.probe_once()
+            with self._lock:
+                if all(b.healthy for b in self.backends):
+                    self._prober = None
+                    return
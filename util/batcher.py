@@ -0,0 +1,86 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List
+
+from util import metrics
+
+# ✅ 进程内微批处理：把短时间窗口内并发到达的单条请求合并成一批交给 handler，
+# 再把每条结果路由回各自的调用方。适用于多线程（Flask 工作线程）同时调用同一个远程模型的场景。
+
+
+class MicroBatcher:
+    """
+    :param handler: 批处理函数，输入 List[item]，返回等长且同序的结果列表；
+                    单条失败可在对应位置返回 Exception 实例，整批失败直接抛出
+    :param window_ms: 收到第一条请求后最多再等待多久凑批（毫秒）
+    :param max_batch: 单批最大条数，凑满立即发送
+    :param max_inflight: 同时在途的批次数
+    :param name: 指标名前缀（{name}.batch_size / {name}.wait_ms）
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], window_ms: float = 5,
+                 max_batch: int = 16, max_inflight: int = 4, name: str = "batch"):
+        self.handler = handler
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self.name = name
+        self.queue: "queue.Queue" = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix=f"{name}-worker")
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name=f"{self.name}-collector", daemon=True)
+                    self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        self.queue.put((item, fut, time.perf_counter()))
+        self._ensure_thread()
+        return fut
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        return self.submit(item).result(timeout)
+
+    def _collect(self) -> list:
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            now = time.perf_counter()
+            for _item, _fut, enqueued in batch:
+                metrics.observe(f"{self.name}.wait_ms", (now - enqueued) * 1000)
+            metrics.observe(f"{self.name}.batch_size", len(batch))
+            metrics.set_gauge(f"{self.name}.queue_depth", self.queue.qsize())
+            self.pool.submit(self._run, batch)
+
+    def _run(self, batch: list):
+        try:
+            results = self.handler([item for item, _fut, _t in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"批处理结果数量不符：{len(results)} != {len(batch)}")
+        except Exception as e:
+            for _item, fut, _t in batch:
+                fut.set_exception(e)
+            return
+        for (_item, fut, _t), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
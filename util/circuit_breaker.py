@@ -0,0 +1,93 @@
+import threading
+import time
+
+from util import metrics
+
+# ✅ 熔断器：下游连续失败达到阈值后熔断（open），期间直接走降级逻辑；
+# 冷却 recovery_timeout 秒后进入半开（half_open），放行少量试探请求，成功则恢复（closed），失败则重新熔断。
+# 状态迁移计入指标：{name}.transition.{旧状态}_to_{新状态}，当前状态见仪表 {name}.state（0=closed 1=half_open 2=open）
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    :param name: 指标名前缀
+    :param failure_threshold: 连续失败多少次后熔断
+    :param recovery_timeout: 熔断后多久进入半开（秒）
+    :param half_open_max: 半开状态下同时放行的试探请求数
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max = max(1, half_open_max)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        metrics.set_gauge(f"{name}.state", _STATE_CODES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, new_state: str):
+        old, self._state = self._state, new_state
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+        self._trials = 0
+        metrics.inc(f"{self.name}.transition.{old}_to_{new_state}")
+        metrics.set_gauge(f"{self.name}.state", _STATE_CODES[new_state])
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+
+    def allow(self) -> bool:
+        """是否放行本次请求；放行后必须调用 record_success / record_failure 之一"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_max:
+                self._trials += 1
+                return True
+            metrics.inc(f"{self.name}.rejected")
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def call(self, fn, *args, **kwargs):
+        """熔断保护下调用 fn；熔断中抛出 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} 已熔断")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
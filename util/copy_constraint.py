@@ -0,0 +1,197 @@
+"""
+约束解码：模型输出只能是“已知标签 + 从输入中拷贝的片段”。
+
+输出文法：<tag>片段</tag><tag>片段</tag>...
+- tag 只能取 TAGS 中的已知标签，闭合标签必须与开标签一致
+- 片段只能由输入中的字符组成：连续拷贝输入子串；字符边界处允许向后跳到输入的另一处继续拷贝
+  （bio2sft 会把同类型的多段按输入顺序直接拼接成一个片段）
+- 输入中的非空白字符全部被拷贝过之后只允许输出 EOS
+
+自动机按 UTF-8 字节推进，与分词器无关；VocabTrie 把词表组织成字节前缀树，
+沿前缀树与自动机同步深搜即可得到当前状态下允许的全部 token。
+"""
+from typing import Dict, Iterable, List, Optional
+
+# 与 lora/events.jsonl 的标签集合一致
+TAGS = (
+    "prov", "city", "district", "town", "community", "village_group", "devzone",
+    "road", "roadno", "intersection", "poi", "subpoi", "houseno", "cellno", "floorno",
+    "assist", "distance",
+)
+
+_LT, _GT = ord("<"), ord(">")
+_SPACES = frozenset(b" \t\r\n")
+
+
+def _is_continuation(b: int) -> bool:
+    return b & 0xC0 == 0x80
+
+
+class CopyConstraint:
+    """
+    单条输入的输出自动机；状态为不可变元组，可作为缓存键：
+    - ("start", covered)                   尚未输出任何标签（允许前导空白）
+    - ("between", covered)                 标签之间
+    - ("open", 已读标签名, covered)          读到 "<" 之后
+    - ("value", 标签, 已拷贝字节, 候选结束位置, covered)
+    - ("close", 标签, 已匹配字节数, 已拷贝字节, covered)
+    covered 为位掩码，记录输入中已被拷贝过的字节位置
+
+    :param text: 地址原文
+    :param tags: 允许的标签集合
+    """
+
+    def __init__(self, text: str, tags: Iterable[str] = TAGS):
+        self.data = (text or "").encode("utf-8")
+        self.n = len(self.data)
+        self.tags = {t.encode("ascii") for t in tags}
+        self.tag_prefixes = {t[:i] for t in self.tags for i in range(len(t) + 1)}
+        self.full = (1 << self.n) - 1
+        # 空白无需拷贝，预先视为已覆盖
+        self.start = ("start", sum(1 << i for i, b in enumerate(self.data) if b in _SPACES))
+        # 字节 → 以该字节开头的拷贝之后的位置
+        starts: Dict[int, set] = {}
+        for i, b in enumerate(self.data):
+            if not _is_continuation(b):
+                starts.setdefault(b, set()).add(i + 1)
+        self._starts = {b: frozenset(v) for b, v in starts.items()}
+
+    def _boundary(self, pos: int) -> bool:
+        return pos >= self.n or not _is_continuation(self.data[pos])
+
+    def step(self, state: tuple, b: int) -> Optional[tuple]:
+        """读入一个字节；不合法时返回 None"""
+        kind = state[0]
+        if kind in ("start", "between"):
+            covered = state[1]
+            if b == _LT and covered != self.full:
+                return ("open", b"", covered)
+            if kind == "start" and b in _SPACES:
+                return state
+            return None
+
+        if kind == "open":
+            _k, name, covered = state
+            if b == _GT:
+                return ("value", name, b"", None, covered) if name in self.tags else None
+            name += bytes((b,))
+            return ("open", name, covered) if name in self.tag_prefixes else None
+
+        if kind == "value":
+            _k, tag, value, cands, covered = state
+            at_boundary = cands is None or any(self._boundary(p) for p in cands)
+            if b == _LT:
+                return ("close", tag, 1, value, covered) if value and at_boundary else None
+            nxt = set()
+            if cands is not None:
+                nxt.update(p + 1 for p in cands if p < self.n and self.data[p] == b)
+            if at_boundary and not _is_continuation(b):
+                # 跳转只能向后（同类型多段按输入顺序拼接）
+                after = 0 if cands is None else min(cands)
+                nxt.update(p for p in self._starts.get(b, ()) if p > after)
+            return ("value", tag, value + bytes((b,)), frozenset(nxt), covered) if nxt else None
+
+        if kind == "close":
+            _k, tag, k, value, covered = state
+            expected = b"</" + tag + b">"
+            if b != expected[k]:
+                return None
+            if k + 1 < len(expected):
+                return ("close", tag, k + 1, value, covered)
+            return ("between", self.cover(covered, value))
+        return None
+
+    def feed(self, state: Optional[tuple], data: bytes) -> Optional[tuple]:
+        for b in data:
+            if state is None:
+                return None
+            state = self.step(state, b)
+        return state
+
+    def cover(self, covered: int, value: bytes) -> int:
+        """把片段标记到输入上：按最长匹配分段，优先落在尚未覆盖的位置"""
+        i = 0
+        while i < len(value):
+            for length in range(len(value) - i, 0, -1):
+                piece = value[i:i + length]
+                mask = (1 << length) - 1
+                hits, pos = [], self.data.find(piece)
+                while pos >= 0:
+                    hits.append(pos)
+                    pos = self.data.find(piece, pos + 1)
+                if hits:
+                    pos = next((p for p in hits if (covered >> p) & mask != mask), hits[0])
+                    covered |= mask << pos
+                    i += length
+                    break
+            else:
+                i += 1
+        return covered
+
+    def eos_allowed(self, state: tuple) -> bool:
+        return state[0] == "between" or (state[0] == "start" and state[1] == self.full)
+
+    def must_stop(self, state: tuple) -> bool:
+        return state[0] == "between" and state[1] == self.full
+
+
+class VocabTrie:
+    """
+    词表字节前缀树；节点为 [以此结尾的 token id 列表, 子节点 dict 或 None]
+    :param token_bytes: {token id: 该 token 的 UTF-8 字节}
+    """
+
+    def __init__(self, token_bytes: Dict[int, bytes]):
+        self.root: Dict[int, list] = {}
+        for tid, data in token_bytes.items():
+            if not data:
+                continue
+            children, node = self.root, None
+            for b in data:
+                if children is None:
+                    children = node[1] = {}
+                node = children.get(b)
+                if node is None:
+                    node = children[b] = [[], None]
+                children = node[1]
+            node[0].append(tid)
+
+    def allowed(self, constraint: CopyConstraint, state: tuple, eos_id: int) -> List[int]:
+        """当前状态下允许的 token id（含 EOS）"""
+        if constraint.must_stop(state):
+            return [eos_id]
+        ids = [eos_id] if constraint.eos_allowed(state) else []
+        stack = [(self.root, state)]
+        while stack:
+            children, st = stack.pop()
+            for b, (tids, sub) in children.items():
+                nxt = constraint.step(st, b)
+                if nxt is None:
+                    continue
+                ids.extend(tids)
+                if sub:
+                    stack.append((sub, nxt))
+        return ids or [eos_id]
+
+
+def tokenizer_token_bytes(tok) -> Dict[int, bytes]:
+    """
+    取出 HF 分词器每个普通 token 的字节串（特殊 token 除外）
+    字节级 BPE（Qwen / GPT2 系，带 byte_decoder）按字节还原，其余按字符串编码
+    """
+    special = set(tok.all_special_ids) | set(getattr(tok, "added_tokens_encoder", {}).values())
+    byte_decoder = getattr(tok, "byte_decoder", None)
+    out = {}
+    for tid in range(len(tok)):
+        if tid in special:
+            continue
+        piece = tok.convert_ids_to_tokens(tid)
+        if not piece:
+            continue
+        if byte_decoder and all(c in byte_decoder for c in piece):
+            data = bytes(byte_decoder[c] for c in piece)
+        else:
+            data = tok.convert_tokens_to_string([piece]).encode("utf-8")
+        if data:
+            out[tid] = data
+    return out
@@ -0,0 +1,194 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# ✅ 行政区划词典（省 / 市 / 区县 / 乡镇街道）前缀树
+# 数据由 util/gazetteer_build.py 从四级行政区划码表编译，格式：
+#   {"version": 1, "complete": bool, "entries": [[name, level, parent_index], ...]}
+# level: 0=prov 1=city 2=district 3=town；parent_index 为上级条目下标（-1 表示无）
+# complete=false 表示词典只覆盖部分区划（由标注语料归纳），同名歧义无法判断，不据此推断上级
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, "adm_gazetteer.json")
+
+LEVELS = ("prov", "city", "district", "town")
+
+# 省、市两级允许省略后缀的简称（如“浙江”“杭州”）；区县、乡镇简称歧义大，不收录
+ALIAS_SUFFIXES = {
+    0: ("维吾尔自治区", "壮族自治区", "回族自治区", "特别行政区", "自治区", "省", "市"),
+    1: ("市", "地区"),
+}
+
+# 简称后紧跟道路 / POI 后缀时是路名或地标的一部分（如“南京路”“杭州东站”），不是区划
+_ALIAS_STOP = re.compile(r"[东西南北中]?(?:大道|大街|路|街|道|巷|弄|胡同|桥|站|广场|公园|大学|大厦|饭店|酒店|宾馆|机场)")
+
+_END = ""  # 前缀树终止标记（地名中不会出现空字符）
+
+
+def alias_keys(name: str, level: int) -> List[str]:
+    keys = [name]
+    for suffix in ALIAS_SUFFIXES.get(level, ()):
+        if name.endswith(suffix) and len(name) - len(suffix) >= 2:
+            keys.append(name[:-len(suffix)])
+            break
+    return keys
+
+
+class Gazetteer:
+    """行政区划前缀匹配：从地址开头依次识别省、市、区县、乡镇，并按上下级关系补全"""
+
+    def __init__(self, entries: List[Tuple[str, int, int]], complete: bool = True):
+        """:param complete: 是否覆盖全部区划；为 False 时不推断上级"""
+        self.entries = [tuple(e) for e in entries]
+        self.complete = complete
+        self.trie: Dict = {}
+        for idx, (name, level, _parent) in enumerate(self.entries):
+            for key in alias_keys(name, level):
+                node = self.trie
+                for ch in key:
+                    node = node.setdefault(ch, {})
+                node.setdefault(_END, []).append(idx)
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("entries", []), complete=data.get("complete", True))
+
+    def ancestors(self, idx: int) -> List[int]:
+        chain = []
+        parent = self.entries[idx][2]
+        while parent >= 0 and parent not in chain:
+            chain.append(parent)
+            parent = self.entries[parent][2]
+        return chain
+
+    def _longest(self, text: str, pos: int) -> Optional[Tuple[int, List[int]]]:
+        node, best = self.trie, None
+        for i in range(pos, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node:
+                best = (i + 1, node[_END])
+        return best
+
+    def _choose(self, candidates: List[int], last: Optional[int]) -> Tuple[Optional[int], bool]:
+        """
+        同名区划中，优先选择是上一个匹配项下级的条目
+        :return: (条目下标, 是否仍有同级同名歧义)
+        """
+        if last is None:
+            pool = candidates
+        else:
+            last_level = self.entries[last][1]
+            deeper = [i for i in candidates if self.entries[i][1] > last_level]
+            pool = [i for i in deeper if last in self.ancestors(i)] or deeper
+        if not pool:
+            return None, False
+        top = min(self.entries[i][1] for i in pool)
+        pool = [i for i in pool if self.entries[i][1] == top]
+        return pool[0], len(pool) > 1
+
+    def match(self, text: str) -> List[Tuple[int, int, int, bool]]:
+        """
+        从文本开头连续匹配行政区划
+        :return: [(start, end, entry_index, ambiguous), ...]
+        """
+        text = text or ""
+        matches: List[Tuple[int, int, int, bool]] = []
+        pos = 0
+        while pos < len(text):
+            if text[pos].isspace():
+                pos += 1
+                continue
+            found = self._longest(text, pos)
+            if not found:
+                break
+            end, candidates = found
+            last = matches[-1][2] if matches else None
+            idx, ambiguous = self._choose(candidates, last)
+            if idx is not None and text[pos:end] != self.entries[idx][0] and _ALIAS_STOP.match(text, end):
+                break
+            if idx is None:
+                # 重复书写的区划（如“浙江省浙江省”）直接跳过，其余情况视为区划结束
+                if last is not None and last in candidates:
+                    matches[-1] = (matches[-1][0], end) + matches[-1][2:]
+                    pos = end
+                    continue
+                break
+            matches.append((pos, end, idx, ambiguous))
+            pos = end
+        return matches
+
+    def resolve(self, text: str) -> Dict[str, str]:
+        """
+        识别地址中的行政区划，并由上下级关系补全缺失的上级
+        :return: {"prov", "city", "district", "town", "rest"}，未识别的层级为空串
+        """
+        result = {level: "" for level in LEVELS}
+        matches = self.match(text)
+        end = 0
+        for _start, end, idx, _ambiguous in matches:
+            name, level, _parent = self.entries[idx]
+            result[LEVELS[level]] = name
+
+        # 由最深的无歧义匹配项向上补全（多地同名且无上级可区分时不推断；部分覆盖的词典无法判断同名，不推断）
+        anchors = [idx for _s, _e, idx, ambiguous in matches if not ambiguous]
+        if anchors and self.complete:
+            for idx in self.ancestors(anchors[-1]):
+                name, level, _parent = self.entries[idx]
+                result[LEVELS[level]] = result[LEVELS[level]] or name
+        result["rest"] = (text or "")[end:]
+        return result
+
+    def explicit(self, text: str) -> Dict[str, str]:
+        """
+        补全结构化字段用的保守识别：与 resolve 相同，但丢弃有同名歧义的层级
+        （词典完整时才由最深的无歧义条目推断上级，部分覆盖的词典中“朝阳区”不能断定为北京市）
+        :return: {"prov", "city", "district", "town"}，未识别的层级为空串
+        """
+        result = {level: "" for level in LEVELS}
+        anchors = []
+        for _start, _end, idx, ambiguous in self.match(text):
+            if ambiguous:
+                continue
+            name, level, _parent = self.entries[idx]
+            result[LEVELS[level]] = name
+            anchors.append(idx)
+        if self.complete and anchors:
+            for idx in self.ancestors(anchors[-1]):
+                name, level, _parent = self.entries[idx]
+                result[LEVELS[level]] = result[LEVELS[level]] or name
+        return result
+
+
+@lru_cache(maxsize=1)
+def default_gazetteer() -> Optional[Gazetteer]:
+    if not os.path.exists(GAZETTEER_PATH):
+        return None
+    return Gazetteer.load(GAZETTEER_PATH)
+
+
+def match_regions(text: str) -> Dict[str, str]:
+    """识别地址开头的省/市/区县/乡镇；词典缺失时返回空字段"""
+    gaz = default_gazetteer()
+    if gaz is None:
+        return {**{level: "" for level in LEVELS}, "rest": text or ""}
+    return gaz.resolve(text)
+
+
+def explicit_regions(text: str) -> Dict[str, str]:
+    """见 Gazetteer.explicit；词典缺失时返回空字段"""
+    gaz = default_gazetteer()
+    if gaz is None:
+        return {level: "" for level in LEVELS}
+    return gaz.explicit(text)
+
+
+def first_region(text: str) -> str:
+    """地址所属的区县（无则地级市），可由乡镇反推"""
+    regions = match_regions(text)
+    return regions["district"] or regions["city"]
@@ -0,0 +1,194 @@
+"""
+编译行政区划词典（util/adm_gazetteer.json），供 util/gazetteer.py 做前缀匹配。
+
+数据来源（二选一）：
+  --xlsx   四级行政区划码表（与 lora/build_sft_from_adm.py 相同，需含 p_name/c_name/d_name/street_name 列），推荐
+  --events 标注语料 lora/events.jsonl（从 prov/city/district/town 事件中归纳，仅作无码表时的替代）
+
+用法：
+  python util/gazetteer_build.py --xlsx lora/四级行政区划码表_20250901.xlsx
+  python util/gazetteer_build.py --events lora/events.jsonl
+"""
+import argparse
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_PATH = os.path.join(BASE_DIR, "adm_gazetteer.json")
+
+# 省级行政区（标准名称），用于归一 events 中的简称与笔误
+PROVINCES = [
+    "北京市", "天津市", "上海市", "重庆市", "河北省", "山西省", "辽宁省", "吉林省", "黑龙江省",
+    "江苏省", "浙江省", "安徽省", "福建省", "江西省", "山东省", "河南省", "湖北省", "湖南省",
+    "广东省", "海南省", "四川省", "贵州省", "云南省", "陕西省", "甘肃省", "青海省", "台湾省",
+    "内蒙古自治区", "广西壮族自治区", "西藏自治区", "宁夏回族自治区", "新疆维吾尔自治区",
+    "香港特别行政区", "澳门特别行政区",
+]
+
+# 码表中的占位名称（直辖市/省直辖县的中间层），不是实际地名，编译时跳过该层
+PLACEHOLDERS = {"市辖区", "县", "郊区", "省直辖县级行政区划", "自治区直辖县级行政区划"}
+
+# events 中各层级名称的合法形式：以标准后缀结尾
+LEVEL_RULES = {
+    1: re.compile(r"^[一-龥]{1,12}(市|地区|自治州|盟)$"),
+    2: re.compile(r"^[一-龥]{1,10}(区|县|市|旗)$"),
+    3: re.compile(r"^[一-龥]{1,10}(镇|乡|街道)$"),
+}
+
+
+# events 模式的笔误过滤：出现不超过 TYPO_MAX_COUNT 次、且相差一字的同级名称出现次数是其 TYPO_RATIO 倍以上
+TYPO_MAX_COUNT = 3
+TYPO_RATIO = 10
+
+
+def _valid_name(name: str, level: int) -> bool:
+    """
+    合法且不含重复书写：任何真前缀本身都不是合法名称（过滤“杭州市杭州市”），
+    开头也不是同一片段连写两遍（过滤“杭州杭州市”“瓯海瓯海区”）
+    """
+    pattern = LEVEL_RULES[level]
+    if name in PLACEHOLDERS or not pattern.match(name):
+        return False
+    if any(name[:k] == name[k:2 * k] for k in range(2, len(name) // 2 + 1)):
+        return False
+    return not any(pattern.match(name[:i]) for i in range(2, len(name)))
+
+
+class EntryTable:
+    """按 (名称, 层级, 上级) 去重的条目表"""
+
+    def __init__(self):
+        self.entries = []
+        self.index = {}
+
+    def add(self, name: str, level: int, parent: int) -> int:
+        key = (name, level, parent)
+        if key not in self.index:
+            self.index[key] = len(self.entries)
+            self.entries.append([name, level, parent])
+        return self.index[key]
+
+
+def from_xlsx(xlsx_path: str, sheet=None) -> list:
+    import pandas as pd
+
+    def norm(s):
+        if pd.isna(s): return ""
+        return str(s).strip().replace(" ", "").replace("　", "")
+
+    if sheet is None:
+        need = {"p_name", "c_name", "d_name", "street_name"}
+        xls = pd.ExcelFile(xlsx_path)
+        sheet = next((sh for sh in xls.sheet_names
+                      if need.issubset(set(map(str, pd.read_excel(xlsx_path, sheet_name=sh, nrows=0).columns)))),
+                     xls.sheet_names[0])
+    df = pd.read_excel(xlsx_path, sheet_name=sheet)
+
+    table = EntryTable()
+    for _, row in df.iterrows():
+        parent = -1
+        for level, col in enumerate(["p_name", "c_name", "d_name", "street_name"]):
+            name = norm(row.get(col))
+            if name and name not in PLACEHOLDERS:
+                parent = table.add(name, level, parent)
+    return table.entries
+
+
+def _canonical_prov(name: str) -> str:
+    for prov in PROVINCES:
+        short = re.sub(r"(维吾尔自治区|壮族自治区|回族自治区|特别行政区|自治区|省|市)$", "", prov)
+        if name in (prov, short):
+            return prov
+    return ""
+
+
+def from_events(events_path: str, min_count: int = 2) -> list:
+    chains = []
+    counts = Counter()
+    with open(events_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            events = json.loads(line).get("events", {})
+            chain = []
+            prov = _canonical_prov(str(events.get("prov", "")).strip())
+            if prov:
+                chain.append((0, prov))
+            for level, key in ((1, "city"), (2, "district"), (3, "town")):
+                name = str(events.get(key, "")).strip()
+                if _valid_name(name, level):
+                    chain.append((level, name))
+            chains.append(chain)
+            counts.update(chain)
+
+    keep = {item for item, n in counts.items() if n >= min_count or item[0] == 0}
+
+    # 县级市常被同时标为 city / district，仅保留出现更多的层级
+    for level, name in list(keep):
+        other = (3 - level, name) if level in (1, 2) else None
+        if other in keep and counts[other] > counts[(level, name)]:
+            keep.discard((level, name))
+
+    # 每个条目取最常见的直接上级
+    parents = defaultdict(Counter)
+    for chain in chains:
+        chain = [item for item in chain if item in keep]
+        for upper, item in zip(chain, chain[1:]):
+            parents[item][upper] += 1
+    parent_of = {item: c.most_common(1)[0][0] for item, c in parents.items()}
+
+    # 笔误：与同一上级下的同层名称只差一个字、且出现次数远少于对方（如 义务市 / 义乌市）
+    for item in list(keep):
+        level, name = item
+        for other in keep:
+            if (other != item and other[0] == level and len(other[1]) == len(name)
+                    and parent_of.get(other) == parent_of.get(item)
+                    and sum(a != b for a, b in zip(other[1], name)) == 1
+                    and counts[item] <= TYPO_MAX_COUNT and counts[other] >= TYPO_RATIO * counts[item]):
+                keep.discard(item)
+                break
+
+    table = EntryTable()
+
+    def add(item):
+        """写入条目及其上级链；非省级且找不到上级的条目丢弃，返回 None"""
+        if item[0] == 0:
+            return table.add(item[1], 0, -1)
+        upper = parent_of.get(item)
+        parent = add(upper) if upper in keep else None
+        return None if parent is None else table.add(item[1], item[0], parent)
+
+    for prov in PROVINCES:
+        table.add(prov, 0, -1)
+    for item in sorted(keep):
+        add(item)
+    return table.entries
+
+
+def build_gazetteer(entries: list, out_path: str = OUT_PATH, complete: bool = True):
+    """:param complete: 是否由完整码表编译；events 归纳的词典只覆盖部分区划，记为 False"""
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "complete": complete, "entries": entries}, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"✅ 行政区划词典已生成：{out_path}（{len(entries)} 条）")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="编译行政区划前缀词典")
+    ap.add_argument("--xlsx", help="四级行政区划 Excel 文件路径")
+    ap.add_argument("--sheet", default=None, help="工作表名（默认自动选择）")
+    ap.add_argument("--events", help="标注语料 events.jsonl 路径（无码表时使用）")
+    ap.add_argument("--min-count", type=int, default=2, help="events 模式下条目最少出现次数")
+    ap.add_argument("--out", default=OUT_PATH, help="输出 JSON 路径")
+    args = ap.parse_args()
+
+    if args.xlsx:
+        entries = from_xlsx(args.xlsx, args.sheet)
+    elif args.events:
+        entries = from_events(args.events, args.min_count)
+    else:
+        ap.error("需要 --xlsx 或 --events")
+    build_gazetteer(entries, args.out, complete=bool(args.xlsx))
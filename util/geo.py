@@ -18,4 +18,19 @@ def distance(lat1, lon1, lat2, lon2):
     a = math.sin(dphi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2)**2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     
-    return R * c
\ No newline at end of file
+    return R * c
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """
+    计算从点1指向点2的方位角（单位：度，正北为 0，顺时针 0~360）
+    输入参数单位：十进制度数
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dlambda = math.radians(lon2 - lon1)
+
+    y = math.sin(dlambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlambda)
+
+    return (math.degrees(math.atan2(y, x)) + 360) % 360
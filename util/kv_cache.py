@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# ✅ 基于 SQLite 的持久化键值缓存（按命名空间隔离，LRU 淘汰）
+# 用于缓存大模型等高延迟调用的结果，进程重启后仍然有效；多线程/多进程共享同一文件
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv_cache (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+def make_key(*parts: str) -> str:
+    """将多个字符串片段（模型名、prompt 等）哈希为定长缓存键"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class KVCache:
+    """
+    持久化 LRU 缓存
+    :param path: SQLite 文件路径；为空则禁用缓存（get 恒返回 None，set 不做任何事）
+    :param namespace: 命名空间，不同用途的缓存互不影响
+    :param max_entries: 命名空间内最多保留的条目数，超出后淘汰最久未访问的条目
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 10000):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self._local = threading.local()
+        self._writes = 0
+        if self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._conn() as conn:
+                conn.execute(_SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 连接不可跨线程使用，每个线程一个
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            with self._conn() as conn:
+                row = conn.execute(
+                    "SELECT value FROM kv_cache WHERE namespace=? AND key=?", (self.namespace, key)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE kv_cache SET accessed_at=? WHERE namespace=? AND key=?",
+                    (time.time(), self.namespace, key),
+                )
+                return row[0]
+        except sqlite3.Error:
+            return None
+
+    def set(self, key: str, value: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv_cache (namespace, key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, value, now, now),
+                )
+                self._writes += 1
+                # 每写入若干次检查一次容量，避免每次写入都统计行数
+                if self._writes % 64 == 0 or self.max_entries < 64:
+                    self._evict(conn)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection):
+        (count,) = conn.execute("SELECT COUNT(*) FROM kv_cache WHERE namespace=?", (self.namespace,)).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM kv_cache WHERE rowid IN ("
+                "SELECT rowid FROM kv_cache WHERE namespace=? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, overflow),
+            )
+
+    def clear(self):
+        if not self.enabled:
+            return
+        with self._conn() as conn:
+            conn.execute("DELETE FROM kv_cache WHERE namespace=?", (self.namespace,))
+
+    def __len__(self) -> int:
+        if not self.enabled:
+            return 0
+        (count,) = self._conn().execute(
+            "SELECT COUNT(*) FROM kv_cache WHERE namespace=?", (self.namespace,)
+        ).fetchone()
+        return count
@@ -0,0 +1,166 @@
+"""
+本地乡镇街道级逆地理编码：
+- 从 GeoJSON（FeatureCollection，Polygon / MultiPolygon）加载行政区划边界
+- 以 STR-tree 索引边界外包框，点查时只对少量候选做点面判断
+- 返回与高德 regeo addressComponent 相同的字段（province/city/district/township/adcode/towncode ...）
+
+边界文件中每个 Feature 的 properties 建议包含：
+    province, city, district, township, adcode, towncode, citycode
+其余字符串/数值属性原样返回。
+"""
+import gzip
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+BBox = Tuple[float, float, float, float]  # (min_lng, min_lat, max_lng, max_lat)
+
+
+# ✅ STR-tree（Sort-Tile-Recursive 打包的 R-tree）
+class STRtree:
+    """只读空间索引，按外包框批量构建，查询包含某点的全部条目"""
+
+    def __init__(self, entries: List[Tuple[BBox, object]], node_capacity: int = 10):
+        self.node_capacity = max(2, node_capacity)
+        # 节点结构：(bbox, children, item)，叶子条目 children 为 None
+        level = [(bbox, None, item) for bbox, item in entries]
+        while len(level) > 1:
+            level = self._pack(level)
+        self.root = level[0] if level else None
+
+    def _pack(self, nodes: list) -> list:
+        cap = self.node_capacity
+        n_parents = math.ceil(len(nodes) / cap)
+        n_slices = math.ceil(math.sqrt(n_parents))
+        slice_size = n_slices * cap
+
+        nodes = sorted(nodes, key=lambda n: n[0][0] + n[0][2])  # 按中心经度分片
+        parents = []
+        for i in range(0, len(nodes), slice_size):
+            vertical = sorted(nodes[i:i + slice_size], key=lambda n: n[0][1] + n[0][3])  # 片内按中心纬度
+            for j in range(0, len(vertical), cap):
+                children = vertical[j:j + cap]
+                bbox = (
+                    min(c[0][0] for c in children), min(c[0][1] for c in children),
+                    max(c[0][2] for c in children), max(c[0][3] for c in children),
+                )
+                parents.append((bbox, children, None))
+        return parents
+
+    def query_point(self, x: float, y: float) -> List[object]:
+        if self.root is None:
+            return []
+        found, stack = [], [self.root]
+        while stack:
+            (minx, miny, maxx, maxy), children, item = stack.pop()
+            if x < minx or x > maxx or y < miny or y > maxy:
+                continue
+            if children is None:
+                found.append(item)
+            else:
+                stack.extend(children)
+        return found
+
+
+# ✅ 点面判断（射线法）
+def _in_ring(x: float, y: float, ring: List[List[float]]) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _in_polygon(x: float, y: float, rings: List[List[List[float]]]) -> bool:
+    """rings[0] 为外环，其余为洞"""
+    if not rings or not _in_ring(x, y, rings[0]):
+        return False
+    return not any(_in_ring(x, y, hole) for hole in rings[1:])
+
+
+def _ring_area(ring: List[List[float]]) -> float:
+    return abs(sum(ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(len(ring)))) / 2
+
+
+class LocalRegeo:
+    """基于行政区划边界的本地逆地理编码引擎"""
+
+    def __init__(self, features: List[Dict]):
+        entries = []
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            gtype = geometry.get("type")
+            coords = geometry.get("coordinates") or []
+            if gtype == "Polygon":
+                polygons = [coords]
+            elif gtype == "MultiPolygon":
+                polygons = coords
+            else:
+                continue
+
+            props = {k: v for k, v in (feature.get("properties") or {}).items()
+                     if isinstance(v, (str, int, float))}
+            for rings in polygons:
+                if not rings or not rings[0]:
+                    continue
+                outer = rings[0]
+                bbox = (
+                    min(p[0] for p in outer), min(p[1] for p in outer),
+                    max(p[0] for p in outer), max(p[1] for p in outer),
+                )
+                entries.append((bbox, (rings, _ring_area(outer), props)))
+
+        self.size = len(entries)
+        self.tree = STRtree(entries)
+
+    @classmethod
+    def from_geojson(cls, path: str) -> "LocalRegeo":
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        features = data.get("features", []) if isinstance(data, dict) else data
+        return cls(features)
+
+    def lookup(self, lng: float, lat: float) -> Dict:
+        """
+        查询坐标所在的乡镇街道
+        :return: regeo 风格的字段字典；未命中返回 {}
+        """
+        best: Optional[Tuple[float, Dict]] = None
+        for rings, area, props in self.tree.query_point(lng, lat):
+            # 边界重叠时取面积最小（最细粒度）的区划
+            if (best is None or area < best[0]) and _in_polygon(lng, lat, rings):
+                best = (area, props)
+        return dict(best[1]) if best else {}
+
+
+@lru_cache(maxsize=4)
+def load_local_regeo(path: str) -> Optional[LocalRegeo]:
+    """按路径加载并缓存边界索引；文件不存在时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    return LocalRegeo.from_geojson(path)
+
+
+def regeo_local(location: str, path: str) -> Dict:
+    """
+    本地逆地理编码，接口与 func.amap_call.regeo 对齐
+    :param location: "lng,lat"
+    :param path: 边界 GeoJSON 路径
+    :return: 乡镇街道信息；无边界数据或未命中返回 {}
+    """
+    index = load_local_regeo(path)
+    if index is None:
+        return {}
+    try:
+        lng, lat = map(float, location.split(","))
+    except (AttributeError, ValueError):
+        return {}
+    return index.lookup(lng, lat)
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+# ✅ 进程内指标：计数器 / 直方图 / 仪表，线程安全
+# 通过 /api/metrics 以 JSON 形式输出快照；直方图保留最近 HISTOGRAM_WINDOW 个样本计算分位数
+
+HISTOGRAM_WINDOW = 2048
+
+
+def percentile(values: list, q: float) -> float:
+    """最近秩分位数；q 取 0~100，values 无需有序，空列表返回 0"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))]
+
+
+def prf(tp: int, fp: int, fn: int) -> Dict:
+    """由 TP / FP / FN 计数得到 {"p", "r", "f1", "support"}（评估脚本共用，保留 4 位小数）"""
+    prec = tp / (tp + fp) if tp + fp else 0.0
+    rec = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * prec * rec / (prec + rec) if prec + rec else 0.0
+    return {"p": round(prec, 4), "r": round(rec, 4), "f1": round(f1, 4), "support": tp + fn}
+
+
+class Histogram:
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = float("-inf")
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        values = list(self.recent)
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3) if self.count else 0.0,
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {k: h.summary() for k, h in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+
+# 全局默认实例
+metrics = Metrics()
+inc = metrics.inc
+set_gauge = metrics.set_gauge
+observe = metrics.observe
+snapshot = metrics.snapshot
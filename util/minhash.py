@@ -0,0 +1,121 @@
+"""
+MinHash + LSH 近似去重（字符 shingle）
+
+地址文本很短，按字符 k-gram 切分后用 MinHash 估计 Jaccard 相似度，
+LSH 分桶只比较落入同一桶的候选，候选再用精确 Jaccard 复核，避免误删。
+"""
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_PRIME = (1 << 61) - 1
+_MAX32 = (1 << 32) - 1
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """去空白后的字符 k-gram 集合；不足 k 个字符时整串作为一个 shingle"""
+    text = "".join((text or "").split())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    选择 (bands, rows)，使 LSH 的 S 曲线拐点 (1/b)^(1/r) 最接近阈值
+    :return: (b, r)，b * r <= num_perm
+    """
+    best, best_err = (num_perm, 1), float("inf")
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        err = abs((1.0 / b) ** (1.0 / r) - threshold)
+        if err < best_err:
+            best, best_err = (b, r), err
+    return best
+
+
+class MinHasher:
+    """
+    :param num_perm: 置换（哈希函数）个数，越大估计越准、越慢
+    :param seed: 置换参数的随机种子，同一 seed 的签名才可比较
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a, b < 2^32 且基础哈希为 32 位：a*h + b < 2^64，uint64 不溢出
+        self.a = rng.randint(1, _MAX32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _MAX32, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, items: Iterable[str]) -> np.ndarray:
+        hv = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in items), dtype=np.uint64)
+        if hv.size == 0:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        return ((np.outer(hv, self.a) + self.b) % np.uint64(_PRIME)).min(axis=0)
+
+
+class MinHashLSH:
+    """
+    按 band 分桶的 LSH 索引
+    :param threshold: 目标 Jaccard 阈值，用于确定 band/row 划分
+    :param num_perm: 与 MinHasher 一致
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128):
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.buckets: List[Dict[bytes, List]] = [{} for _ in range(self.bands)]
+
+    def _keys(self, sig: np.ndarray):
+        for i in range(self.bands):
+            yield i, sig[i * self.rows:(i + 1) * self.rows].tobytes()
+
+    def query(self, sig: np.ndarray) -> List:
+        seen, out = set(), []
+        for i, key in self._keys(sig):
+            for item in self.buckets[i].get(key, ()):
+                if item not in seen:
+                    seen.add(item)
+                    out.append(item)
+        return out
+
+    def insert(self, item, sig: np.ndarray):
+        for i, key in self._keys(sig):
+            self.buckets[i].setdefault(key, []).append(item)
+
+
+class Deduper:
+    """
+    流式去重：先出现的样本保留，与已保留样本精确 Jaccard >= threshold 的后续样本判为重复
+    用法：
+        dedup = Deduper(threshold=0.8)
+        for i, text in enumerate(texts):
+            rep = dedup.add(i, text)   # None 表示保留，否则为其所重复的已保留样本
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, k: int = 3, seed: int = 1):
+        self.threshold = threshold
+        self.k = k
+        self.hasher = MinHasher(num_perm, seed)
+        self.lsh = MinHashLSH(threshold, num_perm)
+        self.kept: Dict = {}  # 已保留样本 → shingle 集合（用于精确复核）
+
+    def add(self, key, text: str) -> Optional[Tuple]:
+        """:return: 重复时返回 (已保留样本 key, Jaccard)，否则 None 并加入索引"""
+        sh = shingles(text, self.k)
+        sig = self.hasher.signature(sh)
+        best = None
+        for cand in self.lsh.query(sig):
+            sim = jaccard(sh, self.kept[cand])
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (cand, sim)
+        if best is None:
+            self.kept[key] = sh
+            self.lsh.insert(key, sig)
+        return best
@@ -0,0 +1,100 @@
+import asyncio
+import inspect
+import json
+import logging
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+import requests
+
+from util import metrics
+
+logger = logging.getLogger("address")  # 与 config.logger 同一命名 logger
+
+# ✅ 分阶段执行：一次解析请求内，各阶段（私有库、快速搜索、结构化、输入提示、逆地理……）按 (阶段名, 参数) 记忆结果，
+# 上游偶发返回非 JSON / 网络抖动时只重试失败的阶段（各阶段独立的次数预算 + 指数退避），不再整条流水线重跑。
+# 指标：stage.{name}.retry / stage.{name}.failed / stage.{name}.memo_hit
+
+# requests 的 JSONDecodeError 继承自 json.JSONDecodeError
+RETRYABLE = (json.JSONDecodeError, requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+
+class StageRunner:
+    """
+    单次请求使用一个实例，不跨请求共享
+    :param retries: 每个阶段默认的重试次数（不含首次）
+    :param backoff_ms: 首次重试前的等待（毫秒），之后每次翻倍并加随机抖动
+    :param max_backoff_ms: 单次等待上限（毫秒）
+    :param budgets: 按阶段名覆盖重试次数，如 {"structure": 1}
+    :param retry_on: 可重试的异常类型，其余异常直接抛出
+    """
+
+    def __init__(self, retries: int = 2, backoff_ms: float = 100, max_backoff_ms: float = 2000,
+                 budgets: Optional[Dict[str, int]] = None, retry_on: Tuple = RETRYABLE):
+        self.retries = max(0, retries)
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.budgets = budgets or {}
+        self.retry_on = retry_on
+        self.memo: Dict[tuple, object] = {}
+
+    @staticmethod
+    def _key(name: str, args: tuple) -> tuple:
+        return name, json.dumps(args, ensure_ascii=False, sort_keys=True, default=str)
+
+    def _delay(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待（秒）"""
+        ms = min(self.max_backoff_ms, self.backoff_ms * (2 ** attempt))
+        return ms * random.uniform(0.5, 1.0) / 1000
+
+    def _should_retry(self, name: str, attempt: int, error: Exception) -> bool:
+        budget = self.budgets.get(name, self.retries)
+        if attempt >= budget:
+            metrics.inc(f"stage.{name}.failed")
+            return False
+        metrics.inc(f"stage.{name}.retry")
+        logger.warning(f"⚠️ 阶段 {name} 失败，重试 {attempt + 1}/{budget}：{error}")
+        return True
+
+    def run(self, name: str, fn, *args):
+        """执行阶段 fn(*args)；同一请求内相同阶段与参数只执行一次"""
+        key = self._key(name, args)
+        if key in self.memo:
+            metrics.inc(f"stage.{name}.memo_hit")
+            return self.memo[key]
+        attempt = 0
+        while True:
+            try:
+                result = fn(*args)
+                break
+            except self.retry_on as e:
+                if not self._should_retry(name, attempt, e):
+                    raise
+            time.sleep(self._delay(attempt))
+            attempt += 1
+        self.memo[key] = result
+        return result
+
+    async def run_async(self, name: str, fn, *args):
+        """run 的 asyncio 版本；fn 为普通函数时（如 SQLite 查询）放到线程池执行，不阻塞事件循环"""
+        key = self._key(name, args)
+        if key in self.memo:
+            metrics.inc(f"stage.{name}.memo_hit")
+            return self.memo[key]
+        attempt = 0
+        while True:
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn(*args)
+                else:
+                    result = await asyncio.to_thread(fn, *args)
+                break
+            except self.retry_on as e:
+                if not self._should_retry(name, attempt, e):
+                    raise
+            await asyncio.sleep(self._delay(attempt))
+            attempt += 1
+        self.memo[key] = result
+        return result
@@ -0,0 +1,97 @@
+"""
+结构化输出的标签格式：
+
+- xml（默认）：<prov>浙江省</prov><city>杭州市</city>
+- compact：p=浙江省|c=杭州市，字段名用单字母代码、以 | 分隔，不再重复闭合标签，
+  每个字段的标记开销从 6~8 个 token 降到 2~3 个
+
+代码覆盖完整标签体系（见 readme“标签体系”：events.jsonl 实际出现的 util/copy_constraint.TAGS，
+以及 roomno/detail/direction/redundant）。
+其中 c/d/u 与 resolver.build_structured_fields 的字段名 C/D/U 小写相同，但分别对应 city/district/cellno，
+归入的正是同名字段，不会串位；其余代码不与 C/D/AP/U/I/T 重合。
+训练数据（bio2sft / build_sft_from_adm / train_hf_qlora --tag_format）与推理（STRUCT_TAG_FORMAT / TAG_FORMAT）
+须使用同一格式，两种格式的 instruction 不同。
+"""
+import re
+from typing import Dict, Iterable, List, Tuple
+
+XML, COMPACT = "xml", "compact"
+FORMATS = (XML, COMPACT)
+
+TAG_CODES = {
+    "prov": "p", "city": "c", "district": "d", "town": "w", "community": "m",
+    "village_group": "g", "devzone": "k", "road": "r", "roadno": "n", "intersection": "x",
+    "poi": "o", "subpoi": "s", "houseno": "h", "cellno": "u", "floorno": "f",
+    "assist": "a", "distance": "l", "roomno": "j", "detail": "e", "direction": "v",
+    "redundant": "z",
+}
+CODE_TAGS = {code: tag for tag, code in TAG_CODES.items()}
+
+INSTRUCTIONS = {
+    XML: "从以下地址文本中抽取要素，并按XML标签输出（只输出标签串）：",
+    COMPACT: "从以下地址文本中抽取要素，按“代码=值”输出并以|分隔（只输出字段串）：",
+}
+
+SEP = "|"
+
+_XML_RE = re.compile(r"<([a-zA-Z0-9_]+)>(.*?)</\1>", re.DOTALL)
+_FIELD_RE = re.compile(r"^\s*([a-zA-Z_][a-zA-Z0-9_]*)=(.*)$", re.DOTALL)
+
+
+def merge_tag(result: Dict, tag: str, value: str) -> Dict:
+    """与 parse_xmlish_tags 一致：同名标签升格为 list 并去重"""
+    if tag not in result:
+        result[tag] = value
+    elif isinstance(result[tag], list):
+        if value not in result[tag]:
+            result[tag].append(value)
+    elif value != result[tag]:
+        result[tag] = [result[tag], value]
+    return result
+
+
+def instruction(fmt: str = XML) -> str:
+    return INSTRUCTIONS[fmt]
+
+
+def format_tags(pairs: Iterable[Tuple[str, str]], fmt: str = XML) -> str:
+    """[(tag, value)] → 标签串；不在代码表中的标签在 compact 格式下保留原名"""
+    pairs = [(t, v) for t, v in pairs if v]
+    if fmt == COMPACT:
+        return SEP.join(f"{TAG_CODES.get(t, t)}={v}" for t, v in pairs)
+    return "".join(f"<{t}>{v}</{t}>" for t, v in pairs)
+
+
+def detect_format(text: str) -> str:
+    return COMPACT if _FIELD_RE.match(text or "") and "</" not in text else XML
+
+
+def parse_compact_field(field: str):
+    """单个 "代码=值" 字段 → (tag, value)，不合法时返回 None"""
+    m = _FIELD_RE.match(field)
+    if not m:
+        return None
+    code = m.group(1)
+    return CODE_TAGS.get(code, code), m.group(2).strip()
+
+
+def parse_pairs(text: str) -> List[Tuple[str, str]]:
+    """自动识别格式，返回 [(tag, value)]"""
+    text = text or ""
+    if detect_format(text) == COMPACT:
+        return [p for p in map(parse_compact_field, text.split(SEP)) if p]
+    return [(m.group(1).strip(), m.group(2).strip()) for m in _XML_RE.finditer(text)]
+
+
+def parse_tags(text: str) -> Dict:
+    """与 parse_xmlish_tags 相同的合并规则（同名标签升格为 list 并去重），两种格式均可"""
+    result: Dict = {}
+    for tag, value in parse_pairs(text):
+        if tag:
+            merge_tag(result, tag, value)
+    return result
+
+
+def convert(text: str, fmt: str) -> str:
+    """标签串格式互转（训练时把现有 xml 样本转为 compact）"""
+    return format_tags(parse_pairs(text), fmt)
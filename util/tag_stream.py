@@ -0,0 +1,70 @@
+import re
+from typing import Dict, List, Tuple
+
+from util.tag_format import COMPACT, SEP, XML, merge_tag, parse_compact_field
+
+_TAG_RE = re.compile(r"<([a-zA-Z0-9_]+)>(.*?)</\1>", re.DOTALL)
+
+
+class TagStreamParser:
+    """
+    parse_xmlish_tags 的增量版本：逐段喂入生成文本，每完成一个字段即返回
+    - xml：闭合一个 <tag>值</tag> 即完成
+    - compact：读到分隔符 | 即完成前一个字段，最后一个字段在 close() 时完成
+    格式由首个非空白字符判断（"<" 为 xml，否则为 compact）
+    用法：
+        parser = TagStreamParser()
+        for chunk in stream:
+            for tag, value in parser.feed(chunk):
+                ...
+        parser.close()
+        parser.text, parser.tags
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.tags: Dict = {}
+        self.format = None
+        self._pos = 0  # text 中尚未解析部分的起点
+
+    def _emit(self, done: list, tag: str, value: str):
+        if tag:
+            merge_tag(self.tags, tag, value)
+            done.append((tag, value))
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """:return: 本次新完成的 [(tag, value)]"""
+        self.text += chunk or ""
+        if self.format is None:
+            head = self.text.lstrip()
+            if not head:
+                return []
+            self.format = XML if head.startswith("<") else COMPACT
+        done = []
+        if self.format == XML:
+            while True:
+                m = _TAG_RE.search(self.text, self._pos)
+                if not m:
+                    break
+                self._pos = m.end()
+                self._emit(done, m.group(1).strip(), m.group(2).strip())
+            return done
+        while True:
+            end = self.text.find(SEP, self._pos)
+            if end < 0:
+                break
+            field = parse_compact_field(self.text[self._pos:end])
+            self._pos = end + len(SEP)
+            if field:
+                self._emit(done, *field)
+        return done
+
+    def close(self) -> List[Tuple[str, str]]:
+        """生成结束：compact 格式下完成最后一个字段"""
+        done = []
+        if self.format == COMPACT and self._pos < len(self.text):
+            field = parse_compact_field(self.text[self._pos:])
+            self._pos = len(self.text)
+            if field:
+                self._emit(done, *field)
+        return done